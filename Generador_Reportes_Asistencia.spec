@@ -5,7 +5,7 @@ a = Analysis(
     ['src/main.py'],
     pathex=['src'],
     binaries=[],
-    datas=[],
+    datas=[('src/config/holidays', 'config/holidays')],
     hiddenimports=['PyQt5.QtCore', 'PyQt5.QtWidgets', 'PyQt5.QtGui', 'openpyxl', 'requests', 'ui', 'ui.main_window', 'core', 'core.api_client', 'core.data_processor', 'core.excel_generator', 'core.hours_calculator', 'config', 'config.default_config'],
     hookspath=[],
     hooksconfig={},
@@ -47,6 +47,7 @@ def build_executable():
         "--hidden-import", "core.hours_calculator",
         "--hidden-import", "config",
         "--hidden-import", "config.default_config",
+        "--add-data", f"src/config/holidays{os.pathsep}config/holidays",  # feriados por año
         "--clean",  # Limpiar cache antes de compilar
         main_script
     ]
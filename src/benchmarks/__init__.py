@@ -0,0 +1,3 @@
+"""
+Benchmarks y datos sintéticos del calculador de horas
+"""
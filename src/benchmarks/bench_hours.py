@@ -0,0 +1,212 @@
+"""
+Benchmark del calculador de horas con verificación golden
+Mide employee-days/seg y asignaciones de memoria (tracemalloc) de
+ArgentineHoursCalculatorEnhanced sobre datos sintéticos determinísticos y compara
+un digest de todos los resultados (horas por día, totales y compensaciones) con
+benchmarks/golden.json: una optimización no puede cambiar números de liquidación
+sin que el benchmark falle.
+
+Uso:
+    python src/benchmarks/bench_hours.py                         # 1k, 100k y 1M filas
+    python src/benchmarks/bench_hours.py --sizes 1000 100000
+    python src/benchmarks/bench_hours.py --vectorized            # ruta NumPy
+    python src/benchmarks/bench_hours.py --update-golden         # sólo si el cambio de números es intencional
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Dict, List, Tuple
+
+# Agregar el directorio src al path para imports absolutos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_data import DEFAULT_DAYS, DEFAULT_SEED, SyntheticAttendance
+from core.hours_calculator import ArgentineHoursCalculator
+from core.models import DailyRecord
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden.json')
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+CHUNK_EMPLOYEES = 500  # se generan y calculan de a bloques para acotar memoria
+
+RECORD_FIELDS = ('date', 'hours_worked', 'regular_hours', 'extra_hours_50', 'extra_hours_100',
+                 'night_hours', 'pending_hours', 'is_holiday', 'has_time_off', 'has_absence',
+                 'start_time', 'end_time')
+
+
+def _number(value):
+    """Normaliza int/float (la ruta vectorizada devuelve 8.0 donde la escalar devuelve 8)"""
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+
+def employee_digest_payload(employee_data: Dict) -> bytes:
+    """Representación canónica de los resultados de un empleado"""
+    payload = [
+        employee_data['employee_info'].employeeInternalId,
+        {key: _number(value) for key, value in employee_data['totals'].items()},
+        {key: _number(value) for key, value in employee_data['compensations'].items()},
+        [[_number(record[field]) for field in RECORD_FIELDS] for record in employee_data['daily_data']],
+    ]
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _chunks(generator: SyntheticAttendance, employees: int):
+    for first in range(0, employees, CHUNK_EMPLOYEES):
+        yield [generator.employee(index) for index in range(first, min(first + CHUNK_EMPLOYEES, employees))]
+
+
+def _compute(calculator, chunk: List[Tuple[List[Dict], Dict]], vectorized: bool) -> List[Dict]:
+    if vectorized:
+        return calculator.process_employees_batch(chunk)
+    return [calculator.process_employee_data(summaries, info, 0, None) for summaries, info in chunk]
+
+
+def run_size(rows: int, days: int, seed: int, vectorized: bool, measure_allocations: bool) -> Dict:
+    """Corre un tamaño: tiempo (sin tracemalloc), digest y, aparte, asignaciones"""
+    employees = max(1, rows // days)
+    generator = SyntheticAttendance(seed, days)
+    calculator = ArgentineHoursCalculator()
+    _compute(calculator, [generator.employee(0)], vectorized)  # imports y caches fuera de la medición
+    digest = hashlib.sha256()
+    elapsed = 0.0
+    employee_days = 0
+
+    for chunk in _chunks(generator, employees):
+        start = time.perf_counter()
+        results = _compute(calculator, chunk, vectorized)
+        elapsed += time.perf_counter() - start
+        for (summaries, _), employee_data in zip(chunk, results):
+            employee_days += len(summaries)
+            digest.update(employee_digest_payload(employee_data))
+
+    result = {
+        'rows': employees * days,
+        'employees': employees,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(employee_days / elapsed) if elapsed else 0,
+        'digest': digest.hexdigest(),
+    }
+
+    if measure_allocations:
+        # Segunda pasada: tracemalloc distorsiona los tiempos, por eso va aparte
+        blocks = 0
+        allocated = 0
+        peak = 0
+        for chunk in _chunks(generator, employees):
+            tracemalloc.start()
+            results = _compute(calculator, chunk, vectorized)
+            snapshot = tracemalloc.take_snapshot()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            stats = snapshot.statistics('filename')
+            blocks += sum(stat.count for stat in stats)
+            allocated += sum(stat.size for stat in stats)
+            del results
+        result['live_blocks_per_row'] = round(blocks / result['rows'], 2)
+        result['live_bytes_per_row'] = round(allocated / result['rows'])
+        result['peak_mb_per_chunk'] = round(peak / (1024 * 1024), 2)
+
+    return result
+
+
+def micro_benchmarks(seed: int, days: int) -> Dict[str, float]:
+    """Operaciones/seg de las funciones del calculador sobre 1 bloque de empleados sintéticos"""
+    calculator = ArgentineHoursCalculator()
+    chunk = next(_chunks(SyntheticAttendance(seed, days), CHUNK_EMPLOYEES))
+    summaries = [summary for employee_summaries, _ in chunk for summary in employee_summaries]
+    entries = [DailyRecord.compact_entries(summary.get('entries', [])) for summary in summaries]
+    totals = [employee_data['totals'] for employee_data in _compute(calculator, chunk, False)]
+
+    def per_second(function, count):
+        seconds = min(timeit.repeat(function, number=1, repeat=3))
+        return round(count / seconds) if seconds else 0
+
+    return {
+        'compact_entries/seg': per_second(
+            lambda: [DailyRecord.compact_entries(summary.get('entries', [])) for summary in summaries],
+            len(summaries)),
+        '_calculate_total_worked_hours/seg': per_second(
+            lambda: [calculator._calculate_total_worked_hours(day_entries) for day_entries in entries],
+            len(entries)),
+        'process_employee_data/seg': per_second(
+            lambda: _compute(calculator, chunk, False), len(chunk)),
+        'calculate_compensations/seg': per_second(
+            lambda: [calculator.calculate_compensations(t['total_extra_hours_50'], t['total_extra_hours_100'],
+                                                        t['total_pending_hours']) for t in totals],
+            len(totals)),
+    }
+
+
+def load_golden() -> Dict:
+    try:
+        with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_golden(golden: Dict):
+    with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del calculador de horas")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Cantidades de employee-days a medir")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Días por empleado")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--vectorized", action="store_true",
+                        help="Usar process_employees_batch (requiere NumPy)")
+    parser.add_argument("--no-alloc", action="store_true", help="No medir asignaciones")
+    parser.add_argument("--no-micro", action="store_true", help="No correr los micro-benchmarks")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="Reescribir los digests golden con los resultados actuales")
+    args = parser.parse_args(argv)
+
+    golden = load_golden()
+    golden_digests = golden.get('digests', {}) if (golden.get('seed'), golden.get('days')) == (args.seed, args.days) else {}
+    failures = 0
+
+    print(f"⏱️ Benchmark calculador de horas ({'vectorizado' if args.vectorized else 'escalar'}, "
+          f"semilla {args.seed}, {args.days} días por empleado)")
+    if not args.no_micro:
+        for name, value in micro_benchmarks(args.seed, args.days).items():
+            print(f"   {name:<36} {value:>12,}")
+
+    for rows in args.sizes:
+        result = run_size(rows, args.days, args.seed, args.vectorized, not args.no_alloc)
+        line = (f"📊 {result['rows']:>9,} filas  {result['seconds']:>8.2f}s  "
+                f"{result['rows_per_second']:>9,} filas/seg")
+        if 'live_blocks_per_row' in result:
+            line += (f"  {result['live_blocks_per_row']:>6} bloques/fila  {result['live_bytes_per_row']:>6} B/fila"
+                     f"  pico {result['peak_mb_per_chunk']} MB/bloque")
+        print(line)
+
+        expected = golden_digests.get(str(result['rows']))
+        if args.update_golden:
+            golden_digests[str(result['rows'])] = result['digest']
+        elif expected is None:
+            print(f"   ⚠️ Sin digest golden para {result['rows']} filas (usar --update-golden)")
+        elif expected != result['digest']:
+            failures += 1
+            print(f"   ❌ Los resultados cambiaron (digest {result['digest'][:12]} ≠ golden {expected[:12]})")
+        else:
+            print("   ✅ Resultados idénticos al golden")
+
+    if args.update_golden:
+        save_golden({'seed': args.seed, 'days': args.days, 'digests': golden_digests})
+        print(f"💾 Golden actualizado: {GOLDEN_PATH}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
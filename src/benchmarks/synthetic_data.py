@@ -0,0 +1,165 @@
+"""
+Generador determinístico de day summaries sintéticos
+Mismo formato que /time-tracking/day-summaries de la API: fichadas en UTC con
+varios pares por día, turnos nocturnos que cruzan la medianoche, sábados,
+domingos trabajados, feriados, ausencias, licencias y fichadas sin salida.
+Con la misma semilla genera siempre los mismos datos (la base de los digests golden).
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from core.holiday_calendar import HOLIDAYS_DIRECTORY, WorkCalendar
+
+DEFAULT_SEED = 20250101
+DEFAULT_DAYS = 25
+
+WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+
+# Perfiles de turno: (nombre, pares programados en minutos locales, peso)
+PROFILES = [
+    ('dia', [(9 * 60, 18 * 60)], 45),
+    ('manana', [(6 * 60, 14 * 60)], 20),
+    ('partido', [(8 * 60, 12 * 60), (14 * 60, 18 * 60)], 20),
+    ('noche', [(22 * 60, 30 * 60)], 15),  # 22:00 → 06:00 del día siguiente
+]
+
+DEPARTMENTS = ['Producción', 'Logística', 'Ventas', 'Administración', 'Mantenimiento']
+LOCATIONS = ['Planta Norte', 'Planta Sur', 'Central']
+JOB_TITLES = ['Operario', 'Supervisor', 'Analista', 'Chofer']
+
+# Argentina es UTC-3 todo el año (sin horario de verano)
+_UTC_OFFSET = timedelta(hours=3)
+
+
+def _utc_time(day: date, minutes: int) -> str:
+    """Hora local (minutos desde la medianoche de day, puede pasar de 24h) → ISO UTC de la API"""
+    moment = datetime(day.year, day.month, day.day) + timedelta(minutes=minutes) + _UTC_OFFSET
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _slot(minutes: int) -> str:
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class SyntheticAttendance:
+    """Empleados y day summaries sintéticos reproducibles"""
+
+    def __init__(self, seed: int = DEFAULT_SEED, days: int = DEFAULT_DAYS,
+                 start: date = date(2025, 1, 1)):
+        self.seed = seed
+        self.days = days
+        self.start = start
+        # Sólo los feriados de la aplicación: el resultado no depende de la máquina
+        self.calendar = WorkCalendar.load([HOLIDAYS_DIRECTORY], saturday_is_workday=False)
+
+    def employees(self, count: int) -> Iterator[Tuple[List[Dict], Dict]]:
+        """(day_summaries, employee_info) de count empleados, de a uno (memoria acotada)"""
+        for index in range(count):
+            yield self.employee(index)
+
+    def employee(self, index: int) -> Tuple[List[Dict], Dict]:
+        rnd = random.Random(self.seed * 1_000_003 + index)
+        employee_id = f"SYN{index:07d}"
+        _, pairs, _ = rnd.choices(PROFILES, weights=[p[2] for p in PROFILES])[0]
+        works_sundays = rnd.random() < 0.1
+
+        employee_info = {
+            'employeeInternalId': employee_id,
+            'firstName': f"Nombre{index}",
+            'lastName': f"Apellido{index}",
+            'department': rnd.choice(DEPARTMENTS),
+            'location': rnd.choice(LOCATIONS),
+            'jobTitle': rnd.choice(JOB_TITLES),
+            'isActive': True,
+        }
+
+        # Cada empleado arranca en otra semana del año para cubrir más feriados
+        first_day = self.start + timedelta(days=(index * 7) % 336)
+        summaries = [
+            self._day_summary(rnd, employee_id, first_day + timedelta(days=offset),
+                              pairs, works_sundays)
+            for offset in range(self.days)
+        ]
+        return summaries, employee_info
+
+    def _day_summary(self, rnd: random.Random, employee_id: str, day: date,
+                     pairs: List[Tuple[int, int]], works_sundays: bool) -> Dict:
+        weekday = day.weekday()
+        holiday_name = self.calendar.holiday_name(day)
+        is_workday = self.calendar.is_workday(day) or (weekday == 6 and works_sundays)
+
+        summary = {
+            'id': f"{employee_id}-{day.isoformat()}",
+            'employeeId': employee_id,
+            'referenceDate': day.isoformat(),
+            'weekday': WEEKDAYS[weekday],
+            'entries': [],
+            'timeSlots': [],
+            'incidences': [],
+            'holidays': [{'name': holiday_name}] if holiday_name else [],
+            'timeOffRequests': [],
+            'isWorkday': is_workday,
+            'hours': {'worked': 0},
+        }
+
+        # Turno del día
+        if weekday == 5:
+            scheduled = [(8 * 60, 13 * 60)]
+        elif weekday == 6 and not works_sundays:
+            scheduled = []
+        else:
+            scheduled = pairs
+        if scheduled:
+            summary['timeSlots'] = [{'startTime': _slot(scheduled[0][0]), 'endTime': _slot(scheduled[-1][1])}]
+
+        # ¿Trabaja? (ausencias, licencias, feriados y fines de semana mayormente libres)
+        roll = rnd.random()
+        if scheduled and not holiday_name and roll < 0.03:
+            summary['incidences'] = ['ABSENCE']
+            return summary
+        if scheduled and roll < 0.05:
+            summary['timeOffRequests'] = [{'name': rnd.choice(['Vacaciones', 'Enfermedad', 'Estudio'])}]
+            return summary
+        works = bool(scheduled) and (not holiday_name or rnd.random() < 0.3)
+        if weekday == 5:
+            works = works and rnd.random() < 0.4
+        if not works:
+            # Algún día libre trabajado igual (guardia)
+            if rnd.random() < 0.02:
+                scheduled = [(10 * 60, 16 * 60)]
+            else:
+                return summary
+
+        # Fichadas con desvíos: llegadas tarde, retiros anticipados, horas extra
+        worked_minutes = 0
+        late = False
+        for pair_index, (start, end) in enumerate(scheduled):
+            start_delta = int(rnd.gauss(0, 8))
+            end_delta = int(rnd.gauss(15, 40)) if pair_index == len(scheduled) - 1 else int(rnd.gauss(0, 5))
+            if rnd.random() < 0.08:
+                start_delta += rnd.randint(10, 45)
+            real_start = start + start_delta
+            real_end = max(real_start + 30, end + end_delta)
+            late = late or start_delta > 10
+
+            summary['entries'].append({'type': 'START', 'time': _utc_time(day, real_start),
+                                       'comment': '', 'site': {'name': 'Sede'}})
+            if rnd.random() < 0.01:
+                continue  # se olvidó de fichar la salida
+            summary['entries'].append({'type': 'END', 'time': _utc_time(day, real_end),
+                                       'comment': rnd.choice(['', '', 'Cierre de turno']),
+                                       'site': {'name': 'Sede'}})
+            worked_minutes += real_end - real_start
+
+        if late:
+            summary['incidences'] = ['LATE']
+        summary['hours'] = {'worked': round(worked_minutes / 60.0, 2)}
+        return summary
+
+
+def generate(employees: int, seed: int = DEFAULT_SEED, days: int = DEFAULT_DAYS) -> Iterator[Tuple[List[Dict], Dict]]:
+    """Atajo: empleados sintéticos con la configuración por defecto"""
+    return SyntheticAttendance(seed, days).employees(employees)
@@ -0,0 +1,299 @@
+"""
+Línea de comandos (headless) del Generador de Reportes de Asistencia
+No importa PyQt: pensado para cron / servidores sin display.
+
+Uso:
+    python src/cli.py report --start 2025-01-01 --end 2025-01-31 --department Ventas
+    python src/cli.py report --start 2025-01-01 --end 2025-03-31 --format parquet
+    python src/cli.py aggregate --start 2024-01-01 --end 2024-12-31 --group-by month --offline
+    python src/cli.py coordinate --start 2025-01-01 --end 2025-01-31 --queue-dir /mnt/compartido/cola
+    python src/cli.py work --queue-dir /mnt/compartido/cola
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+# Agregar el directorio src al path para imports absolutos
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+OUTPUT_FORMATS = ['xlsx', 'xlsxwriter', 'csv', 'parquet']
+SOURCES = ['api', 'warehouse']
+REPORT_OUTPUTS = ['detailed', 'totals', 'payroll_csv']
+GROUP_BY = ['employee', 'department', 'location', 'job_title', 'date', 'month', 'weekday']
+
+
+def add_user_filter_args(parser):
+    parser.add_argument("--department", action="append",
+                        help="Filtrar por departamento (repetible)")
+    parser.add_argument("--location", action="append",
+                        help="Filtrar por ubicación (repetible)")
+    parser.add_argument("--job-title", action="append",
+                        help="Filtrar por puesto (repetible)")
+    parser.add_argument("--user-ids", help="IDs de empleados separados por coma")
+    parser.add_argument("--include-inactive", action="store_true",
+                        help="Incluir usuarios inactivos al filtrar")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera reportes de asistencia sin interfaz gráfica"
+    )
+    parser.add_argument("--api-key", help="API Key de Humand (sin 'Basic')", required=False)
+    parser.add_argument("--quiet", action="store_true",
+                        help="No mostrar el log de procesamiento (stderr)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report = subparsers.add_parser("report", help="Genera un reporte detallado")
+    report.add_argument("--start", required=True, help="Fecha de inicio (YYYY-MM-DD)")
+    report.add_argument("--end", required=True, help="Fecha de fin (YYYY-MM-DD)")
+    add_user_filter_args(report)
+    report.add_argument("--output", "-o",
+                        help="Archivo de salida (por defecto en output_directory)")
+    report.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="Formato de la salida detallada: xlsx, xlsxwriter, csv o parquet "
+                             "(dataset por mes); por defecto output_format")
+    report.add_argument("--streaming", action="store_true",
+                        help="Procesar y escribir a medida que llegan los datos")
+    report.add_argument("--process-pool", action="store_true",
+                        help="Calcular empleados en un pool de procesos")
+    report.add_argument("--source", choices=SOURCES,
+                        help="Origen de los datos (por defecto report_source)")
+    report.add_argument("--outputs", nargs='+', choices=REPORT_OUTPUTS,
+                        help="Salidas a generar en el mismo pase (por defecto report_outputs); "
+                             "las demás se nombran a partir de --output")
+    report.add_argument("--force-rebuild", action="store_true",
+                        help="Regenerar aunque haya un reporte idéntico en el cache de reportes")
+    report.add_argument("--memory-budget-mb", type=float,
+                        help="Presupuesto de memoria para las filas; lo que no entra va a disco "
+                             "(por defecto memory_budget_mb)")
+
+    batch = subparsers.add_parser("batch", help="Genera varios reportes con una sola descarga")
+    batch.add_argument("specs", help="Archivo JSON con la lista de reportes "
+                                     "(start_date, end_date, filters, user_ids, name, output_filename; "
+                                     "rutas relativas a output_directory)")
+    batch.add_argument("--process-pool", action="store_true",
+                       help="Calcular empleados en un pool de procesos")
+    batch.add_argument("--source", choices=SOURCES,
+                       help="Origen de los datos (por defecto report_source)")
+
+    sync = subparsers.add_parser("sync", help="Sincroniza el almacén local con la API (sólo lo que falta)")
+    sync.add_argument("--start", required=True, help="Fecha de inicio (YYYY-MM-DD)")
+    sync.add_argument("--end", required=True, help="Fecha de fin (YYYY-MM-DD)")
+    add_user_filter_args(sync)
+
+    aggregate = subparsers.add_parser("aggregate", help="Totales agrupados desde el almacén local")
+    aggregate.add_argument("--start", required=True, help="Fecha de inicio (YYYY-MM-DD)")
+    aggregate.add_argument("--end", required=True, help="Fecha de fin (YYYY-MM-DD)")
+    aggregate.add_argument("--group-by", choices=GROUP_BY, default="department")
+    aggregate.add_argument("--offline", action="store_true",
+                           help="No sincronizar: consultar sólo lo ya guardado")
+    add_user_filter_args(aggregate)
+
+    coordinate = subparsers.add_parser("coordinate",
+                                       help="Reporte detallado repartido en shards entre workers (modo distribuido)")
+    coordinate.add_argument("--start", required=True, help="Fecha de inicio (YYYY-MM-DD)")
+    coordinate.add_argument("--end", required=True, help="Fecha de fin (YYYY-MM-DD)")
+    add_user_filter_args(coordinate)
+    coordinate.add_argument("--output", "-o",
+                            help="Archivo de salida (por defecto en output_directory)")
+    coordinate.add_argument("--outputs", nargs='+', choices=REPORT_OUTPUTS,
+                            help="Salidas a generar (por defecto report_outputs)")
+    coordinate.add_argument("--format", choices=OUTPUT_FORMATS,
+                            help="Formato de la salida detallada (por defecto output_format)")
+    coordinate.add_argument("--source", choices=SOURCES,
+                            help="Origen de los datos en cada worker (por defecto report_source)")
+    coordinate.add_argument("--queue-dir", help="Directorio compartido de la cola (por defecto distributed_queue_dir)")
+    coordinate.add_argument("--shard-size", type=int,
+                            help="Empleados por shard (por defecto distributed_shard_size)")
+    coordinate.add_argument("--no-work", action="store_true",
+                            help="Sólo coordinar: no calcular shards en esta máquina")
+    coordinate.add_argument("--timeout", type=float,
+                            help="Segundos máximos de espera (por defecto distributed_timeout_seconds)")
+    coordinate.add_argument("--process-pool", action="store_true",
+                            help="Calcular los empleados de cada shard en un pool de procesos")
+
+    work = subparsers.add_parser("work", help="Worker del modo distribuido: procesa shards de la cola")
+    work.add_argument("--queue-dir", help="Directorio compartido de la cola (por defecto distributed_queue_dir)")
+    work.add_argument("--idle-exit", type=float,
+                      help="Terminar tras estos segundos sin trabajo (0 = nunca; "
+                           "por defecto distributed_worker_idle_exit_seconds)")
+    work.add_argument("--max-shards", type=int, help="Terminar después de esta cantidad de shards")
+    work.add_argument("--process-pool", action="store_true",
+                      help="Calcular los empleados de cada shard en un pool de procesos")
+
+    serve = subparsers.add_parser("serve", help="Servicio HTTP local de reportes (cola con prioridades)")
+    serve.add_argument("--host", help="Dirección (por defecto service_host)")
+    serve.add_argument("--port", type=int, help="Puerto (por defecto service_port)")
+    serve.add_argument("--workers", type=int, help="Reportes en paralelo (por defecto service_workers)")
+    return parser.parse_args(argv)
+
+
+def build_user_filters(args) -> dict:
+    """Filtros de usuarios a partir de los argumentos (vacío = todos)"""
+    filters = {}
+    if args.department:
+        filters['department'] = args.department
+    if args.location:
+        filters['location'] = args.location
+    if args.job_title:
+        filters['job_title'] = args.job_title
+    if args.user_ids:
+        filters['user_ids'] = [uid.strip() for uid in args.user_ids.split(',') if uid.strip()]
+    if filters:
+        filters['active_only'] = not args.include_inactive
+    return filters
+
+
+def run_report(args, processor) -> dict:
+    """Ejecuta el subcomando report y devuelve el resumen JSON"""
+    from config.default_config import DEFAULT_CONFIG
+    validation = processor.validate_date_range(args.start, args.end)
+    if not validation['is_valid']:
+        return {'success': False, 'error': '; '.join(validation['errors']), 'stage': 'validation'}
+
+    filters = build_user_filters(args)
+    user_ids = None
+    if filters:
+        user_ids = processor.select_user_ids(filters)
+        if not user_ids:
+            return {'success': False, 'error': 'Ningún empleado cumple los filtros',
+                    'stage': 'filters', 'filters': filters}
+
+    result = processor.process_attendance_report_detailed(
+        args.start, args.end, user_ids,
+        use_process_pool=True if args.process_pool else None,
+        streaming=True if args.streaming else None,
+        output_filename=os.path.abspath(args.output) if args.output else None,
+        source=args.source,
+        memory_budget_mb=args.memory_budget_mb,
+        outputs=args.outputs,
+        force_rebuild=args.force_rebuild,
+        output_format=args.format
+    )
+    result.pop('columnar_store', None)
+    result['output_path'] = result.pop('excel_path', None)
+    result['output_format'] = args.format or DEFAULT_CONFIG['output_format']
+    result['warnings'] = validation['warnings']
+    return result
+
+
+def run_batch(args, processor) -> dict:
+    """Ejecuta el subcomando batch y devuelve el resumen JSON"""
+    with open(args.specs, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    if isinstance(specs, dict):
+        specs = specs.get('reports', [])
+
+    result = processor.process_attendance_reports_batch(
+        specs, use_process_pool=True if args.process_pool else None, source=args.source
+    )
+    for report in result.get('reports', []):
+        report['output_path'] = report.pop('excel_path', None)
+    return result
+
+
+def run_sync(args, processor) -> dict:
+    """Ejecuta el subcomando sync y devuelve el resumen JSON"""
+    result = processor.sync_warehouse(args.start, args.end, build_user_filters(args))
+    result['success'] = True
+    return result
+
+
+def run_aggregate(args, processor) -> dict:
+    """Ejecuta el subcomando aggregate y devuelve las filas agrupadas"""
+    rows = processor.aggregate_attendance(args.start, args.end, args.group_by,
+                                          build_user_filters(args), sync=not args.offline)
+    return {'success': True, 'group_by': args.group_by, 'rows': rows}
+
+
+def run_coordinate(args, processor) -> dict:
+    """Ejecuta el subcomando coordinate y devuelve el resumen JSON"""
+    validation = processor.validate_date_range(args.start, args.end)
+    if not validation['is_valid']:
+        return {'success': False, 'error': '; '.join(validation['errors']), 'stage': 'validation'}
+
+    filters = build_user_filters(args)
+    user_ids = None
+    if filters:
+        user_ids = processor.select_user_ids(filters)
+        if not user_ids:
+            return {'success': False, 'error': 'Ningún empleado cumple los filtros',
+                    'stage': 'filters', 'filters': filters}
+
+    result = processor.process_attendance_report_distributed(
+        args.start, args.end, user_ids,
+        output_filename=os.path.abspath(args.output) if args.output else None,
+        outputs=args.outputs,
+        source=args.source,
+        shard_size=args.shard_size,
+        queue_dir=args.queue_dir,
+        participate=not args.no_work,
+        use_process_pool=True if args.process_pool else None,
+        timeout_seconds=args.timeout,
+        output_format=args.format
+    )
+    result['output_path'] = result.pop('excel_path', None)
+    result['warnings'] = validation['warnings']
+    return result
+
+
+def run_work(args, processor) -> dict:
+    """Ejecuta el worker distribuido hasta quedarse sin trabajo (o Ctrl+C)"""
+    return processor.run_distributed_worker(
+        args.queue_dir, args.idle_exit, args.max_shards,
+        use_process_pool=True if args.process_pool else None
+    )
+
+
+def run_serve(args, processor) -> dict:
+    """Ejecuta el servicio local hasta Ctrl+C"""
+    from core.report_service import serve
+    return serve(processor, args.host, args.port, args.workers)
+
+
+COMMANDS = {
+    'report': run_report,
+    'batch': run_batch,
+    'serve': run_serve,
+    'sync': run_sync,
+    'aggregate': run_aggregate,
+    'coordinate': run_coordinate,
+    'work': run_work,
+}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Imports pesados recién después de parsear (--help inmediato, sin Qt)
+    from config.default_config import DEFAULT_CONFIG
+
+    api_key = args.api_key or os.getenv("HUMAND_API_KEY") or DEFAULT_CONFIG.get('api_key')
+    if not api_key:
+        print(json.dumps({'success': False, 'error': 'Falta la API key (--api-key o HUMAND_API_KEY)',
+                          'stage': 'config'}))
+        return 2
+    DEFAULT_CONFIG['api_key'] = api_key
+
+    # El log de los módulos va a stderr: stdout queda reservado para el JSON
+    log_stream = open(os.devnull, 'w') if args.quiet else sys.stderr
+    with contextlib.redirect_stdout(log_stream):
+        from core.data_processor import DataProcessorEnhanced
+
+        processor = DataProcessorEnhanced()
+        try:
+            result = COMMANDS[args.command](args, processor)
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'stage': args.command}
+        finally:
+            processor.shutdown()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    return 0 if result.get('success') else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
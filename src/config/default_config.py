@@ -3,51 +3,6 @@ Configuración por defecto del sistema
 Valores heredados del proyecto anterior Horas-cat-v3
 """
 
-# --- Feriados 2025 (Argentina) ---
-HOLIDAYS_2025 = [
-    "2025-01-01",  # Año Nuevo
-    "2025-03-03",  # Carnaval
-    "2025-03-04",  # Carnaval
-    "2025-03-24",  # Día de la Memoria
-    "2025-04-02",  # Malvinas
-    "2025-04-18",  # Viernes Santo
-    "2025-04-24",  # Tolerancia y Respeto
-    "2025-05-01",  # Trabajo
-    "2025-05-25",  # Primer Gobierno Patrio
-    "2025-06-16",  # Güemes
-    "2025-06-20",  # Belgrano
-    "2025-07-09",  # Independencia
-    "2025-08-17",  # San Martín
-    "2025-09-04",  # Día del Animal
-    "2025-09-11",  # Prueba
-    "2025-09-26",  # Empleado de Comercio
-    "2025-10-12",  # Diversidad Cultural
-    "2025-11-24",  # Soberanía Nacional
-    "2025-12-08",  # Inmaculada Concepción
-    "2025-12-25",  # Navidad
-]
-
-HOLIDAY_NAMES_2025 = {
-    "2025-01-01": "Año Nuevo",
-    "2025-03-03": "Carnaval",
-    "2025-03-04": "Carnaval",
-    "2025-03-24": "Día Nacional de la Memoria por la Verdad y la Justicia",
-    "2025-04-02": "Día del Veterano y de los Caídos en la Guerra de Malvinas",
-    "2025-04-18": "Viernes Santo",
-    "2025-04-24": "Día de acción por la tolerancia y el respeto entre los pueblos",
-    "2025-05-01": "Día del Trabajo",
-    "2025-05-25": "Primer Gobierno Patrio",
-    "2025-06-16": "Conmemoración de General Don Martín Miguel de Güemes",
-    "2025-06-20": "Paso a la Inmortalidad del General Manuel Belgrano",
-    "2025-07-09": "Día de la Independencia",
-    "2025-08-17": "Paso a la Inmortalidad del General José de San Martín",
-    "2025-09-26": "Día del Empleado de Comercio",
-    "2025-10-12": "Día de la Diversidad Cultural",
-    "2025-11-24": "Día de la Soberanía Nacional",
-    "2025-12-08": "Inmaculada Concepción de María",
-    "2025-12-25": "Navidad"
-}
-
 DEFAULT_CONFIG = {
     # API
     "base_url": "https://api-prod.humand.co/public/api/v1",
@@ -72,6 +27,9 @@ DEFAULT_CONFIG = {
     # Configuración opcional
     "saturday_is_workday": False,  # <--- NUEVO flag: True si el sábado se considera laborable
 
+    # Reglas laborales (variante de config/labor_rules.py)
+    "labor_rules_variant": "general",
+
     # Red/Requests
     "max_retries": 3,
     "retry_delay": 1000,
@@ -84,18 +42,104 @@ DEFAULT_CONFIG = {
     "delay_between_retries": 1000,
     "delay_between_batches": 500,
 
+    # Procesamiento multiproceso (cálculo de horas por empleado)
+    "process_pool_enabled": False,
+    "process_pool_workers": 0,         # 0 = os.cpu_count()
+    "process_pool_shard_size": 25,     # empleados por shard
+    "process_pool_min_employees": 40,  # por debajo se procesa en el proceso principal
+
+    # Distribución de horas vectorizada (requiere NumPy)
+    "vectorized_hours_enabled": False,
+
+    # Streaming (fetch → cálculo → escritura en paralelo, memoria acotada)
+    "streaming_enabled": False,
+    "stream_queue_size": 32,           # empleados en vuelo entre cálculo y escritura
+
+    # Presupuesto de memoria (MB) para las filas del reporte; 0 = sin límite.
+    # Con presupuesto el reporte va en streaming y las filas que no entran se bajan
+    # comprimidas a spill_directory (vacío = directorio temporal del sistema)
+    "memory_budget_mb": 0,
+    "spill_directory": "",
+
+    # Backend de la hoja detallada: "write_only" (openpyxl write-only con estilos con nombre,
+    # memoria constante) o "standard" (workbook openpyxl normal)
+    "excel_backend": "write_only",
+
+    # Formato de la salida detallada: "xlsx" (según excel_backend), "xlsxwriter" (requiere
+    # XlsxWriter), "csv" o "parquet" (dataset particionado por mes, requiere pyarrow)
+    "output_format": "xlsx",
+    "detailed_csv_delimiter": ";",
+
+    # Salidas de cada reporte (un solo pase): "detailed", "totals", "payroll_csv"
+    "report_outputs": ["detailed"],
+    "payroll_csv_delimiter": ";",
+    "payroll_csv_decimal": ",",
+
+    # Cache de reportes completos: si los datos descargados no cambiaron se devuelve el
+    # archivo anterior sin recalcular ni escribir. reuse_seconds > 0 además devuelve el
+    # mismo pedido sin descargar nada dentro de ese plazo (no ve correcciones recientes)
+    "report_cache_enabled": True,
+    "report_cache_reuse_seconds": 0,
+    "report_cache_max_entries": 50,
+
+    # Store columnar (NumPy) con los employee-days en el resultado del reporte
+    "columnar_store_enabled": False,
+
+    # Memo del cálculo por empleado (no recalcula empleados con entradas idénticas)
+    "employee_memo_enabled": True,
+    "employee_memo_max_mb": 64,          # LRU en memoria (resultados comprimidos; 0 = sólo disco)
+    "employee_memo_disk_enabled": False, # también en cache_directory/employee_memo
+
+    # Libro de horas pendientes: cada período cerrado arranca con el saldo del anterior
+    "pending_ledger_enabled": False,
+    "pending_ledger_max_periods": 36,    # períodos guardados por empleado
+
+    # Almacén local SQLite (report_source "warehouse": reportes desde consultas locales)
+    "report_source": "api",              # "api" o "warehouse"
+    "warehouse_path": "",                # vacío = cache_directory/warehouse_<tenant>.sqlite3
+    "warehouse_reopen_days": 3,          # últimos días de cada descarga que se vuelven a pedir
+    "warehouse_permissions_max_age_seconds": 3600,
+
+    # Modo distribuido (python src/cli.py coordinate / work): cola SQLite en un directorio
+    # que vean todas las máquinas (vacío = cache_directory/distributed, sólo esta máquina)
+    "distributed_queue_dir": "",
+    "distributed_shard_size": 200,               # empleados por shard
+    "distributed_lease_seconds": 600,            # shard tomado y no terminado vuelve a la cola
+    "distributed_max_attempts": 3,
+    "distributed_poll_seconds": 2,
+    "distributed_timeout_seconds": 0,            # espera máxima del coordinador (0 = sin límite)
+    "distributed_worker_idle_exit_seconds": 0,   # el worker termina tras este tiempo sin trabajo (0 = nunca)
+
+    # Monitor en vivo (quién está fichado hoy, sin generar archivos)
+    "live_poll_seconds": 60,
+    "live_settled_refresh_seconds": 900,  # empleados ya resueltos (salieron, franco) se revisan cada tanto
+    "live_late_grace_minutes": 10,        # tolerancia sobre el inicio del turno
+    "live_absent_after_minutes": 60,      # sin fichar pasado este tiempo del inicio del turno = ausente
+
+    # Cache de permisos entre reportes (segundos, 0 = descargar siempre)
+    "permissions_cache_seconds": 0,
+
+    # Servicio local de reportes (python src/cli.py serve)
+    "service_host": "127.0.0.1",
+    "service_port": 8765,
+    "service_workers": 2,
+    "service_interactive_max_rows": 3000,      # empleados x días; hasta acá el job es interactivo
+    "service_permissions_cache_seconds": 300,
+    "service_output_directory": "~/.generador_reportes/servicio",
+
     # Archivos
     "output_directory": "~/Downloads",
     "filename_format": "reporte_{start_date}_{end_date}.xlsx",
+    "cache_directory": "~/.generador_reportes",  # datos persistidos entre ejecuciones
 
     # UI
     "window_width": 800,
     "window_height": 600,
     "theme": "default",
 
-    # Feriados
-    "holidays": HOLIDAYS_2025,
-    "holiday_names": HOLIDAY_NAMES_2025,
+    # Feriados: un JSON por año en config/holidays (ver core/holiday_calendar.py);
+    # los archivos de este directorio agregan o reemplazan fechas
+    "extra_holidays_directory": "~/.generador_reportes/feriados",
 }
 
 # Headers API
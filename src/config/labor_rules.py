@@ -0,0 +1,49 @@
+"""
+Reglas laborales como datos
+Cada variante (convenio) define, por clase de día, el modo de cálculo y sus
+umbrales. core/labor_rules.py las compila una sola vez en tablas y closures.
+
+Clases de día:
+    feriado                 se aplica siempre que el día es feriado
+    dias_semana[0..6]       clase de cada día de la semana (0=Lunes ... 6=Domingo)
+    si_no_laborable         clase alternativa cuando el day summary no es laborable
+
+Modos:
+    todo_100                todas las horas al 100%
+    por_turno               regulares dentro del turno, después del turno al 100%
+                            (se reescala si difiere de las horas trabajadas en más de 'tolerancia_reescalado')
+    sabado_bandas           base al 100% con descuentos por bandas de tardanza / retiro
+                            anticipado y bonificación por quedarse después de 'fin';
+                            sin fichadas: jornada regular y el resto al 100%
+    jornada_y_extras        hasta la jornada regular (resto pendiente), 'tope_extras_50'
+                            al 50% y el resto al 100%
+
+Bandas: [[minutos, horas], ...]; aplica la primera cuyo umbral se supera (minutos > umbral).
+Si la variante no define 'jornada_horas' o 'nocturna' se usan los valores de DEFAULT_CONFIG.
+"""
+
+LABOR_RULES = {
+    "general": {
+        "descripcion": "Reglas v.2.0 (feriados y domingos al 100%, sábados por bandas)",
+        "dias_semana": ["semana", "semana", "semana", "semana", "semana", "sabado", "domingo"],
+        "clases": {
+            "feriado": {"modo": "todo_100"},
+            "domingo": {
+                "modo": "por_turno",
+                "tolerancia_reescalado": 0.01,
+                "si_no_laborable": "domingo_no_laborable",
+            },
+            "domingo_no_laborable": {"modo": "todo_100"},
+            "sabado": {
+                "modo": "sabado_bandas",
+                "inicio": "08:00",
+                "fin": "13:00",
+                "base_horas_100": 4.0,
+                "tardanza": [[30, 1.0], [6, 0.5]],
+                "retiro_anticipado": [[30, 1.0], [6, 0.5]],
+                "extra_posterior": [[60, 1.0], [30, 0.5]],
+            },
+            "semana": {"modo": "jornada_y_extras", "tope_extras_50": 2.0},
+        },
+    },
+}
@@ -4,27 +4,36 @@ Maneja todas las comunicaciones con la API externa
 """
 
 import requests
+import threading
 import time
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from config.default_config import DEFAULT_CONFIG, get_api_headers, API_ENDPOINTS
 
 
 class HumanApiClient:
     """Cliente para interactuar con la API de Human.co"""
     
-    def __init__(self, api_key: str = None, base_url: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 users_provider: Callable[[], List[Dict]] = None):
         self.api_key = api_key or DEFAULT_CONFIG['api_key']
         self.base_url = base_url or DEFAULT_CONFIG['base_url']
         self.session = requests.Session()
         self.session.headers.update(get_api_headers(self.api_key))
         
+        # Fuente de usuarios cacheada (evita re-descargar el directorio completo)
+        self.users_provider = users_provider
+        
         # Configuración de timeouts y reintentos
         self.max_retries = DEFAULT_CONFIG['max_retries']
         self.retry_delay = DEFAULT_CONFIG['retry_delay'] / 1000  # Convertir a segundos
         self.timeout = DEFAULT_CONFIG['request_timeout'] / 1000  # Convertir a segundos
+        
+        # Requests HTTP hechos (incluye reintentos); sirve para medir el costo de cada consulta
+        self.request_count = 0
+        self._request_count_lock = threading.Lock()
     
     def test_connection(self) -> Tuple[bool, str]:
         """
@@ -133,43 +142,10 @@ class HumanApiClient:
             Lista de resúmenes diarios
         """
         try:
-            # Lotes más grandes para mejor rendimiento
-            BATCH_SIZE = 15
             all_items = []
             
-            if not user_ids:
-                # Si no hay user_ids específicos, obtener todos los usuarios
-                users = self.get_users()
-                user_ids = [u.get('employeeInternalId') for u in users if u.get('employeeInternalId')]
-            
-            print(f"📋 Procesando {len(user_ids)} empleados en lotes de {BATCH_SIZE}...")
-            
-            # Crear lotes
-            batches = []
-            for i in range(0, len(user_ids), BATCH_SIZE):
-                batch = user_ids[i:i + BATCH_SIZE]
-                batches.append({
-                    'batch_number': (i // BATCH_SIZE) + 1,
-                    'user_ids': batch,
-                    'start_date': start_date,
-                    'end_date': end_date
-                })
-            
-            # Procesar lotes en paralelo
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                future_to_batch = {
-                    executor.submit(self._process_batch_summaries, batch): batch 
-                    for batch in batches
-                }
-                
-                for future in as_completed(future_to_batch):
-                    batch = future_to_batch[future]
-                    try:
-                        batch_items = future.result()
-                        all_items.extend(batch_items)
-                        print(f"✅ Lote {batch['batch_number']}: {len(batch_items)} day summaries")
-                    except Exception as e:
-                        print(f"❌ Error en lote {batch['batch_number']}: {str(e)}")
+            for batch_items in self.iter_day_summaries(start_date, end_date, user_ids):
+                all_items.extend(batch_items['items'])
             
             print(f"✅ Obtenidos {len(all_items)} resúmenes diarios")
             return all_items
@@ -178,6 +154,73 @@ class HumanApiClient:
             print(f"❌ Error obteniendo resúmenes diarios: {str(e)}")
             return []
     
+    def iter_day_summaries(self, start_date: str, end_date: str,
+                           user_ids: List[str] = None) -> Iterator[Dict]:
+        """
+        Genera los day summaries lote a lote, a medida que cada lote termina de descargarse
+        Cada lote cubre el rango completo de fechas para sus empleados, por lo que
+        al recibirlo los datos de esos empleados ya están completos.
+        Yields:
+            {'batch_number', 'total_batches', 'user_ids', 'items'}
+        """
+        # Lotes más grandes para mejor rendimiento
+        BATCH_SIZE = 15
+        
+        if not user_ids:
+            # Si no hay user_ids específicos, obtener todos los usuarios (cache si existe)
+            users = self.users_provider() if self.users_provider else self.get_users()
+            user_ids = [u.get('employeeInternalId') for u in users if u.get('employeeInternalId')]
+        
+        print(f"📋 Procesando {len(user_ids)} empleados en lotes de {BATCH_SIZE}...")
+        
+        # Crear lotes
+        batches = []
+        for i in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[i:i + BATCH_SIZE]
+            batches.append({
+                'batch_number': (i // BATCH_SIZE) + 1,
+                'user_ids': batch,
+                'start_date': start_date,
+                'end_date': end_date
+            })
+        
+        # Procesar lotes en paralelo con una ventana acotada de lotes en vuelo: se envían
+        # más a medida que se consumen, así un consumidor lento no acumula todos los lotes
+        # en memoria y cortar el generador no espera a que se descarguen todos
+        max_workers = 3
+        window = max_workers * 2
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        future_to_batch = {}
+        next_batch = 0
+        try:
+            while future_to_batch or next_batch < len(batches):
+                while next_batch < len(batches) and len(future_to_batch) < window:
+                    batch = batches[next_batch]
+                    future_to_batch[executor.submit(self._process_batch_summaries, batch)] = batch
+                    next_batch += 1
+
+                done, _ = wait(future_to_batch, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = future_to_batch.pop(future)
+                    try:
+                        batch_items = future.result()
+                    except Exception as e:
+                        print(f"❌ Error en lote {batch['batch_number']}: {str(e)}")
+                        continue
+
+                    print(f"✅ Lote {batch['batch_number']}: {len(batch_items)} day summaries")
+                    yield {
+                        'batch_number': batch['batch_number'],
+                        'total_batches': len(batches),
+                        'user_ids': batch['user_ids'],
+                        'items': batch_items
+                    }
+        finally:
+            # Si el consumidor corta antes: descartar los lotes que no empezaron y no esperar los que corren
+            for future in future_to_batch:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
     def _process_batch_summaries(self, batch: Dict) -> List[Dict]:
         """
         Procesa un lote de usuarios para obtener day summaries
@@ -303,6 +346,8 @@ class HumanApiClient:
         print(url)
         
         for attempt in range(self.max_retries):
+            with self._request_count_lock:
+                self.request_count += 1
             try:
                 if method.upper() == 'GET':
                     response = self.session.get(url, params=params, timeout=self.timeout)
@@ -0,0 +1,424 @@
+"""
+Almacén local de asistencia (SQLite)
+Tablas normalizadas de empleados, day summaries, fichadas y permisos indexadas por
+(empleado, fecha). La sincronización es incremental: sólo se descargan de la API los
+rangos de fechas que cada empleado todavía no tiene o que siguen "abiertos" (los
+últimos warehouse_reopen_days días de una descarga pueden cambiar por fichadas
+corregidas y se vuelven a pedir).
+
+Los day summaries se reconstruyen con el mismo formato que devuelve la API, así que el
+calculador y el Excel no distinguen el origen: get_day_summaries / iter_day_summaries
+tienen la misma firma que en HumanApiClient.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config.default_config import DEFAULT_CONFIG
+
+SCHEMA_VERSION = 1
+
+# Límite de parámetros por consulta (SQLite acepta 999 en versiones viejas)
+_IN_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS employees (
+    employee_id TEXT PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    department TEXT,
+    location TEXT,
+    job_title TEXT,
+    is_active INTEGER,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS day_summaries (
+    employee_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    summary_id TEXT,
+    weekday TEXT,
+    is_workday INTEGER,
+    hours_worked REAL,
+    total_hours REAL,
+    hours TEXT,
+    time_slots TEXT,
+    incidences TEXT,
+    holidays TEXT,
+    time_off_requests TEXT,
+    PRIMARY KEY (employee_id, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    employee_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    time TEXT,
+    type TEXT,
+    comment TEXT,
+    site TEXT,
+    PRIMARY KEY (employee_id, date, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS permissions (
+    permission_id INTEGER PRIMARY KEY,
+    employee_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS permissions_employee ON permissions (employee_id);
+CREATE TABLE IF NOT EXISTS sync_coverage (
+    employee_id TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    synced_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sync_coverage_employee ON sync_coverage (employee_id, start_date);
+"""
+
+# Agrupaciones disponibles para aggregate()
+GROUP_COLUMNS = {
+    'employee': 'd.employee_id',
+    'department': "COALESCE(e.department, '')",
+    'location': "COALESCE(e.location, '')",
+    'job_title': "COALESCE(e.job_title, '')",
+    'date': 'd.date',
+    'month': 'substr(d.date, 1, 7)',
+    'weekday': 'd.weekday',
+}
+
+
+def _json(value) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _chunks(values: List, size: int = _IN_CHUNK):
+    for position in range(0, len(values), size):
+        yield values[position:position + size]
+
+
+def _day(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+
+def subtract_intervals(start: date, end: date, covered: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """Partes de [start, end] que no cubre ningún intervalo de covered"""
+    missing = []
+    cursor = start
+    for covered_start, covered_end in sorted(covered):
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, min(end, covered_start - timedelta(days=1))))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+class AttendanceWarehouse:
+    """Almacén SQLite de asistencia con sincronización incremental desde la API"""
+
+    def __init__(self, api_client=None, path: str = None, api_key: str = None, base_url: str = None):
+        self.api_client = api_client
+        self.reopen_days = DEFAULT_CONFIG['warehouse_reopen_days']
+
+        if path is None:
+            path = DEFAULT_CONFIG['warehouse_path']
+        if not path:
+            # Un archivo por tenant, igual que el directorio de usuarios
+            api_key = api_key or (api_client.api_key if api_client else '')
+            base_url = base_url or (api_client.base_url if api_client else DEFAULT_CONFIG['base_url'])
+            tenant_hash = hashlib.sha1(f"{base_url}|{api_key or ''}".encode('utf-8')).hexdigest()[:12]
+            path = os.path.join(DEFAULT_CONFIG['cache_directory'], f"warehouse_{tenant_hash}.sqlite3")
+        self.path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+            self._connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                                     (str(SCHEMA_VERSION),))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    # --- Sincronización ---
+
+    def missing_ranges(self, start_date: str, end_date: str, user_ids: List[str],
+                       today: date = None) -> Dict[Tuple[str, str], List[str]]:
+        """
+        Rangos que falta descargar, agrupados para pedirlos juntos
+        Returns:
+            {(start, end): [employee_ids]}
+        """
+        today = today or date.today()
+        start, end = _day(start_date), _day(end_date)
+        covered: Dict[str, List[Tuple[date, date]]] = {employee_id: [] for employee_id in user_ids}
+        with self._lock:
+            for chunk in _chunks(list(user_ids)):
+                rows = self._connection.execute(
+                    f"SELECT employee_id, start_date, end_date, synced_at FROM sync_coverage "
+                    f"WHERE employee_id IN ({','.join('?' * len(chunk))}) AND start_date <= ? AND end_date >= ?",
+                    (*chunk, end_date, start_date)
+                ).fetchall()
+                for employee_id, covered_start, covered_end, synced_at in rows:
+                    # Los últimos días de cada descarga quedan abiertos
+                    final_until = min(_day(covered_end), _day(synced_at) - timedelta(days=self.reopen_days))
+                    if final_until >= _day(covered_start):
+                        covered[employee_id].append((_day(covered_start), final_until))
+
+        grouped: Dict[Tuple[str, str], List[str]] = {}
+        for employee_id in user_ids:
+            for missing_start, missing_end in subtract_intervals(start, min(end, today), covered[employee_id]):
+                grouped.setdefault((missing_start.isoformat(), missing_end.isoformat()), []).append(employee_id)
+        return grouped
+
+    def sync(self, start_date: str, end_date: str, user_ids: List[str]) -> Dict:
+        """
+        Descarga de la API sólo lo que falta del rango para los empleados indicados
+        Returns:
+            {'fetched_ranges', 'fetched_day_summaries', 'employees'}
+        """
+        if self.api_client is None:
+            raise ValueError("El almacén no tiene cliente de API para sincronizar")
+
+        missing = self.missing_ranges(start_date, end_date, user_ids)
+        fetched = 0
+        for (range_start, range_end), employee_ids in sorted(missing.items()):
+            print(f"🔄 Sincronizando {range_start} → {range_end} ({len(employee_ids)} empleados)")
+            for batch in self.api_client.iter_day_summaries(range_start, range_end, employee_ids):
+                self.store_day_summaries(range_start, range_end, batch['user_ids'], batch['items'])
+                fetched += len(batch['items'])
+
+        if missing:
+            print(f"🗄️ Almacén local: {fetched} day summaries descargados en {len(missing)} rangos")
+        else:
+            print("🗄️ Almacén local al día, sin descargas")
+        return {'fetched_ranges': len(missing), 'fetched_day_summaries': fetched, 'employees': len(user_ids)}
+
+    def store_day_summaries(self, start_date: str, end_date: str, user_ids: List[str],
+                            summaries: List[Dict], synced_at: str = None):
+        """Reemplaza los datos de (empleados, rango) por una descarga completa de ese rango"""
+        synced_at = synced_at or datetime.now().isoformat(timespec='seconds')
+        day_rows = []
+        entry_rows = []
+        for summary in summaries:
+            employee_id = summary.get('employeeId')
+            summary_date = summary.get('referenceDate', summary.get('date'))
+            if not employee_id or not summary_date:
+                continue
+            hours = summary.get('hours')
+            day_rows.append((
+                employee_id, summary_date, summary.get('id'), summary.get('weekday'),
+                None if 'isWorkday' not in summary else int(bool(summary['isWorkday'])),
+                (hours or {}).get('worked', 0) or summary.get('totalHours', 0) or 0,
+                summary.get('totalHours'),
+                _json(hours), _json(summary.get('timeSlots')), _json(summary.get('incidences')),
+                _json(summary.get('holidays')), _json(summary.get('timeOffRequests')),
+            ))
+            for seq, entry in enumerate(summary.get('entries') or []):
+                entry_rows.append((employee_id, summary_date, seq, entry.get('time'), entry.get('type'),
+                                   entry.get('comment'), _json(entry.get('site'))))
+
+        with self._lock, self._connection:
+            for chunk in _chunks(list(user_ids)):
+                placeholders = ','.join('?' * len(chunk))
+                for table in ('day_summaries', 'entries'):
+                    self._connection.execute(
+                        f"DELETE FROM {table} WHERE employee_id IN ({placeholders}) AND date BETWEEN ? AND ?",
+                        (*chunk, start_date, end_date)
+                    )
+                # Coberturas viejas contenidas en la nueva descarga ya no aportan nada
+                self._connection.execute(
+                    f"DELETE FROM sync_coverage WHERE employee_id IN ({placeholders}) "
+                    f"AND start_date >= ? AND end_date <= ?",
+                    (*chunk, start_date, end_date)
+                )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO day_summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", day_rows
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", entry_rows
+            )
+            self._connection.executemany(
+                "INSERT INTO sync_coverage VALUES (?, ?, ?, ?)",
+                [(employee_id, start_date, end_date, synced_at) for employee_id in user_ids]
+            )
+
+    def store_employees(self, users: List[Dict]):
+        """Actualiza la tabla de empleados con el directorio de usuarios"""
+        updated_at = datetime.now().isoformat(timespec='seconds')
+        rows = [(u.get('employeeInternalId'), u.get('firstName'), u.get('lastName'), u.get('department'),
+                 u.get('location'), u.get('jobTitle'), int(bool(u.get('isActive', True))), updated_at)
+                for u in users if u.get('employeeInternalId')]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO employees VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def store_permissions(self, permissions: List[Dict]):
+        """Reemplaza los permisos (la fuente siempre devuelve el listado completo)"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM permissions")
+            self._connection.executemany(
+                "INSERT INTO permissions (employee_id, data) VALUES (?, ?)",
+                [(p.get('employeeInternalId'), _json(p)) for p in permissions]
+            )
+            self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('permissions_synced_at', ?)",
+                                     (datetime.now().isoformat(timespec='seconds'),))
+
+    def permissions_age_seconds(self) -> Optional[float]:
+        """Segundos desde la última sincronización de permisos (None si nunca)"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'permissions_synced_at'"
+            ).fetchone()
+        if not row:
+            return None
+        return (datetime.now() - datetime.fromisoformat(row[0])).total_seconds()
+
+    # --- Lectura ---
+
+    def get_permissions(self) -> List[Dict]:
+        with self._lock:
+            return [json.loads(data) for (data,) in
+                    self._connection.execute("SELECT data FROM permissions ORDER BY permission_id")]
+
+    def get_day_summaries(self, start_date: str, end_date: str, user_ids: List[str] = None) -> List[Dict]:
+        """Day summaries locales con el formato de la API (empleados en el orden de user_ids)"""
+        items = []
+        for batch in self.iter_day_summaries(start_date, end_date, user_ids):
+            items.extend(batch['items'])
+        return items
+
+    def iter_day_summaries(self, start_date: str, end_date: str, user_ids: List[str] = None,
+                           batch_size: int = 50) -> Iterator[Dict]:
+        """Mismo contrato que HumanApiClient.iter_day_summaries, leyendo del almacén"""
+        if not user_ids:
+            with self._lock:
+                user_ids = [row[0] for row in self._connection.execute(
+                    "SELECT DISTINCT employee_id FROM day_summaries WHERE date BETWEEN ? AND ? ORDER BY employee_id",
+                    (start_date, end_date))]
+        batches = list(_chunks(list(user_ids), batch_size))
+        for batch_number, batch_ids in enumerate(batches, 1):
+            yield {
+                'batch_number': batch_number,
+                'total_batches': len(batches),
+                'user_ids': batch_ids,
+                'items': self._read_summaries(start_date, end_date, batch_ids),
+            }
+
+    def _read_summaries(self, start_date: str, end_date: str, user_ids: List[str]) -> List[Dict]:
+        placeholders = ','.join('?' * len(user_ids))
+        params = (*user_ids, start_date, end_date)
+        with self._lock:
+            day_rows = self._connection.execute(
+                f"SELECT employee_id, date, summary_id, weekday, is_workday, total_hours, hours, time_slots, "
+                f"incidences, holidays, time_off_requests FROM day_summaries "
+                f"WHERE employee_id IN ({placeholders}) AND date BETWEEN ? AND ?", params
+            ).fetchall()
+            entry_rows = self._connection.execute(
+                f"SELECT employee_id, date, time, type, comment, site FROM entries "
+                f"WHERE employee_id IN ({placeholders}) AND date BETWEEN ? AND ? ORDER BY employee_id, date, seq",
+                params
+            ).fetchall()
+
+        entries: Dict[Tuple[str, str], List[Dict]] = {}
+        for employee_id, entry_date, time, entry_type, comment, site in entry_rows:
+            entry = {'time': time, 'type': entry_type, 'comment': comment}
+            if site is not None:
+                entry['site'] = json.loads(site)
+            entries.setdefault((employee_id, entry_date), []).append(entry)
+
+        by_employee: Dict[str, List[Dict]] = {}
+        for (employee_id, summary_date, summary_id, weekday, is_workday, total_hours, hours,
+             time_slots, incidences, holidays, time_off_requests) in day_rows:
+            summary = {
+                'id': summary_id,
+                'employeeId': employee_id,
+                'referenceDate': summary_date,
+                'entries': entries.get((employee_id, summary_date), []),
+            }
+            if weekday is not None:
+                summary['weekday'] = weekday
+            for key, value in (('hours', hours), ('timeSlots', time_slots), ('incidences', incidences),
+                               ('holidays', holidays), ('timeOffRequests', time_off_requests)):
+                if value is not None:
+                    summary[key] = json.loads(value)
+            if total_hours is not None:
+                summary['totalHours'] = total_hours
+            if is_workday is not None:
+                summary['isWorkday'] = bool(is_workday)
+            by_employee.setdefault(employee_id, []).append(summary)
+
+        items = []
+        for employee_id in user_ids:
+            items.extend(sorted(by_employee.get(employee_id, []), key=lambda s: s['referenceDate']))
+        return items
+
+    def aggregate(self, start_date: str, end_date: str, group_by: str = 'department',
+                  user_ids: List[str] = None) -> List[Dict]:
+        """
+        Totales por grupo directamente en SQL (employee, department, location,
+        job_title, date, month, weekday)
+        Returns:
+            [{'group', 'employees', 'days', 'days_worked', 'hours_worked', 'absences', 'clock_entries'}]
+        """
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Agrupación inválida: {group_by} (opciones: {', '.join(GROUP_COLUMNS)})")
+        # Cada empleado cae en un solo lote, así que los conteos por lote se pueden sumar
+        # (incluido COUNT(DISTINCT employee_id)); sin filtro es una sola consulta
+        batches = list(_chunks(list(dict.fromkeys(user_ids)))) if user_ids else [None]
+        totals: Dict = {}
+        with self._lock:
+            for batch_ids in batches:
+                where = "d.date BETWEEN ? AND ?"
+                params: List = [start_date, end_date]
+                if batch_ids:
+                    where += f" AND d.employee_id IN ({','.join('?' * len(batch_ids))})"
+                    params.extend(batch_ids)
+                sql = f"""
+                    SELECT {GROUP_COLUMNS[group_by]} AS grp,
+                           COUNT(DISTINCT d.employee_id),
+                           COUNT(*),
+                           SUM(CASE WHEN d.hours_worked > 0 THEN 1 ELSE 0 END),
+                           SUM(d.hours_worked),
+                           SUM(CASE WHEN d.incidences LIKE '%"ABSENCE"%' OR d.incidences LIKE '%"ABSENT"%' THEN 1 ELSE 0 END),
+                           SUM((SELECT COUNT(*) FROM entries x WHERE x.employee_id = d.employee_id AND x.date = d.date))
+                    FROM day_summaries d LEFT JOIN employees e ON e.employee_id = d.employee_id
+                    WHERE {where}
+                    GROUP BY grp
+                """
+                for group, *values in self._connection.execute(sql, params):
+                    current = totals.setdefault(group, [0] * len(values))
+                    for position, value in enumerate(values):
+                        current[position] += value or 0
+
+        # Mismo orden que ORDER BY grp (NULL primero)
+        return [
+            {'group': group, 'employees': employees, 'days': days, 'days_worked': days_worked,
+             'hours_worked': round(hours_worked, 2), 'absences': absences, 'clock_entries': clock_entries}
+            for group, (employees, days, days_worked, hours_worked, absences, clock_entries)
+            in sorted(totals.items(), key=lambda item: (item[0] is not None, item[0] or ''))
+        ]
+
+    def stats(self) -> Dict:
+        """Tamaño del almacén"""
+        with self._lock:
+            counts = {table: self._connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ('employees', 'day_summaries', 'entries', 'permissions')}
+            first, last = self._connection.execute("SELECT MIN(date), MAX(date) FROM day_summaries").fetchone()
+        counts.update(first_date=first, last_date=last, path=self.path)
+        return counts
@@ -0,0 +1,244 @@
+"""
+Generación de varios reportes a partir de una sola descarga
+Cada spec define rango de fechas, filtro de usuarios y archivo de salida. Se descarga
+una vez la unión de usuarios/fechas necesarios, se calcula cada empleado una sola vez
+por rango de fechas y los resultados se reparten entre los reportes.
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.report_stats import ReportStatsAccumulator
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^\w-]+', '_', name).strip('_')
+
+
+class BatchReportRunner:
+    """
+    Ejecuta una lista de specs de reporte sobre un DataProcessorEnhanced
+    Spec (dict):
+        start_date, end_date: rango (YYYY-MM-DD)
+        filters: filtros de usuarios (department, location, job_title, user_ids, active_only)
+        user_ids: alternativa a filters (lista explícita de IDs)
+        output_filename: archivo de salida (opcional)
+        name: nombre del reporte; si no hay output_filename se agrega al nombre por defecto
+        outputs: salidas a generar (por defecto report_outputs, ver core.report_sinks)
+        output_format: formato de la salida detallada (por defecto output_format)
+    Sin filters ni user_ids el reporte incluye a todo el directorio.
+    output_dir: directorio para los nombres relativos (por defecto output_directory)
+    """
+
+    def __init__(self, processor, output_dir: str = None):
+        self.processor = processor
+        self.output_dir = output_dir
+
+    def run(self, specs: List[Dict], progress_callback: Callable = None,
+            use_process_pool: Optional[bool] = None, source: Optional[str] = None) -> Dict:
+        """
+        Genera todos los reportes; el resultado de cada uno tiene el formato de process_attendance_report_detailed
+        source: "api" o "warehouse" (None usa report_source)
+        """
+        if not specs:
+            return {'success': False, 'error': 'No hay reportes para generar', 'stage': 'validation'}
+
+        for spec in specs:
+            validation = self.processor.validate_date_range(spec['start_date'], spec['end_date'])
+            if not validation['is_valid']:
+                return {
+                    'success': False,
+                    'error': f"{self._spec_name(spec)}: {'; '.join(validation['errors'])}",
+                    'stage': 'validation'
+                }
+
+        if progress_callback:
+            progress_callback(0, f"Iniciando {len(specs)} reportes...")
+
+        # 1. Usuarios y permisos: una sola vez para todo el lote
+        if progress_callback:
+            progress_callback(5, "Obteniendo usuarios...")
+        users = self.processor.get_users_list()
+        users_index = self.processor._index_for(users)
+        spec_ids = [self._resolve_user_ids(spec, users) for spec in specs]
+
+        if progress_callback:
+            progress_callback(8, "Obteniendo permisos...")
+        permissions_data = self.processor.get_permissions_data(source)
+
+        # 2. Day summaries: una descarga por intervalo de fechas (rangos solapados se unen)
+        if progress_callback:
+            progress_callback(10, "Obteniendo day summaries...")
+        summaries_by_employee, total_day_summaries = self._fetch_union(specs, spec_ids, users, source)
+
+        # 3. Cálculo: una vez por (empleado, rango de fechas)
+        if progress_callback:
+            progress_callback(60, "Procesando datos de empleados...")
+        processed_by_range = {}
+        summary_counts: Dict[Tuple, int] = {}
+        employees_by_range = self._employees_by_range(specs, spec_ids)
+        # En orden cronológico: el saldo pendiente de un rango puede salir de otro del mismo lote
+        for date_range, employee_ids in sorted(employees_by_range.items()):
+            start_date, end_date = date_range
+            range_summaries = {}
+            for employee_id, employee_summaries in summaries_by_employee.items():
+                if employee_id not in employee_ids:
+                    continue
+                in_range = [summary for summary in employee_summaries
+                            if start_date <= self._summary_date(summary) <= end_date]
+                if in_range:
+                    range_summaries[employee_id] = in_range
+                    summary_counts[(date_range, employee_id)] = len(in_range)
+            previous_pending = self.processor.previous_pending_balances(start_date, range_summaries)
+            processed_by_range[date_range] = self.processor._process_employees(
+                range_summaries, users_index, permissions_data,
+                use_process_pool=use_process_pool, previous_pending=previous_pending
+            )
+            # Un rango contenido en otro del lote (p.ej. una semana del mes) no es un período cerrado propio
+            if not any(other != date_range and other[0] <= start_date and end_date <= other[1]
+                       for other in employees_by_range):
+                self.processor.close_pending_period(start_date, end_date, processed_by_range[date_range],
+                                                    previous_pending, save=False)
+        if self.processor._pending_ledger is not None:
+            self.processor._pending_ledger.save()
+        computed = sum(len(processed) for processed in processed_by_range.values())
+        print(f"🧮 Empleados calculados: {computed} para {len(specs)} reportes")
+
+        # 4. Repartir a cada reporte
+        reports = []
+        for position, (spec, user_ids) in enumerate(zip(specs, spec_ids)):
+            if progress_callback:
+                progress = 90 + int((position / len(specs)) * 10)
+                progress_callback(progress, f"Generando {self._spec_name(spec)}...")
+            date_range = (spec['start_date'], spec['end_date'])
+            processed = processed_by_range[date_range]
+            total_summaries = sum(summary_counts.get((date_range, employee_id), 0) for employee_id in user_ids)
+            reports.append(self._write_report(spec, user_ids, processed, total_summaries,
+                                              len(permissions_data)))
+
+        if progress_callback:
+            progress_callback(100, "Reportes completados!")
+
+        return {
+            'success': all(report['success'] for report in reports),
+            'reports': reports,
+            'api_stats': {
+                'total_day_summaries': total_day_summaries,
+                'total_employees_fetched': len(summaries_by_employee),
+                'total_employees_computed': computed,
+                'total_permissions': len(permissions_data)
+            }
+        }
+
+    def _resolve_user_ids(self, spec: Dict, users: List[Dict]) -> List[str]:
+        """IDs del spec en orden del directorio"""
+        if spec.get('filters'):
+            selected = self.processor._apply_user_filters(users, spec['filters'])
+        elif spec.get('user_ids'):
+            selected = self.processor._index_for(users).users_for_ids(set(spec['user_ids']))
+        else:
+            selected = users
+        return [u.get('employeeInternalId') for u in selected if u.get('employeeInternalId')]
+
+    def _fetch_union(self, specs: List[Dict], spec_ids: List[List[str]], users: List[Dict],
+                     source: Optional[str] = None) -> Tuple[Dict[str, List[Dict]], int]:
+        """Descarga los day summaries de todos los specs, agrupados por empleado"""
+        intervals: List[List] = []  # [start, end, ids]
+        for spec, user_ids in sorted(zip(specs, spec_ids), key=lambda item: item[0]['start_date']):
+            if intervals and spec['start_date'] <= intervals[-1][1]:
+                intervals[-1][1] = max(intervals[-1][1], spec['end_date'])
+                intervals[-1][2].update(user_ids)
+            else:
+                intervals.append([spec['start_date'], spec['end_date'], set(user_ids)])
+
+        summaries_by_employee: Dict[str, List[Dict]] = {}
+        total_day_summaries = 0
+        for start_date, end_date, user_ids in intervals:
+            if not user_ids:
+                continue
+            range_users = [u for u in users if u.get('employeeInternalId') in user_ids]
+            data_source = self.processor.day_summaries_source(start_date, end_date, range_users, source)
+            day_summaries = data_source.get_day_summaries(start_date, end_date, sorted(user_ids))
+            total_day_summaries += len(day_summaries)
+            for summary in day_summaries:
+                employee_id = summary.get('employeeId')
+                if employee_id:
+                    summaries_by_employee.setdefault(employee_id, []).append(summary)
+
+        print(f"Day summaries obtenidos: {total_day_summaries} en {len(intervals)} descargas")
+        return summaries_by_employee, total_day_summaries
+
+    @staticmethod
+    def _employees_by_range(specs: List[Dict], spec_ids: List[List[str]]) -> Dict[Tuple[str, str], set]:
+        by_range: Dict[Tuple[str, str], set] = {}
+        for spec, user_ids in zip(specs, spec_ids):
+            by_range.setdefault((spec['start_date'], spec['end_date']), set()).update(user_ids)
+        return by_range
+
+    @staticmethod
+    def _summary_date(summary: Dict) -> str:
+        return summary.get('referenceDate', summary.get('date')) or ''
+
+    @staticmethod
+    def _spec_name(spec: Dict) -> str:
+        return spec.get('name') or spec.get('output_filename') or f"{spec['start_date']}_{spec['end_date']}"
+
+    def _output_filename(self, spec: Dict) -> Optional[str]:
+        filename = spec.get('output_filename')
+        if not filename and spec.get('name'):
+            default = self.processor.excel_generator.default_filename(spec['start_date'], spec['end_date'])
+            root, ext = os.path.splitext(default)
+            filename = f"{root}_{_slug(spec['name'])}{ext}"
+        if self.output_dir:
+            filename = os.path.join(self.output_dir, filename or self.processor.excel_generator.default_filename(
+                spec['start_date'], spec['end_date']))
+        return filename
+
+    def _write_report(self, spec: Dict, user_ids: List[str], processed: Dict[str, Dict],
+                      total_day_summaries: int, total_permissions: int) -> Dict:
+        """Genera el Excel de un spec con su subconjunto de empleados ya calculados"""
+        name = self._spec_name(spec)
+        try:
+            wanted = set(user_ids)
+            employees = {employee_id: employee_data for employee_id, employee_data in processed.items()
+                         if employee_id in wanted}
+            if not employees:
+                return {
+                    'success': False,
+                    'name': name,
+                    'error': 'No se pudieron obtener day summaries',
+                    'stage': 'api_fetch'
+                }
+
+            stats_accumulator = ReportStatsAccumulator()
+            for employee_data in employees.values():
+                stats_accumulator.add_employee(employee_data)
+
+            output_paths = self.processor.write_outputs(
+                employees, spec['start_date'], spec['end_date'], spec.get('outputs'),
+                output_filename=self._output_filename(spec), max_pairs=stats_accumulator.max_pairs,
+                output_format=spec.get('output_format')
+            )
+            return {
+                'success': True,
+                'name': name,
+                'excel_path': self.processor._main_output(output_paths),
+                'outputs': output_paths,
+                'stats': stats_accumulator.to_dict(),
+                'processed_employees': len(employees),
+                'date_range': {
+                    'start_date': spec['start_date'],
+                    'end_date': spec['end_date']
+                },
+                'report_type': 'detailed',
+                'api_stats': {
+                    'total_day_summaries': total_day_summaries,
+                    'total_employees_processed': len(employees),
+                    'total_permissions': total_permissions
+                }
+            }
+        except Exception as e:
+            error_msg = f"Error generando {name}: {str(e)}"
+            print(f"Error: {error_msg}")
+            return {'success': False, 'name': name, 'error': error_msg, 'stage': 'excel'}
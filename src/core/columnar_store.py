@@ -0,0 +1,215 @@
+"""
+Almacenamiento columnar de registros empleado-día
+Arrays tipados (fechas, índice de empleado, horas, flags) y fichadas en un arreglo
+plano de epoch seconds indexado por offsets. Permite totales vectorizados,
+agrupar por departamento y recortar por rango de fechas sin recorrer dicts.
+"""
+
+from array import array
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+
+HOUR_COLUMNS = (
+    'hours_worked', 'regular_hours', 'extra_hours_50',
+    'extra_hours_100', 'night_hours', 'pending_hours'
+)
+
+# Bits de la columna flags
+FLAG_HOLIDAY = 1
+FLAG_TIME_OFF = 2
+FLAG_ABSENCE = 4
+FLAG_LATE = 8
+FLAG_UNDERWORKED = 16
+FLAG_PERMISSION = 32
+
+# Tipos de fichada
+ENTRY_START = 1
+ENTRY_END = 2
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_ENTRY_TYPES = {'START': ENTRY_START, 'END': ENTRY_END}
+
+
+class EmployeeDayStore:
+    """
+    Store columnar de employee-days
+    Se llena con add_employee() (buffers compactos de `array`) y se congela con
+    freeze() para obtener los arrays NumPy sobre los que operan las consultas.
+    """
+
+    def __init__(self):
+        self.employee_ids: List[str] = []
+        self.departments: List[str] = []
+        self._department_codes: Dict[str, int] = {}
+        self._employee_department = array('i')
+
+        self._days = array('i')
+        self._employee_idx = array('i')
+        self._hours = {column: array('d') for column in HOUR_COLUMNS}
+        self._flags = array('B')
+        self._entry_offsets = array('q', [0])
+        self._entry_epochs = array('q')
+        self._entry_types = array('b')
+
+        self.frozen = False
+
+    @classmethod
+    def from_processed_employees(cls, processed_employees: Dict[str, Dict]) -> 'EmployeeDayStore':
+        """Construye y congela un store desde la salida de process_attendance_report_detailed"""
+        store = cls()
+        for employee_data in processed_employees.values():
+            store.add_employee(employee_data)
+        return store.freeze()
+
+    def add_employee(self, employee_data: Dict):
+        """Agrega los registros diarios de un empleado procesado"""
+        if self.frozen:
+            raise RuntimeError("El store ya está congelado")
+
+        employee_info = employee_data['employee_info']
+        department = employee_info.get('department') or ''
+        code = self._department_codes.get(department)
+        if code is None:
+            code = self._department_codes[department] = len(self.departments)
+            self.departments.append(department)
+
+        employee_index = len(self.employee_ids)
+        self.employee_ids.append(employee_info.get('employeeInternalId'))
+        self._employee_department.append(code)
+
+        for daily_record in employee_data['daily_data']:
+            self._days.append(date.fromisoformat(daily_record['date']).toordinal() - _EPOCH_ORDINAL)
+            self._employee_idx.append(employee_index)
+            for column in HOUR_COLUMNS:
+                self._hours[column].append(daily_record[column] or 0)
+
+            incidences = daily_record.get('incidences') or []
+            flags = 0
+            if daily_record.get('is_holiday'):
+                flags |= FLAG_HOLIDAY
+            if daily_record.get('has_time_off'):
+                flags |= FLAG_TIME_OFF
+            if daily_record.get('has_absence'):
+                flags |= FLAG_ABSENCE
+            if 'LATE' in incidences:
+                flags |= FLAG_LATE
+            if 'UNDERWORKED' in incidences:
+                flags |= FLAG_UNDERWORKED
+            if daily_record.get('permission_request'):
+                flags |= FLAG_PERMISSION
+            self._flags.append(flags)
+
+            # Fichadas ya ordenadas y parseadas por DailyRecord
+            for entry in daily_record.get('raw_entries') or []:
+                if entry.epoch_us is None:
+                    continue
+                self._entry_epochs.append(entry.epoch_us // 1_000_000)
+                self._entry_types.append(_ENTRY_TYPES.get(entry.type, 0))
+            self._entry_offsets.append(len(self._entry_epochs))
+
+    def freeze(self) -> 'EmployeeDayStore':
+        """Convierte los buffers a arrays NumPy (sin copias extra de Python)"""
+        if self.frozen:
+            return self
+        self.dates = np.frombuffer(self._days, dtype=np.int32).astype('datetime64[D]')
+        self.employee_idx = np.frombuffer(self._employee_idx, dtype=np.int32).copy()
+        self.hours = {column: np.frombuffer(values, dtype=np.float64).copy()
+                      for column, values in self._hours.items()}
+        self.flags = np.frombuffer(self._flags, dtype=np.uint8).copy()
+        self.entry_offsets = np.frombuffer(self._entry_offsets, dtype=np.int64).copy()
+        self.entry_epochs = np.frombuffer(self._entry_epochs, dtype=np.int64).copy()
+        self.entry_types = np.frombuffer(self._entry_types, dtype=np.int8).copy()
+        self.employee_department = np.frombuffer(self._employee_department, dtype=np.int32).copy()
+
+        # Liberar buffers de construcción
+        del self._days, self._employee_idx, self._hours, self._flags
+        del self._entry_offsets, self._entry_epochs, self._entry_types, self._employee_department
+        self.frozen = True
+        return self
+
+    def __len__(self) -> int:
+        return len(self.dates) if self.frozen else len(self._days)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por los arrays"""
+        arrays = [self.dates, self.employee_idx, self.flags, self.entry_offsets,
+                  self.entry_epochs, self.entry_types, self.employee_department]
+        arrays.extend(self.hours.values())
+        return sum(a.nbytes for a in arrays)
+
+    def has_flag(self, flag: int) -> np.ndarray:
+        """Máscara booleana de filas con el flag indicado"""
+        return (self.flags & flag) != 0
+
+    def entries_for(self, row: int):
+        """(epochs, types) de las fichadas de una fila"""
+        start, end = self.entry_offsets[row], self.entry_offsets[row + 1]
+        return self.entry_epochs[start:end], self.entry_types[start:end]
+
+    def entry_counts(self) -> np.ndarray:
+        """Cantidad de fichadas por fila"""
+        return np.diff(self.entry_offsets)
+
+    def totals(self, mask: np.ndarray = None) -> Dict:
+        """Suma de cada columna de horas (opcionalmente sobre una máscara de filas)"""
+        result = {}
+        for column, values in self.hours.items():
+            result[column] = round(float(values.sum() if mask is None else values[mask].sum()), 2)
+        counts = self.entry_counts()
+        result['entries'] = int(counts.sum() if mask is None else counts[mask].sum())
+        result['rows'] = int(len(self) if mask is None else np.count_nonzero(mask))
+        return result
+
+    def groupby_department(self) -> Dict[str, Dict]:
+        """Totales de horas y cantidad de filas por departamento"""
+        row_department = self.employee_department[self.employee_idx]
+        size = len(self.departments)
+        grouped = {
+            column: np.bincount(row_department, weights=values, minlength=size)
+            for column, values in self.hours.items()
+        }
+        rows = np.bincount(row_department, minlength=size)
+        employees = np.bincount(self.employee_department, minlength=size)
+
+        result = {}
+        for code, department in enumerate(self.departments):
+            result[department] = {column: round(float(grouped[column][code]), 2)
+                                  for column in HOUR_COLUMNS}
+            result[department]['rows'] = int(rows[code])
+            result[department]['employees'] = int(employees[code])
+        return result
+
+    def slice_dates(self, start_date: str, end_date: str) -> 'EmployeeDayStore':
+        """Nuevo store con las filas cuyo día está en [start_date, end_date]"""
+        start = np.datetime64(start_date, 'D')
+        end = np.datetime64(end_date, 'D')
+        return self.select((self.dates >= start) & (self.dates <= end))
+
+    def select(self, mask: np.ndarray) -> 'EmployeeDayStore':
+        """Nuevo store (congelado) con las filas de la máscara"""
+        subset = EmployeeDayStore.__new__(EmployeeDayStore)
+        subset.employee_ids = self.employee_ids
+        subset.departments = self.departments
+        subset._department_codes = self._department_codes
+        subset.employee_department = self.employee_department
+
+        subset.dates = self.dates[mask]
+        subset.employee_idx = self.employee_idx[mask]
+        subset.hours = {column: values[mask] for column, values in self.hours.items()}
+        subset.flags = self.flags[mask]
+
+        # Reindexar las fichadas de las filas seleccionadas
+        counts = self.entry_counts()[mask]
+        starts = self.entry_offsets[:-1][mask]
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        gather = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1], dtype=np.int64)
+        subset.entry_offsets = offsets
+        subset.entry_epochs = self.entry_epochs[gather]
+        subset.entry_types = self.entry_types[gather]
+
+        subset.frozen = True
+        return subset
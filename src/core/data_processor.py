@@ -6,9 +6,27 @@ CORREGIDO: Error de método get_permissions_data
 
 from typing import Dict, List, Optional, Callable
 from datetime import datetime
+import threading
+import time
 from core.api_client import HumanApiClient
 from core.hours_calculator import ArgentineHoursCalculator
 from core.excel_generator import ExcelReportGenerator
+from core.report_sinks import SinkFanOut, build_sinks
+from core.permissions_matcher import PermissionsMatcher
+from core.employee_pool import EmployeeProcessPool, process_employee_job, process_employee_jobs
+from core.employee_memo import EmployeeMemo
+from core.pending_ledger import PendingLedger, is_closed_period
+from core.attendance_warehouse import AttendanceWarehouse
+from core.report_cache import ReportCache
+from core.users_store import UsersDirectoryStore
+from core.users_index import UsersIndex
+from core.report_stats import ReportStatsAccumulator
+from core.batch_runner import BatchReportRunner
+from core.distributed_queue import ShardQueue
+from core.distributed_runner import DistributedCoordinator, DistributedWorker
+from core.live_attendance import LiveAttendanceMonitor
+from core.models import EmployeeInfo, unknown_employee
+from config.default_config import DEFAULT_CONFIG
 import requests
 
 
@@ -16,16 +34,50 @@ class DataProcessorEnhanced:
     """Procesador principal de datos de asistencia - VERSIÓN FINAL"""
     
     def __init__(self, api_key: str = None, base_url: str = None):
-        self.api_client = HumanApiClient(api_key, base_url)
+        self.api_client = HumanApiClient(api_key, base_url, users_provider=self.get_users_list)
         self.hours_calculator = ArgentineHoursCalculator()
         self.excel_generator = ExcelReportGenerator()
         
         # Cache para optimizar rendimiento
         self._users_cache = None
+        self._users_index = UsersIndex([])
         self._departments_cache = None
         self._cache_timestamp = None
         self._cache_duration = 300  # 5 minutos
         
+        # Directorio de usuarios persistido en disco (arranque instantáneo)
+        self._users_store = UsersDirectoryStore(self.api_client.api_key, self.api_client.base_url)
+        self._persisted_directory = self._users_store.load()
+        self._refresh_lock = threading.Lock()
+        if self._persisted_directory:
+            self._users_cache = self._persisted_directory['users']
+            self._users_index = UsersIndex(self._users_cache)
+            self._cache_timestamp = self._persisted_directory['saved_at']
+        
+        # Pool de procesos (se crea bajo demanda y se reutiliza entre reportes)
+        self._process_pool = None
+        
+        # Memo de empleados ya calculados (vive mientras viva el procesador)
+        self._employee_memo = (EmployeeMemo(self.hours_calculator)
+                               if DEFAULT_CONFIG['employee_memo_enabled'] else None)
+        
+        # Libro de horas pendientes entre períodos (saldo inicial de cada empleado)
+        self._pending_ledger = (PendingLedger(self.api_client.api_key, self.api_client.base_url)
+                                if DEFAULT_CONFIG['pending_ledger_enabled'] else None)
+        
+        # Cache de reportes completos (mismo pedido y mismos datos = mismo archivo)
+        self._report_cache = (ReportCache(self.api_client.api_key, self.api_client.base_url)
+                              if DEFAULT_CONFIG['report_cache_enabled'] else None)
+        
+        # Almacén local SQLite (se abre recién cuando se usa report_source "warehouse")
+        self._warehouse = None
+        self._warehouse_lock = threading.Lock()
+        
+        # Cache de permisos (desactivado salvo en el servicio local)
+        self._permissions_cache = None
+        self._permissions_cache_duration = DEFAULT_CONFIG['permissions_cache_seconds']
+        self._permissions_lock = threading.Lock()
+        
         # Configurar session para permisos
         self._setup_permissions_session()
     
@@ -36,7 +88,28 @@ class DataProcessorEnhanced:
             'User-Agent': 'Python/3.9 requests'
         })
     
-    def get_permissions_data(self) -> List[Dict]:
+    def get_permissions_data(self, source: Optional[str] = None) -> List[Dict]:
+        """
+        Obtiene los permisos, reutilizando la última descarga mientras no venza
+        _permissions_cache_duration (0 = descargar siempre). Las llamadas concurrentes
+        esperan a una única descarga. Con source "warehouse" se leen del almacén local
+        mientras no superen warehouse_permissions_max_age_seconds.
+        """
+        if self._resolve_source(source) == 'warehouse':
+            return self._warehouse_permissions()
+        
+        with self._permissions_lock:
+            if (self._permissions_cache_duration and self._permissions_cache is not None
+                    and time.monotonic() - self._permissions_cache[0] < self._permissions_cache_duration):
+                print(f"♻️ Usando permisos en cache ({len(self._permissions_cache[1])})")
+                return self._permissions_cache[1]
+            
+            permissions = self._fetch_permissions_data()
+            if permissions:
+                self._permissions_cache = (time.monotonic(), permissions)
+            return permissions
+    
+    def _fetch_permissions_data(self) -> List[Dict]:
         """
         Obtiene datos de permisos desde la API de Redash con refresh automático y debugging completo
         """
@@ -171,27 +244,7 @@ class DataProcessorEnhanced:
         """
         Formatea el rango del permiso - puede ser horario (mismo día) o de días (rango)
         """
-        try:
-            # Verificar si es rango de días
-            dd = permission_data.get('dd', '')
-            mm = permission_data.get('mm', '')
-            dia2 = permission_data.get('dia2', '')
-            mes2 = permission_data.get('mes2', '')
-            form = permission_data.get('TipoSolicitud', '')
-            hora = permission_data.get('Hora', '')
-            minutos = permission_data.get('Minutos', '')
-            incidencia = permission_data.get('incidencia', '')
-            
-            # Si tiene dia2 y mes2, es un rango de días
-            if dd and mm and dia2 and mes2:
-                return f"desde {dd}/{mm} hasta {dia2}/{mes2} - {form}"
-            
-            # Si no, verificar si es rango horario (mismo día)
-            
-            # Fallback...
-            return f"{hora}:{minutos} - {incidencia} - {form}"
-        except Exception:
-            return "pedido x permiso"
+        return PermissionsMatcher.format_time_range(permission_data)
     
     def test_connection(self) -> tuple[bool, str]:
         """Prueba la conexión con la API"""
@@ -212,10 +265,28 @@ class DataProcessorEnhanced:
         
         return users
     
+    def select_user_ids(self, filters: Dict = None) -> List[str]:
+        """
+        IDs de empleados que cumplen los filtros (department, location, job_title,
+        user_ids, active_only) sobre el directorio cacheado, en orden del directorio
+        """
+        users = self.get_users_list()
+        if filters:
+            users = self._apply_user_filters(users, filters)
+        return [u.get('employeeInternalId') for u in users if u.get('employeeInternalId')]
+    
     def process_attendance_report_detailed(self, start_date: str, end_date: str, 
                                          user_ids: List[str] = None,
                                          progress_callback: Callable = None,
-                                         report_type: str = "detailed") -> Dict:
+                                         report_type: str = "detailed",
+                                         use_process_pool: Optional[bool] = None,
+                                         streaming: Optional[bool] = None,
+                                         output_filename: str = None,
+                                         source: Optional[str] = None,
+                                         memory_budget_mb: Optional[float] = None,
+                                         outputs: Optional[List[str]] = None,
+                                         force_rebuild: bool = False,
+                                         output_format: Optional[str] = None) -> Dict:
         """
         Procesa un reporte completo de asistencia con formato detallado
         Args:
@@ -224,8 +295,30 @@ class DataProcessorEnhanced:
             user_ids: Lista opcional de IDs de usuarios
             progress_callback: Función de callback para progreso
             report_type: "detailed" para columnas expandidas, "standard" para formato anterior
+            use_process_pool: Fuerza (True/False) el uso del pool de procesos;
+                None usa DEFAULT_CONFIG['process_pool_enabled']
+            streaming: Procesa y escribe cada lote a medida que llega de la API;
+                None usa DEFAULT_CONFIG['streaming_enabled']
+            output_filename: Nombre o ruta del archivo de salida (por defecto
+                según filename_format en output_directory)
+            source: "api" descarga todo el rango; "warehouse" sincroniza sólo lo que
+                falta en el almacén local y lee de ahí (None usa report_source)
+            memory_budget_mb: Presupuesto de memoria para las filas (0 = sin límite,
+                None usa DEFAULT_CONFIG['memory_budget_mb']); implica streaming
+            outputs: Salidas a generar en el mismo pase ("detailed", "totals",
+                "payroll_csv"; None usa report_outputs). El resultado trae sus rutas en
+                'outputs' y la principal en 'excel_path'
+            force_rebuild: Regenera aunque haya un reporte idéntico en el cache de
+                reportes (sin force_rebuild el resultado cacheado trae 'cached': True)
+            output_format: Formato de la salida detallada ("xlsx", "xlsxwriter", "csv",
+                "parquet"; None usa DEFAULT_CONFIG['output_format'])
         """
         try:
+            if memory_budget_mb is None:
+                memory_budget_mb = DEFAULT_CONFIG['memory_budget_mb']
+            if streaming is None:
+                streaming = DEFAULT_CONFIG['streaming_enabled']
+            
             if progress_callback:
                 progress_callback(0, "Iniciando procesamiento detallado...")
             
@@ -233,23 +326,50 @@ class DataProcessorEnhanced:
             if progress_callback:
                 progress_callback(5, "Obteniendo usuarios...")
             
+            users = self.get_users_list()
             if user_ids:
-                cached_users = self.get_users_list()
-                filtered_users = [u for u in cached_users if u.get('employeeInternalId') in user_ids]
+                filtered_users = self._index_for(users).users_for_ids(set(user_ids))
             else:
-                filtered_users = self.get_users_list()
+                filtered_users = users
+            
+            # Cache de reportes: en streaming los datos no se conocen antes de escribir
+            request_key = None
+            if (self._report_cache is not None and not (streaming or memory_budget_mb)
+                    and not DEFAULT_CONFIG['columnar_store_enabled']):
+                request_key = self._report_cache.request_key(
+                    start_date, end_date, [u.get('employeeInternalId') for u in filtered_users],
+                    {'outputs': outputs or DEFAULT_CONFIG['report_outputs'], 'output_filename': output_filename,
+                     'report_type': report_type, 'source': self._resolve_source(source),
+                     'output_format': output_format or DEFAULT_CONFIG['output_format']}
+                )
+                if not force_rebuild:
+                    cached = self._report_cache.recent(request_key)
+                    if cached:
+                        print(f"♻️ Reporte idéntico generado hace {cached['cache_age_seconds']}s, se reutiliza")
+                        if progress_callback:
+                            progress_callback(100, "Reporte sin cambios (reutilizado)")
+                        return cached
             
             # 2. Obtener permisos - CORREGIDO: usar self.get_permissions_data() no self.api_client
             if progress_callback:
                 progress_callback(8, "Obteniendo permisos...")
             
-            permissions_data = self.get_permissions_data()  # CORREGIDO
+            permissions_data = self.get_permissions_data(source)  # CORREGIDO
             
             # 3. Obtener day summaries (contiene entries detalladas)
             if progress_callback:
                 progress_callback(10, "Obteniendo day summaries...")
             
-            day_summaries = self.api_client.get_day_summaries(
+            data_source = self.day_summaries_source(start_date, end_date, filtered_users, source)
+            
+            if streaming or memory_budget_mb:
+                return self._process_attendance_report_streaming(
+                    start_date, end_date, filtered_users, permissions_data,
+                    progress_callback, report_type, use_process_pool, output_filename, data_source,
+                    memory_budget_mb, outputs, output_format
+                )
+            
+            day_summaries = data_source.get_day_summaries(
                 start_date, end_date,
                 [u.get('employeeInternalId') for u in filtered_users]
             )
@@ -265,8 +385,6 @@ class DataProcessorEnhanced:
                 progress_callback(60, "Procesando datos de empleados...")
             
             # 4. Procesar datos de cada empleado usando day summaries
-            processed_employees = {}
-            
             # Agrupar day summaries por empleado
             summaries_by_employee = {}
             for summary in day_summaries:
@@ -283,50 +401,47 @@ class DataProcessorEnhanced:
             users_index = {u.get('employeeInternalId'): u for u in filtered_users}
             
             total_employees = len(summaries_by_employee)
-            processed_count = 0
+            stats_accumulator = ReportStatsAccumulator()
+            previous_pending = self.previous_pending_balances(start_date, summaries_by_employee)
             
-            for employee_id, employee_summaries in summaries_by_employee.items():
-                if progress_callback:
-                    progress = 60 + int((processed_count / total_employees) * 25)
-                    employee_info = users_index.get(employee_id, {})
-                    employee_name = f"{employee_info.get('firstName', '')} {employee_info.get('lastName', '')}"
-                    progress_callback(progress, f"Procesando {employee_name}...")
-                
-                # Obtener info del empleado
-                employee_info = users_index.get(employee_id, {
-                    'employeeInternalId': employee_id,
-                    'firstName': 'Desconocido',
-                    'lastName': ''
-                })
-                
-                # Procesar datos del empleado usando day summaries
-                employee_data = self.hours_calculator.process_employee_data(
-                    employee_summaries, employee_info, 0, None
-                )
-                
-                # Enriquecer con datos de permisos
-                self._enrich_with_permissions(employee_data, permissions_data)
-                
-                processed_employees[employee_id] = employee_data
-                processed_count += 1
+            if request_key is not None:
+                data_key = self._report_cache.data_key(
+                    day_summaries, permissions_data, previous_pending, filtered_users,
+                    self.hours_calculator.calendar_digest)
+                if not force_rebuild:
+                    cached = self._report_cache.matching(request_key, data_key)
+                    if cached:
+                        print("♻️ Datos sin cambios desde el último reporte, se reutiliza el archivo")
+                        if progress_callback:
+                            progress_callback(100, "Reporte sin cambios (reutilizado)")
+                        return cached
+            
+            processed_employees = self._process_employees(
+                summaries_by_employee, users_index, permissions_data,
+                progress_callback, use_process_pool, stats_accumulator, previous_pending
+            )
+            self.close_pending_period(start_date, end_date, processed_employees, previous_pending)
             
             if progress_callback:
                 progress_callback(90, "Generando reporte Excel detallado...")
             
-            # 5. Generar reporte Excel detallado
-            excel_path = self.excel_generator.generate_report(
-                processed_employees, start_date, end_date
+            # 5. Generar reporte Excel detallado (y las demás salidas pedidas)
+            output_paths = self.write_outputs(
+                processed_employees, start_date, end_date, outputs,
+                output_filename=output_filename, max_pairs=stats_accumulator.max_pairs,
+                output_format=output_format
             )
             
             if progress_callback:
                 progress_callback(100, "Reporte detallado completado!")
             
-            # 6. Calcular estadísticas finales
-            stats = self._calculate_final_stats(processed_employees)
+            # 6. Estadísticas finales (ya acumuladas durante el procesamiento)
+            stats = stats_accumulator.to_dict()
             
-            return {
+            result = {
                 'success': True,
-                'excel_path': excel_path,
+                'excel_path': self._main_output(output_paths),
+                'outputs': output_paths,
                 'stats': stats,
                 'processed_employees': len(processed_employees),
                 'date_range': {
@@ -341,6 +456,14 @@ class DataProcessorEnhanced:
                 }
             }
             
+            if DEFAULT_CONFIG['columnar_store_enabled']:
+                result['columnar_store'] = self.build_columnar_store(processed_employees)
+            
+            if request_key is not None:
+                self._report_cache.store(request_key, data_key, result)
+            
+            return result
+            
         except Exception as e:
             error_msg = f"Error en procesamiento detallado: {str(e)}"
             print(f"Error: {error_msg}")
@@ -350,85 +473,448 @@ class DataProcessorEnhanced:
                 'stage': 'processing'
             }
     
-    def _enrich_with_permissions(self, employee_data: Dict, permissions_data: List[Dict]):
+    def process_attendance_reports_batch(self, specs: List[Dict],
+                                         progress_callback: Callable = None,
+                                         use_process_pool: Optional[bool] = None,
+                                         output_dir: str = None,
+                                         source: Optional[str] = None) -> Dict:
         """
-        Enriquece los datos del empleado con información de permisos
+        Genera varios reportes detallados con una sola descarga de datos
+        Args:
+            specs: Lista de dicts con start_date, end_date y opcionalmente filters,
+                user_ids, output_filename y name (ver BatchReportRunner)
+            output_dir: Directorio para los archivos (por defecto output_directory)
+            source: "api" o "warehouse" (None usa report_source)
+        Returns:
+            {'success', 'reports': [resultado por spec], 'api_stats'}
         """
-        employee_id = employee_data['employee_info'].get('employeeInternalId')
-        print(f"\n🔍 BÚSQUEDA DE PERMISOS para empleado: {employee_id}")
-        print(f"📊 Total de permisos disponibles: {len(permissions_data)}")
+        try:
+            return BatchReportRunner(self, output_dir).run(specs, progress_callback, use_process_pool, source)
+        except Exception as e:
+            error_msg = f"Error en procesamiento por lotes: {str(e)}"
+            print(f"Error: {error_msg}")
+            return {
+                'success': False,
+                'error': error_msg,
+                'stage': 'processing'
+            }
+    
+    def process_attendance_report_distributed(self, start_date: str, end_date: str,
+                                              user_ids: List[str] = None,
+                                              progress_callback: Callable = None,
+                                              output_filename: str = None,
+                                              outputs: Optional[List[str]] = None,
+                                              source: Optional[str] = None,
+                                              shard_size: int = None,
+                                              queue_dir: str = None,
+                                              participate: bool = True,
+                                              use_process_pool: Optional[bool] = None,
+                                              timeout_seconds: float = None,
+                                              output_format: Optional[str] = None) -> Dict:
+        """
+        Reporte detallado repartido en shards entre workers de varias máquinas
+        Args:
+            shard_size: Empleados por shard (None usa distributed_shard_size)
+            queue_dir: Directorio compartido de la cola (None usa distributed_queue_dir)
+            participate: El coordinador también calcula shards mientras espera
+            timeout_seconds: Espera máxima de los shards (None usa distributed_timeout_seconds)
+        Returns:
+            Mismo formato que process_attendance_report_detailed más
+            'distributed': {'job_id', 'shards', 'workers'}
+        """
+        queue = None
+        try:
+            queue = ShardQueue(queue_dir)
+            return DistributedCoordinator(self, queue).run(
+                start_date, end_date, user_ids, progress_callback, output_filename, outputs,
+                source, shard_size, participate, use_process_pool, timeout_seconds, output_format
+            )
+        except Exception as e:
+            error_msg = f"Error en procesamiento distribuido: {str(e)}"
+            print(f"Error: {error_msg}")
+            return {
+                'success': False,
+                'error': error_msg,
+                'stage': 'distributed'
+            }
+        finally:
+            if queue is not None:
+                queue.close()
+    
+    def run_distributed_worker(self, queue_dir: str = None, idle_exit_seconds: float = None,
+                               max_shards: int = None, use_process_pool: Optional[bool] = None) -> Dict:
+        """
+        Procesa shards publicados por coordinadores (ver process_attendance_report_distributed)
+        Args:
+            idle_exit_seconds: Termina tras este tiempo sin trabajo (0 = nunca; None usa
+                distributed_worker_idle_exit_seconds)
+            max_shards: Termina después de procesar esta cantidad de shards
+        """
+        queue = None
+        try:
+            queue = ShardQueue(queue_dir)
+            return DistributedWorker(self, queue, use_process_pool=use_process_pool).run(
+                idle_exit_seconds, max_shards
+            )
+        except Exception as e:
+            error_msg = f"Error en el worker distribuido: {str(e)}"
+            print(f"Error: {error_msg}")
+            return {
+                'success': False,
+                'error': error_msg,
+                'stage': 'distributed'
+            }
+        finally:
+            if queue is not None:
+                queue.close()
+    
+    def create_live_monitor(self, user_ids: List[str] = None) -> LiveAttendanceMonitor:
+        """Monitor de asistencia de hoy (ver LiveAttendanceMonitor.poll); user_ids limita los empleados"""
+        return LiveAttendanceMonitor(self, user_ids)
+    
+    def _process_attendance_report_streaming(self, start_date: str, end_date: str,
+                                             filtered_users: List[Dict],
+                                             permissions_data: List[Dict],
+                                             progress_callback: Callable = None,
+                                             report_type: str = "detailed",
+                                             use_process_pool: Optional[bool] = None,
+                                             output_filename: str = None,
+                                             data_source=None,
+                                             memory_budget_mb: float = 0,
+                                             outputs: Optional[List[str]] = None,
+                                             output_format: Optional[str] = None) -> Dict:
+        """
+        Variante streaming del reporte detallado
+        Pipeline productor/consumidor: los lotes de day summaries se procesan apenas
+        llegan de la API (o del almacén local) y cada empleado pasa a los threads de las
+        salidas por colas acotadas. Nunca se mantiene el dataset completo en memoria.
+        Con memory_budget_mb tampoco el workbook: las filas se acumulan en un SpillBuffer
+        (segmentos en disco) y se escriben al final en un workbook write-only.
+        """
+        data_source = data_source or self.api_client
+        users_index = {u.get('employeeInternalId'): u for u in filtered_users}
         
-        permissions_found = 0
+        fanout = SinkFanOut(build_sinks(
+            outputs or DEFAULT_CONFIG['report_outputs'], self.excel_generator, start_date, end_date,
+            output_filename, memory_budget_mb=memory_budget_mb, output_format=output_format
+        ))
         
-        for daily_record in employee_data['daily_data']:
-            date_str = daily_record['date']  # YYYY-MM-DD
-            #print(f"\n📅 Buscando permiso para fecha: {date_str}")
-            
-            # Buscar permiso para esta fecha y empleado
-            permission = self._find_permission_for_date_and_employee(
-                permissions_data, employee_id, date_str
+        stats_accumulator = ReportStatsAccumulator()
+        columnar_store = None
+        if DEFAULT_CONFIG['columnar_store_enabled']:
+            from core.columnar_store import EmployeeDayStore  # NumPy sólo si se usa
+            columnar_store = EmployeeDayStore()
+        total_day_summaries = 0
+        total_employees = 0
+        
+        try:
+            batches = data_source.iter_day_summaries(
+                start_date, end_date,
+                [u.get('employeeInternalId') for u in filtered_users]
             )
-            
-            if permission:
-                permission_text = self.format_permission_time_range(permission)
-                daily_record['permission_request'] = permission_text
-                permissions_found += 1
-                #print(f"✅ PERMISO ENCONTRADO para {employee_id} el {date_str}: {permission_text}")
-            else:
-                daily_record['permission_request'] = ""
-                print(f"❌ Sin permiso para {employee_id} el {date_str}")
+            for batches_done, batch in enumerate(batches, 1):
+                if fanout.error:
+                    break
+                
+                # Agrupar day summaries del lote por empleado (el lote trae el rango completo)
+                summaries_by_employee = {}
+                for summary in batch['items']:
+                    employee_id = summary.get('employeeId')
+                    if employee_id:
+                        summaries_by_employee.setdefault(employee_id, []).append(summary)
+                total_day_summaries += len(batch['items'])
+                
+                previous_pending = self.previous_pending_balances(start_date, summaries_by_employee)
+                # Con presupuesto no se usa el memo (guarda empleados completos con sus fichadas)
+                processed = self._process_employees(
+                    summaries_by_employee, users_index, permissions_data,
+                    None, use_process_pool, stats_accumulator, previous_pending,
+                    use_memo=not memory_budget_mb
+                )
+                self.close_pending_period(start_date, end_date, processed, previous_pending, save=False)
+                
+                for employee_data in processed.values():
+                    if columnar_store is not None:
+                        columnar_store.add_employee(employee_data)
+                    fanout.add_employee(employee_data)
+                total_employees += len(processed)
+                
+                if progress_callback:
+                    progress = 10 + int((batches_done / batch['total_batches']) * 80)
+                    progress_callback(progress, f"Lote {batches_done}/{batch['total_batches']}: "
+                                                f"{total_employees} empleados procesados...")
+        except BaseException:
+            fanout.abort()
+            raise
+        
+        if fanout.error or not total_day_summaries:
+            fanout.abort()
+        if fanout.error:
+            raise fanout.error
+        if not total_day_summaries:
+            return {
+                'success': False,
+                'error': 'No se pudieron obtener day summaries',
+                'stage': 'api_fetch'
+            }
+        
+        if progress_callback:
+            progress_callback(90, "Guardando reporte Excel detallado...")
+        
+        output_paths = fanout.close(stats_accumulator.max_pairs)
+        if self._pending_ledger is not None and is_closed_period(end_date):
+            self._pending_ledger.save()
+        
+        if progress_callback:
+            progress_callback(100, "Reporte detallado completado!")
+        
+        result = {
+            'success': True,
+            'excel_path': self._main_output(output_paths),
+            'outputs': output_paths,
+            'stats': stats_accumulator.to_dict(),
+            'processed_employees': total_employees,
+            'date_range': {
+                'start_date': start_date,
+                'end_date': end_date
+            },
+            'report_type': report_type,
+            'api_stats': {
+                'total_day_summaries': total_day_summaries,
+                'total_employees_processed': total_employees,
+                'total_permissions': len(permissions_data)
+            }
+        }
+        
+        if columnar_store is not None:
+            result['columnar_store'] = columnar_store.freeze()
         
-        print(f"\n📊 RESUMEN: {permissions_found} permisos encontrados para {employee_id}")
+        return result
     
-    def _find_permission_for_date_and_employee(self, permissions_data: List[Dict], 
-                                            employee_id: str, date_str: str) -> Optional[Dict]:
+    def write_outputs(self, processed_employees: Dict[str, Dict], start_date: str, end_date: str,
+                      outputs: Optional[List[str]] = None, output_filename: str = None,
+                      max_pairs: int = None, output_format: Optional[str] = None) -> Dict[str, str]:
         """
-        Busca un permiso específico para un empleado y fecha - INCLUYE RANGOS DE DÍAS
+        Escribe todas las salidas pedidas con empleados ya calculados (en paralelo)
+        Returns:
+            {nombre de salida: ruta}
         """
+        fanout = SinkFanOut(build_sinks(
+            outputs or DEFAULT_CONFIG['report_outputs'], self.excel_generator, start_date, end_date,
+            output_filename, max_pairs=max_pairs, output_format=output_format
+        ))
         try:
-            from datetime import datetime
-            
-            # Convertir date_str a objeto datetime
-            target_date = datetime.strptime(date_str, '%Y-%m-%d')
-            year, month, day = date_str.split('-')
-            
-            for permission in permissions_data:
-                perm_employee_id = permission.get('employeeInternalId')
-                
-                # Solo buscar permisos del empleado correcto
-                if perm_employee_id != employee_id:
-                    continue
-                    
-                # Verificar si es rango de días
-                dd = permission.get('dd', '')
-                mm = permission.get('mm', '')
-                dia2 = permission.get('dia2', '')
-                mes2 = permission.get('mes2', '')
-                
-                if dd and mm and dia2 and mes2:
-                    # Es un rango de días - verificar si target_date está dentro
-                    try:
-                        start_date = datetime(2025, int(mm), int(dd))
-                        end_date = datetime(2025, int(mes2), int(dia2))
-                        
-                        if start_date <= target_date <= end_date:
-                            print(f"🎯 RANGO MATCH: {date_str} está en rango {dd}/{mm} - {dia2}/{mes2}")
-                            return permission
-                    except:
-                        continue
-                else:
-                    # Es un día específico - lógica original
-                    perm_month = str(mm).zfill(2)
-                    perm_day = str(dd).zfill(2)
-                    
-                    if perm_month == month and perm_day == day:
-                        print(f"🎯 DÍA ESPECÍFICO MATCH: {date_str}")
-                        return permission
+            for employee_data in processed_employees.values():
+                fanout.add_employee(employee_data)
+        except BaseException:
+            fanout.abort()
+            raise
+        return fanout.close(max_pairs)
+    
+    @staticmethod
+    def _main_output(output_paths: Dict[str, str]) -> str:
+        """Ruta principal del reporte: el detallado si se pidió, si no la primera salida"""
+        return output_paths.get('detailed') or next(iter(output_paths.values()))
+    
+    def _process_employees(self, summaries_by_employee: Dict[str, List[Dict]],
+                           users_index: Dict[str, Dict], permissions_data: List[Dict],
+                           progress_callback: Callable = None,
+                           use_process_pool: Optional[bool] = None,
+                           stats_accumulator: ReportStatsAccumulator = None,
+                           previous_pending: Dict[str, float] = None,
+                           use_memo: bool = True) -> Dict[str, Dict]:
+        """
+        Calcula horas y permisos de cada empleado, en proceso o en el pool de procesos
+        Los empleados con entradas idénticas a una corrida anterior salen del memo
+        (salvo use_memo=False).
+        Si se pasa stats_accumulator, cada empleado se suma a las estadísticas;
+        previous_pending: saldo de horas pendientes anterior por empleado (ver PendingLedger)
+        Returns:
+            Dict employee_id -> employee_data en el orden de summaries_by_employee
+        """
+        matcher = PermissionsMatcher(permissions_data)
+        previous_pending = previous_pending or {}
+        
+        jobs = []
+        for employee_id, employee_summaries in summaries_by_employee.items():
+            # Obtener info del empleado (sólo los campos que usa el reporte)
+            user = users_index.get(employee_id)
+            employee_info = EmployeeInfo.from_user(user) if user else unknown_employee(employee_id)
+            jobs.append((employee_id, employee_summaries, employee_info,
+                         matcher.for_employee(employee_id), previous_pending.get(employee_id, 0)))
+        
+        memo = self._employee_memo if use_memo else None
+        memo_keys = {}
+        memoized = {}
+        pending_jobs = jobs
+        if memo is not None:
+            for job in jobs:
+                key = memo_keys[job[0]] = memo.key_for(job)
+                employee_data = memo.get(key)
+                if employee_data is not None:
+                    memoized[job[0]] = employee_data
+            if memoized:
+                pending_jobs = [job for job in jobs if job[0] not in memoized]
+                print(f"♻️ Empleados sin cambios (memo): {len(memoized)}, a calcular: {len(pending_jobs)}")
+        
+        computed = self._compute_employee_jobs(pending_jobs, progress_callback, use_process_pool)
+        if memo is not None:
+            for employee_id, employee_data in computed.items():
+                memo.put(memo_keys[employee_id], employee_data)
+        
+        processed_employees = {}
+        for job in jobs:
+            employee_id = job[0]
+            employee_data = memoized.get(employee_id) or computed[employee_id]
+            if stats_accumulator is not None:
+                stats_accumulator.add_employee(employee_data)
+            processed_employees[employee_id] = employee_data
+        
+        return processed_employees
+    
+    def previous_pending_balances(self, start_date: str, employee_ids) -> Dict[str, float]:
+        """Saldo de horas pendientes del período anterior por empleado ({} sin libro)"""
+        if self._pending_ledger is None:
+            return {}
+        balances = self._pending_ledger.previous_balances(employee_ids, start_date)
+        if balances:
+            print(f"📒 Saldo pendiente del período anterior: {len(balances)} empleados")
+        return balances
+    
+    def close_pending_period(self, start_date: str, end_date: str, processed_employees: Dict[str, Dict],
+                             previous_pending: Dict[str, float] = None, save: bool = True):
+        """Registra el período en el libro de horas pendientes (sólo períodos ya cerrados)"""
+        if self._pending_ledger is None or not processed_employees:
+            return
+        if not is_closed_period(end_date):
+            print(f"📒 Período abierto (termina {end_date}), no se registra en el libro de pendientes")
+            return
+        stale = self._pending_ledger.record_period(start_date, end_date, processed_employees, previous_pending)
+        if stale:
+            print(f"⚠️ {stale} empleados tienen períodos posteriores registrados: regenerarlos para actualizar el saldo")
+        if save:
+            self._pending_ledger.save()
+    
+    def _resolve_source(self, source: Optional[str]) -> str:
+        source = source or DEFAULT_CONFIG['report_source']
+        if source not in ('api', 'warehouse'):
+            raise ValueError(f"Fuente de datos inválida: {source} (api o warehouse)")
+        return source
+    
+    def get_warehouse(self) -> AttendanceWarehouse:
+        """Devuelve el almacén local, abriéndolo la primera vez"""
+        with self._warehouse_lock:
+            if self._warehouse is None:
+                self._warehouse = AttendanceWarehouse(self.api_client)
+            return self._warehouse
+    
+    def day_summaries_source(self, start_date: str, end_date: str, users: List[Dict],
+                             source: Optional[str] = None):
+        """
+        Origen de los day summaries (get_day_summaries / iter_day_summaries)
+        Con "warehouse" primero sincroniza lo que falta del rango para esos usuarios.
+        """
+        if self._resolve_source(source) == 'api':
+            return self.api_client
+        warehouse = self.get_warehouse()
+        warehouse.store_employees(users)
+        warehouse.sync(start_date, end_date, [u.get('employeeInternalId') for u in users
+                                              if u.get('employeeInternalId')])
+        return warehouse
+    
+    def sync_warehouse(self, start_date: str, end_date: str, filters: Dict = None) -> Dict:
+        """Sincroniza el almacén local (empleados, day summaries y permisos) para el rango"""
+        users = self.get_users_list()
+        if filters:
+            users = self._apply_user_filters(users, filters)
+        warehouse = self.get_warehouse()
+        warehouse.store_employees(users)
+        result = warehouse.sync(start_date, end_date, [u.get('employeeInternalId') for u in users
+                                                       if u.get('employeeInternalId')])
+        result['permissions'] = len(self._warehouse_permissions())
+        result.update(warehouse.stats())
+        return result
+    
+    def aggregate_attendance(self, start_date: str, end_date: str, group_by: str = 'department',
+                             filters: Dict = None, sync: bool = True) -> List[Dict]:
+        """
+        Totales ad hoc (horas, días, ausencias, fichadas) agrupados desde el almacén local
+        sync=False consulta sólo lo que ya está guardado (análisis históricos sin API)
+        """
+        users = self.get_users_list() if (filters or sync) else []
+        if filters:
+            users = self._apply_user_filters(users, filters)
+        if sync:
+            self.day_summaries_source(start_date, end_date, users, 'warehouse')
+        user_ids = [u.get('employeeInternalId') for u in users if u.get('employeeInternalId')] if filters else None
+        return self.get_warehouse().aggregate(start_date, end_date, group_by, user_ids)
+    
+    def _warehouse_permissions(self) -> List[Dict]:
+        """Permisos del almacén local, refrescados desde Redash cuando vencen"""
+        warehouse = self.get_warehouse()
+        age = warehouse.permissions_age_seconds()
+        if age is not None and age < DEFAULT_CONFIG['warehouse_permissions_max_age_seconds']:
+            permissions = warehouse.get_permissions()
+            print(f"🗄️ Usando permisos del almacén local ({len(permissions)})")
+            return permissions
+        permissions = self._fetch_permissions_data()
+        if permissions:
+            warehouse.store_permissions(permissions)
+            return permissions
+        # Sin respuesta de Redash: mejor permisos viejos que ninguno
+        return warehouse.get_permissions()
+    
+    def _compute_employee_jobs(self, jobs: List, progress_callback: Callable = None,
+                               use_process_pool: Optional[bool] = None) -> Dict[str, Dict]:
+        """Calcula los jobs de empleados (pool de procesos o proceso principal)"""
+        if use_process_pool is None:
+            use_process_pool = DEFAULT_CONFIG['process_pool_enabled']
+        
+        if use_process_pool:
+            pool = self._get_process_pool()
+            if pool.should_use_pool(len(jobs)):
+                def shard_progress(completed, total_shards):
+                    if progress_callback:
+                        progress = 60 + int((completed / total_shards) * 25)
+                        progress_callback(progress, f"Procesados {completed}/{total_shards} lotes de empleados...")
+                try:
+                    return pool.process(jobs, shard_progress)
+                except Exception as e:
+                    print(f"⚠️ Pool de procesos falló ({str(e)}), procesando en el proceso principal")
+        
+        if DEFAULT_CONFIG['vectorized_hours_enabled']:
+            if progress_callback:
+                progress_callback(60, f"Procesando {len(jobs)} empleados (vectorizado)...")
+            return dict(process_employee_jobs(self.hours_calculator, jobs))
+        
+        processed_employees = {}
+        total_employees = len(jobs)
+        
+        for processed_count, job in enumerate(jobs):
+            employee_id, _, employee_info, _, _ = job
+            if progress_callback:
+                progress = 60 + int((processed_count / total_employees) * 25)
+                employee_name = f"{employee_info.get('firstName', '')} {employee_info.get('lastName', '')}"
+                progress_callback(progress, f"Procesando {employee_name}...")
             
-            return None
-        except Exception as e:
-            print(f"❌ Error buscando permiso: {str(e)}")
-            return None
+            processed_employees[employee_id] = process_employee_job(self.hours_calculator, job)
+        
+        return processed_employees
+    
+    def _get_process_pool(self) -> EmployeeProcessPool:
+        """Devuelve el pool de procesos, creándolo la primera vez (queda caliente)"""
+        if self._process_pool is None:
+            self._process_pool = EmployeeProcessPool()
+        return self._process_pool
+    
+    def shutdown(self):
+        """Libera recursos de larga vida (pool de procesos, almacén local)"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        if self._warehouse is not None:
+            self._warehouse.close()
+            self._warehouse = None
     
     def _is_cache_valid(self) -> bool:
         """Verifica si el cache es válido"""
@@ -440,89 +926,97 @@ class DataProcessorEnhanced:
         return cache_age < self._cache_duration
     
     def _update_cache(self, users: List[Dict]):
-        """Actualiza el cache de usuarios"""
+        """Actualiza el cache de usuarios (en memoria y persistido)"""
+        users_index = UsersIndex(users)
         self._users_cache = users
+        self._users_index = users_index
         self._cache_timestamp = datetime.now()
         
         # Actualizar cache de departamentos
-        departments = set()
-        for user in users:
-            if user.get('department'):
-                departments.add(user['department'])
-        self._departments_cache = sorted(list(departments))
+        filters = users_index.filters()
+        self._departments_cache = filters['departments']
+        
+        # Nunca pisar el directorio persistido con una descarga fallida
+        if users:
+            self._users_store.save(users, filters)
+            self._persisted_directory = {
+                'users': users,
+                'filters': filters,
+                'saved_at': self._cache_timestamp
+            }
     
-    def _apply_user_filters(self, users: List[Dict], filters: Dict) -> List[Dict]:
-        """Aplica filtros a la lista de usuarios"""
-        filtered_users = []
+    def has_cached_directory(self) -> bool:
+        """Indica si hay un directorio de usuarios persistido de una ejecución anterior"""
+        return self._persisted_directory is not None
+    
+    def refresh_users_in_background(self, on_refresh: Callable = None) -> bool:
+        """
+        Refresca el directorio de usuarios desde la API en un thread aparte
+        Args:
+            on_refresh: Callback opcional on_refresh(filters) al terminar con éxito
+        Returns:
+            False si ya había un refresh en curso
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
         
-        for user in users:
-            matches = True
-            
-            # Filtrar por departamento
-            if filters.get('department') and user.get('department') != filters['department']:
-                matches = False
-            
-            # Filtrar por estado activo
-            if filters.get('active_only', True) and not user.get('isActive', True):
-                matches = False
-            
-            if matches:
-                filtered_users.append(user)
+        def refresh():
+            try:
+                users = self.api_client.get_users()
+                if not users:
+                    print("⚠️ Refresh en segundo plano sin usuarios, se mantiene el cache local")
+                    return
+                self._update_cache(users)
+                print(f"🔄 Directorio de usuarios actualizado: {len(users)} usuarios")
+                if on_refresh:
+                    on_refresh(self._persisted_directory['filters'])
+            except Exception as e:
+                print(f"⚠️ Error refrescando usuarios en segundo plano: {str(e)}")
+            finally:
+                self._refresh_lock.release()
         
-        return filtered_users
+        threading.Thread(target=refresh, name="users-refresh", daemon=True).start()
+        return True
     
-    def _calculate_final_stats(self, processed_employees: Dict) -> Dict:
-        """Calcula estadísticas finales del reporte"""
-        if not processed_employees:
-            return {
-                'total_employees': 0,
-                'total_hours_worked': 0,
-                'total_regular_hours': 0,
-                'total_extra_hours_50': 0,
-                'total_extra_hours_100': 0,
-                'total_night_hours': 0,
-                'total_pending_hours': 0,
-                'avg_hours_per_employee': 0,
-                'total_entries_processed': 0,
-                'employees_with_multiple_entries': 0
-            }
-        
-        total_employees = len(processed_employees)
-        total_hours_worked = sum(emp['totals']['total_hours_worked'] for emp in processed_employees.values())
-        total_regular_hours = sum(emp['totals']['total_regular_hours'] for emp in processed_employees.values())
-        total_extra_hours_50 = sum(emp['totals']['total_extra_hours_50'] for emp in processed_employees.values())
-        total_extra_hours_100 = sum(emp['totals']['total_extra_hours_100'] for emp in processed_employees.values())
-        total_night_hours = sum(emp['totals']['total_night_hours'] for emp in processed_employees.values())
-        total_pending_hours = sum(emp['compensations']['remaining_pending_hours'] for emp in processed_employees.values())
-        
-        # Estadísticas adicionales para el reporte detallado
-        total_entries = 0
-        employees_with_multiple_entries = 0
-        
-        for employee_data in processed_employees.values():
-            for daily_record in employee_data['daily_data']:
-                entries_count = len(daily_record.get('raw_entries', []))
-                total_entries += entries_count
-                
-                if entries_count > 2:  # Más de una entrada y una salida
-                    employees_with_multiple_entries += 1
-        
-        return {
-            'total_employees': total_employees,
-            'total_hours_worked': round(total_hours_worked, 2),
-            'total_regular_hours': round(total_regular_hours, 2),
-            'total_extra_hours_50': round(total_extra_hours_50, 2),
-            'total_extra_hours_100': round(total_extra_hours_100, 2),
-            'total_night_hours': round(total_night_hours, 2),
-            'total_pending_hours': round(total_pending_hours, 2),
-            'avg_hours_per_employee': round(total_hours_worked / total_employees, 2) if total_employees > 0 else 0,
-            'total_entries_processed': total_entries,
-            'employees_with_multiple_entries': employees_with_multiple_entries
-        }
+    def _index_for(self, users: List[Dict]) -> UsersIndex:
+        """Índice del cache si `users` es el directorio cacheado; si no, uno nuevo"""
+        if users is self._users_index.users:
+            return self._users_index
+        return UsersIndex(users)
     
-    def get_available_filters(self, progress_callback: Callable = None) -> Dict:
-        """Obtiene los filtros disponibles basados en los usuarios"""
+    def _apply_user_filters(self, users: List[Dict], filters: Dict) -> List[Dict]:
+        """
+        Aplica filtros a la lista de usuarios
+        Filtros soportados: department, location, job_title (valor o lista de valores),
+        user_ids y active_only (por defecto True)
+        """
+        return self._index_for(users).query(
+            department=filters.get('department'),
+            location=filters.get('location'),
+            job_title=filters.get('job_title'),
+            active_only=filters.get('active_only', True),
+            user_ids=filters.get('user_ids')
+        )
+    
+    def build_columnar_store(self, processed_employees: Dict):
+        """Convierte empleados procesados al store columnar (agregados vectorizados)"""
+        from core.columnar_store import EmployeeDayStore  # NumPy sólo si se usa
+        return EmployeeDayStore.from_processed_employees(processed_employees)
+    
+    def get_available_filters(self, progress_callback: Callable = None,
+                              on_refresh: Callable = None) -> Dict:
+        """
+        Obtiene los filtros disponibles basados en los usuarios
+        Si hay un directorio persistido vencido se devuelve al instante y se refresca
+        en segundo plano; on_refresh(filters) se invoca cuando llegan los datos nuevos.
+        """
         try:
+            if self._persisted_directory and not self._is_cache_valid():
+                if progress_callback:
+                    progress_callback(80, "Usando directorio de usuarios local...")
+                self.refresh_users_in_background(on_refresh)
+                return dict(self._persisted_directory['filters'], from_cache=True)
+            
             if progress_callback:
                 progress_callback(20, "Obteniendo usuarios...")
             
@@ -531,28 +1025,13 @@ class DataProcessorEnhanced:
             if progress_callback:
                 progress_callback(60, f"Procesando {len(users)} usuarios...")
             
-            # Extraer departamentos únicos
-            departments = set()
-            locations = set()
-            job_titles = set()
-            
-            for user in users:
-                if user.get('department'):
-                    departments.add(user['department'])
-                if user.get('location'):
-                    locations.add(user['location'])
-                if user.get('jobTitle'):
-                    job_titles.add(user['jobTitle'])
+            # Departamentos, ubicaciones y puestos únicos (con conteos) desde el índice
+            filters = self._index_for(users).filters()
             
             if progress_callback:
                 progress_callback(80, "Configurando filtros...")
             
-            return {
-                'departments': sorted(list(departments)),
-                'locations': sorted(list(locations)),
-                'job_titles': sorted(list(job_titles)),
-                'total_users': len(users)
-            }
+            return filters
             
         except Exception as e:
             print(f"Error obteniendo filtros: {str(e)}")
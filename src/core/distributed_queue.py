@@ -0,0 +1,274 @@
+"""
+Cola de shards para el modo distribuido (SQLite sobre un directorio compartido)
+El coordinador publica un job (rango de fechas, permisos, versión del código) con sus
+shards de empleados; los workers de cualquier máquina que vea el directorio toman un
+shard con un lease, lo calculan y dejan el resultado en results/<job>/<shard>.json.z.
+Un shard cuyo lease vence sin terminar vuelve a estar disponible para otro worker.
+
+Jobs, shards, estadísticas y resultados se guardan como JSON comprimido (nunca pickle):
+el directorio es compartido entre máquinas y leerlo no debe poder ejecutar código.
+
+Sin servicios externos: sólo un archivo SQLite (journal clásico, no WAL, porque WAL
+no funciona sobre discos de red) y archivos de resultados escritos con rename atómico.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+
+QUEUE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    shard_count INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    job_id TEXT NOT NULL,
+    shard_index INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    leased_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    stats BLOB,
+    employees INTEGER,
+    day_summaries INTEGER,
+    PRIMARY KEY (job_id, shard_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS shards_status ON shards (status, job_id);
+"""
+
+
+def encode(obj) -> bytes:
+    """JSON compacto + zlib rápido (sólo tipos JSON: dicts, listas, strings, números)"""
+    return zlib.compress(json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 1)
+
+
+def decode(payload: bytes):
+    """Inversa de encode()"""
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def default_worker_id() -> str:
+    """Identificador del worker: máquina y proceso"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ShardQueue:
+    """Cola de jobs y shards compartida entre coordinador y workers"""
+
+    def __init__(self, queue_dir: str = None):
+        queue_dir = queue_dir or DEFAULT_CONFIG['distributed_queue_dir'] or os.path.join(
+            DEFAULT_CONFIG['cache_directory'], 'distributed')
+        self.queue_dir = os.path.expanduser(queue_dir)
+        self.results_dir = os.path.join(self.queue_dir, 'results')
+        self.lease_seconds = DEFAULT_CONFIG['distributed_lease_seconds']
+        self.max_attempts = DEFAULT_CONFIG['distributed_max_attempts']
+        os.makedirs(self.results_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        # isolation_level=None: las transacciones se abren a mano (BEGIN IMMEDIATE)
+        self._connection = sqlite3.connect(os.path.join(self.queue_dir, 'queue.sqlite3'), timeout=30,
+                                           isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=DELETE")
+        self._connection.executescript(SCHEMA)
+        with self._transaction():
+            self._connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('queue_version', ?)",
+                                     (str(QUEUE_VERSION),))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Transacción con lock de escritura desde el inicio (claims sin carreras entre máquinas)"""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    # --- Coordinador ---
+
+    def publish(self, tenant: str, code_version: str, start_date: str, end_date: str, source: str,
+                job_payload: Dict, shard_payloads: List[Dict]) -> str:
+        """Publica un job con sus shards (todos pendientes, payloads serializables a JSON) y devuelve su id"""
+        job_id = f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'running', ?)",
+                (job_id, tenant, code_version, start_date, end_date, source,
+                 encode(job_payload), len(shard_payloads), time.time())
+            )
+            connection.executemany(
+                "INSERT INTO shards (job_id, shard_index, payload, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, index, encode(payload)) for index, payload in enumerate(shard_payloads)]
+            )
+        os.makedirs(os.path.join(self.results_dir, job_id), exist_ok=True)
+        return job_id
+
+    def progress(self, job_id: str) -> Dict:
+        """
+        Estado de los shards del job
+        Returns:
+            {'pending', 'leased', 'done', 'failed', 'total', 'workers', 'errors'}
+            (failed = sin más intentos, incluye leases vencidos en el último intento)
+        """
+        now = time.time()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        workers = set()
+        errors = []
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT shard_index, status, worker, leased_until, attempts, error FROM shards WHERE job_id = ?",
+                (job_id,)
+            ).fetchall()
+        for shard_index, status, worker, leased_until, attempts, error in rows:
+            if status == 'leased' and leased_until < now and attempts >= self.max_attempts:
+                status, error = 'failed', error or f"lease vencido en {worker}"
+            counts[status] += 1
+            if status == 'done':
+                workers.add(worker)
+            if status == 'failed':
+                errors.append(f"shard {shard_index}: {error}")
+        counts.update(total=len(rows), workers=sorted(workers), errors=errors)
+        return counts
+
+    def shard_stats(self, job_id: str) -> List[Dict]:
+        """Estadísticas de cada shard terminado, en orden de shard"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT shard_index, stats, employees, day_summaries FROM shards "
+                "WHERE job_id = ? AND status = 'done' ORDER BY shard_index", (job_id,)
+            ).fetchall()
+        return [{'shard_index': shard_index, 'stats': decode(stats), 'employees': employees,
+                 'day_summaries': day_summaries}
+                for shard_index, stats, employees, day_summaries in rows]
+
+    def read_result(self, job_id: str, shard_index: int):
+        with open(self._result_path(job_id, shard_index), 'rb') as f:
+            return decode(f.read())
+
+    def finish(self, job_id: str, status: str = 'merged'):
+        """Cierra el job (merged / failed / cancelled) y borra sus resultados intermedios"""
+        with self._transaction() as connection:
+            connection.execute("UPDATE jobs SET status = ?, payload = X'' WHERE job_id = ?", (status, job_id))
+            connection.execute("DELETE FROM shards WHERE job_id = ?", (job_id,))
+        shutil.rmtree(os.path.join(self.results_dir, job_id), ignore_errors=True)
+
+    # --- Workers ---
+
+    def claim(self, tenant: str, code_version: str, worker: str, job_id: str = None) -> Optional[Dict]:
+        """
+        Toma el próximo shard disponible (pendiente o con lease vencido) de un job compatible
+        Returns:
+            {'job_id', 'shard_index', 'payload', 'attempts'} o None si no hay trabajo
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT s.job_id, s.shard_index, s.payload, s.attempts FROM shards s "
+                "JOIN jobs j ON j.job_id = s.job_id "
+                "WHERE j.status = 'running' AND j.tenant = ? AND j.code_version = ? "
+                "AND (? IS NULL OR j.job_id = ?) AND s.attempts < ? "
+                "AND (s.status = 'pending' OR (s.status = 'leased' AND s.leased_until < ?)) "
+                "ORDER BY j.created_at, s.shard_index LIMIT 1",
+                (tenant, code_version, job_id, job_id, self.max_attempts, now)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, leased_until = ?, attempts = attempts + 1 "
+                "WHERE job_id = ? AND shard_index = ?",
+                (worker, now + self.lease_seconds, row[0], row[1])
+            )
+        return {'job_id': row[0], 'shard_index': row[1], 'payload': decode(row[2]), 'attempts': row[3] + 1}
+
+    def incompatible_jobs(self, tenant: str, code_version: str) -> List[str]:
+        """Jobs en curso del tenant publicados con otra versión del código"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT job_id FROM jobs WHERE status = 'running' AND tenant = ? AND code_version != ?",
+                (tenant, code_version)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        """Datos del job que necesita un worker"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT start_date, end_date, source, payload, status FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        start_date, end_date, source, payload, status = row
+        return {'job_id': job_id, 'start_date': start_date, 'end_date': end_date, 'source': source,
+                'payload': decode(payload), 'status': status}
+
+    def _result_path(self, job_id: str, shard_index: int) -> str:
+        return os.path.join(self.results_dir, job_id, f"{shard_index:05d}.json.z")
+
+    def complete(self, job_id: str, shard_index: int, worker: str, result, stats,
+                 employees: int, day_summaries: int) -> bool:
+        """
+        Guarda el resultado del shard (result y stats serializables a JSON) y lo marca terminado
+        Si otro worker ya lo terminó (lease vencido y retomado) gana el primero: el
+        cálculo es determinístico, así que ambos resultados son iguales.
+        """
+        path = self._result_path(job_id, shard_index)
+        if not os.path.isdir(os.path.dirname(path)):
+            return False  # el job ya se cerró
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encode(result))
+        with self._transaction() as connection:
+            updated = connection.execute(
+                "UPDATE shards SET status = 'done', worker = ?, error = NULL, stats = ?, employees = ?, "
+                "day_summaries = ? WHERE job_id = ? AND shard_index = ? AND status != 'done'",
+                (worker, encode(stats), employees, day_summaries, job_id, shard_index)
+            ).rowcount
+            if updated:
+                os.replace(tmp_path, path)
+        if not updated:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+        return bool(updated)
+
+    def fail(self, job_id: str, shard_index: int, worker: str, error: str):
+        """Devuelve el shard a la cola (o lo deja fallido si no le quedan intentos)"""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, leased_until = NULL WHERE job_id = ? AND shard_index = ? "
+                "AND status = 'leased' AND worker = ?",
+                (self.max_attempts, error, job_id, shard_index, worker)
+            )
@@ -0,0 +1,300 @@
+"""
+Modo distribuido: coordinador y workers sobre una ShardQueue compartida
+El coordinador divide los empleados del directorio en shards (con sus permisos y saldos
+pendientes anteriores) y los publica en la cola. Cada worker, en cualquier máquina que
+vea el directorio de la cola, descarga los day summaries de su shard, lo calcula y deja
+el resultado. El coordinador (que por defecto también trabaja mientras espera) suma las
+estadísticas de los shards y escribe las salidas con los empleados en orden de shard,
+así el reporte es el mismo sin importar qué worker calculó cada parte.
+
+Todos los nodos tienen que usar la misma versión del código (los workers sólo toman
+jobs publicados con su misma versión) y la misma API key.
+"""
+
+import hashlib
+import time
+from typing import Callable, Dict, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+from core.distributed_queue import ShardQueue, default_worker_id
+from core.models import EmployeeInfo, employee_data_from_dict, employee_data_to_dict
+from core.permissions_matcher import PermissionsMatcher
+from core.pending_ledger import is_closed_period
+from core.report_cache import code_version
+from core.report_sinks import SinkFanOut, build_sinks
+from core.report_stats import ReportStatsAccumulator
+
+
+def tenant_key(api_client) -> str:
+    """Huella del tenant (base_url + API key), igual que los demás archivos por tenant"""
+    tenant = f"{api_client.base_url}|{api_client.api_key or ''}"
+    return hashlib.sha1(tenant.encode('utf-8')).hexdigest()[:12]
+
+
+class DistributedWorker:
+    """Toma shards de la cola, descarga y calcula sus empleados y publica el resultado"""
+
+    def __init__(self, processor, queue: ShardQueue = None, worker_id: str = None,
+                 use_process_pool: Optional[bool] = None):
+        self.processor = processor
+        self.queue = queue or ShardQueue()
+        self.worker_id = worker_id or default_worker_id()
+        self.use_process_pool = use_process_pool
+        self.tenant = tenant_key(processor.api_client)
+        self.code_version = code_version()
+        self._jobs: Dict[str, Dict] = {}
+        self._warned_jobs = set()
+
+    def process_next(self, job_id: str = None) -> bool:
+        """Procesa un shard (de job_id o de cualquier job compatible); False si no había trabajo"""
+        claim = self.queue.claim(self.tenant, self.code_version, self.worker_id, job_id)
+        if claim is None:
+            if job_id is None:
+                self._warn_incompatible()
+            return False
+
+        try:
+            job = self._job(claim['job_id'])
+            processed, stats, day_summaries = self._compute(job, claim['payload'])
+        except Exception as e:
+            print(f"❌ Shard {claim['shard_index']} del job {claim['job_id']} falló "
+                  f"(intento {claim['attempts']}): {str(e)}")
+            self.queue.fail(claim['job_id'], claim['shard_index'], self.worker_id, str(e))
+            return True
+
+        # El saldo anterior viaja con el resultado: el coordinador cierra el período en el libro
+        result = {
+            'employees': {employee_id: employee_data_to_dict(employee_data)
+                          for employee_id, employee_data in processed.items()},
+            'previous_pending': claim['payload']['previous_pending'],
+        }
+        self.queue.complete(claim['job_id'], claim['shard_index'], self.worker_id,
+                            result, stats.state(), len(processed), day_summaries)
+        print(f"🧩 Shard {claim['shard_index']} del job {claim['job_id']}: "
+              f"{len(processed)} empleados, {day_summaries} day summaries")
+        return True
+
+    def _job(self, job_id: str) -> Dict:
+        if job_id not in self._jobs:
+            job = self.queue.job(job_id)
+            if job is None:
+                raise ValueError(f"Job inexistente: {job_id}")
+            self._jobs = {job_id: job}  # sólo el job en curso
+        return self._jobs[job_id]
+
+    def _compute(self, job: Dict, shard: Dict):
+        """Descarga y calcula los empleados del shard"""
+        start_date, end_date = job['start_date'], job['end_date']
+        users = [EmployeeInfo.from_user(user) for user in shard['users']]
+        user_ids = [user.employeeInternalId for user in users]
+
+        data_source = self.processor.day_summaries_source(start_date, end_date, users, job['source'])
+        day_summaries = data_source.get_day_summaries(start_date, end_date, user_ids)
+
+        summaries_by_employee = {}
+        for summary in day_summaries:
+            employee_id = summary.get('employeeId')
+            if employee_id:
+                summaries_by_employee.setdefault(employee_id, []).append(summary)
+
+        stats = ReportStatsAccumulator()
+        processed = self.processor._process_employees(
+            summaries_by_employee, {user.employeeInternalId: user for user in users},
+            shard['permissions'], None, self.use_process_pool, stats, shard['previous_pending']
+        )
+        return processed, stats, len(day_summaries)
+
+    def _warn_incompatible(self):
+        for job_id in self.queue.incompatible_jobs(self.tenant, self.code_version):
+            if job_id not in self._warned_jobs:
+                self._warned_jobs.add(job_id)
+                print(f"⚠️ Job {job_id} publicado con otra versión del código: se ignora en este worker")
+
+    def run(self, idle_exit_seconds: float = None, max_shards: int = None) -> Dict:
+        """
+        Procesa shards hasta quedarse sin trabajo idle_exit_seconds (0 = nunca) o hasta max_shards
+        Returns:
+            {'success', 'worker', 'shards_processed'}
+        """
+        if idle_exit_seconds is None:
+            idle_exit_seconds = DEFAULT_CONFIG['distributed_worker_idle_exit_seconds']
+        poll_seconds = DEFAULT_CONFIG['distributed_poll_seconds']
+        print(f"👷 Worker {self.worker_id} esperando shards en {self.queue.queue_dir}")
+
+        shards_processed = 0
+        idle_since = time.monotonic()
+        while max_shards is None or shards_processed < max_shards:
+            if self.process_next():
+                shards_processed += 1
+                idle_since = time.monotonic()
+            elif idle_exit_seconds and time.monotonic() - idle_since >= idle_exit_seconds:
+                break
+            else:
+                time.sleep(poll_seconds)
+
+        return {'success': True, 'worker': self.worker_id, 'shards_processed': shards_processed}
+
+
+class DistributedCoordinator:
+    """Publica un reporte como shards, espera a los workers y escribe el reporte final"""
+
+    def __init__(self, processor, queue: ShardQueue = None):
+        self.processor = processor
+        self.queue = queue or ShardQueue()
+
+    def run(self, start_date: str, end_date: str, user_ids: List[str] = None,
+            progress_callback: Callable = None, output_filename: str = None,
+            outputs: Optional[List[str]] = None, source: Optional[str] = None,
+            shard_size: int = None, participate: bool = True,
+            use_process_pool: Optional[bool] = None, timeout_seconds: float = None,
+            output_format: Optional[str] = None) -> Dict:
+        """
+        Genera el reporte detallado repartiendo el cálculo entre los workers
+        participate: el coordinador también procesa shards mientras espera
+        timeout_seconds: tiempo máximo de espera de los shards (0 = sin límite)
+        Returns:
+            Mismo formato que process_attendance_report_detailed más 'distributed'
+        """
+        source = self.processor._resolve_source(source)
+        shard_size = shard_size or DEFAULT_CONFIG['distributed_shard_size']
+        if timeout_seconds is None:
+            timeout_seconds = DEFAULT_CONFIG['distributed_timeout_seconds']
+
+        if progress_callback:
+            progress_callback(0, "Iniciando reporte distribuido...")
+
+        # 1. Usuarios, permisos y saldos anteriores: una sola vez, en el coordinador
+        users = self.processor.get_users_list()
+        if user_ids:
+            users = self.processor._index_for(users).users_for_ids(set(user_ids))
+        employees = [EmployeeInfo.from_user(user) for user in users if user.get('employeeInternalId')]
+        if not employees:
+            return {'success': False, 'error': 'No hay empleados para el reporte', 'stage': 'validation'}
+
+        if progress_callback:
+            progress_callback(5, "Obteniendo permisos...")
+        permissions_data = self.processor.get_permissions_data(source)
+        matcher = PermissionsMatcher(permissions_data)
+        previous_pending = self.processor.previous_pending_balances(
+            start_date, [employee.employeeInternalId for employee in employees])
+
+        # 2. Publicar los shards (cada uno con sus permisos y saldos, autocontenido)
+        shards = []
+        for position in range(0, len(employees), shard_size):
+            shard_users = employees[position:position + shard_size]
+            shards.append({
+                'users': [user.to_dict() for user in shard_users],
+                'permissions': [permission for user in shard_users
+                                for permission in matcher.for_employee(user.employeeInternalId)],
+                'previous_pending': {user.employeeInternalId: previous_pending[user.employeeInternalId]
+                                     for user in shard_users if user.employeeInternalId in previous_pending},
+            })
+        job_id = self.queue.publish(tenant_key(self.processor.api_client), code_version(),
+                                    start_date, end_date, source,
+                                    {'coordinator': default_worker_id()}, shards)
+        print(f"📤 Job {job_id}: {len(employees)} empleados en {len(shards)} shards ({self.queue.queue_dir})")
+
+        status = 'failed'
+        try:
+            # 3. Esperar (y trabajar) hasta que todos los shards estén listos
+            progress = self._wait(job_id, progress_callback, participate, use_process_pool, timeout_seconds)
+            if progress['errors']:
+                return {'success': False, 'error': f"Shards fallidos: {'; '.join(progress['errors'])}",
+                        'stage': 'distributed', 'job_id': job_id}
+            if progress['done'] < progress['total']:
+                return {'success': False, 'error': f"Tiempo de espera agotado ({progress['done']}/"
+                                                   f"{progress['total']} shards)",
+                        'stage': 'distributed', 'job_id': job_id}
+
+            # 4. Merge en orden de shard
+            result = self._merge(job_id, start_date, end_date, outputs, output_filename,
+                                 permissions_data, progress_callback, output_format)
+            result['distributed'] = {'job_id': job_id, 'shards': len(shards), 'workers': progress['workers']}
+            status = 'merged'
+            return result
+        finally:
+            self.queue.finish(job_id, status)
+
+    def _wait(self, job_id: str, progress_callback: Callable, participate: bool,
+              use_process_pool: Optional[bool], timeout_seconds: float) -> Dict:
+        worker = None
+        if participate:
+            worker = DistributedWorker(self.processor, self.queue, use_process_pool=use_process_pool)
+        poll_seconds = DEFAULT_CONFIG['distributed_poll_seconds']
+        started = time.monotonic()
+        while True:
+            progress = self.queue.progress(job_id)
+            if progress['errors'] or progress['done'] == progress['total']:
+                return progress
+            if timeout_seconds and time.monotonic() - started >= timeout_seconds:
+                return progress
+            if progress_callback:
+                percent = 10 + int((progress['done'] / progress['total']) * 75)
+                progress_callback(percent, f"Shards listos: {progress['done']}/{progress['total']} "
+                                           f"({len(progress['workers'])} workers)")
+            if worker is None or not worker.process_next(job_id):
+                time.sleep(poll_seconds)
+
+    def _merge(self, job_id: str, start_date: str, end_date: str, outputs: Optional[List[str]],
+               output_filename: str, permissions_data: List[Dict], progress_callback: Callable,
+               output_format: Optional[str] = None) -> Dict:
+        """Suma las estadísticas y escribe las salidas leyendo un shard a la vez"""
+        if progress_callback:
+            progress_callback(85, "Combinando resultados de los shards...")
+
+        shard_stats = self.queue.shard_stats(job_id)
+        stats_accumulator = ReportStatsAccumulator()
+        for shard in shard_stats:
+            stats_accumulator.merge(ReportStatsAccumulator.from_state(shard['stats']))
+        total_day_summaries = sum(shard['day_summaries'] for shard in shard_stats)
+        if not total_day_summaries:
+            return {
+                'success': False,
+                'error': 'No se pudieron obtener day summaries',
+                'stage': 'api_fetch'
+            }
+
+        if progress_callback:
+            progress_callback(90, "Generando reporte Excel detallado...")
+
+        fanout = SinkFanOut(build_sinks(
+            outputs or DEFAULT_CONFIG['report_outputs'], self.processor.excel_generator,
+            start_date, end_date, output_filename, output_format=output_format
+        ))
+        try:
+            for shard in shard_stats:
+                result = self.queue.read_result(job_id, shard['shard_index'])
+                processed = {employee_id: employee_data_from_dict(data)
+                             for employee_id, data in result['employees'].items()}
+                previous_pending = result['previous_pending']
+                self.processor.close_pending_period(start_date, end_date, processed, previous_pending, save=False)
+                for employee_data in processed.values():
+                    fanout.add_employee(employee_data)
+        except BaseException:
+            fanout.abort()
+            raise
+        output_paths = fanout.close(stats_accumulator.max_pairs)
+        if self.processor._pending_ledger is not None and is_closed_period(end_date):
+            self.processor._pending_ledger.save()
+
+        if progress_callback:
+            progress_callback(100, "Reporte distribuido completado!")
+
+        total_employees = sum(shard['employees'] for shard in shard_stats)
+        return {
+            'success': True,
+            'excel_path': self.processor._main_output(output_paths),
+            'outputs': output_paths,
+            'stats': stats_accumulator.to_dict(),
+            'processed_employees': total_employees,
+            'date_range': {
+                'start_date': start_date,
+                'end_date': end_date
+            },
+            'report_type': 'detailed',
+            'api_stats': {
+                'total_day_summaries': total_day_summaries,
+                'total_employees_processed': total_employees,
+                'total_permissions': len(permissions_data)
+            }
+        }
@@ -0,0 +1,155 @@
+"""
+Memo del cálculo por empleado
+La clave es un digest del contenido de las entradas (day summaries, permisos del
+empleado, datos del empleado, saldo pendiente anterior, configuración del
+calculador y versión del motor).
+Si nada cambió entre dos corridas el empleado no se recalcula: corregir la fichada
+de un empleado y volver a generar el reporte recalcula sólo a ese empleado.
+
+En memoria se guarda el resultado empaquetado (pack), acotado por bytes: cada get
+devuelve una copia nueva, así que modificarla no altera lo memoizado.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.default_config import DEFAULT_CONFIG
+from core.employee_pool import EmployeeJob, compact_summary, pack, unpack
+
+# Incrementar cuando cambian las reglas de cálculo o el formato de employee_data
+ENGINE_VERSION = 2
+
+
+def calculator_fingerprint(calculator) -> Dict:
+    """Parámetros escalares del calculador (jornada, horario nocturno, tolerancias...)"""
+    return {name: value for name, value in sorted(vars(calculator).items())
+            if isinstance(value, (bool, int, float, str))}
+
+
+class EmployeeMemo:
+    """Cache LRU en memoria (y opcionalmente en disco) de employee_data por digest de entradas"""
+
+    def __init__(self, calculator, max_bytes: int = None, disk_enabled: bool = None,
+                 cache_dir: str = None):
+        if max_bytes is None:
+            max_bytes = int(DEFAULT_CONFIG['employee_memo_max_mb'] * 1024 * 1024)
+        self.max_bytes = max_bytes
+        if disk_enabled is None:
+            disk_enabled = DEFAULT_CONFIG['employee_memo_disk_enabled']
+        self.disk_dir = None
+        if disk_enabled:
+            base_dir = os.path.expanduser(cache_dir or DEFAULT_CONFIG['cache_directory'])
+            self.disk_dir = os.path.join(base_dir, 'employee_memo')
+
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._salt = json.dumps(
+            {'engine': ENGINE_VERSION, 'calculator': calculator_fingerprint(calculator)},
+            sort_keys=True
+        ).encode('utf-8')
+
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, job: EmployeeJob) -> str:
+        """Digest de las entradas de un empleado"""
+        employee_id, employee_summaries, employee_info, employee_permissions, previous_pending_hours = job
+        payload = {
+            'employee_id': employee_id,
+            'employee_info': employee_info.to_dict() if hasattr(employee_info, 'to_dict') else employee_info,
+            'summaries': [compact_summary(summary) for summary in employee_summaries],
+            'permissions': employee_permissions,
+            'previous_pending_hours': previous_pending_hours,
+        }
+        digest = hashlib.sha256(self._salt)
+        digest.update(json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                                 default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """employee_data memoizado (copia nueva) o None"""
+        with self._lock:
+            packed = self._entries.get(key)
+            if packed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if packed is not None:
+            return unpack(packed)
+
+        loaded = self._load(key)
+        with self._lock:
+            if loaded is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, loaded[0])
+        return loaded[1]
+
+    def put(self, key: str, employee_data: Dict):
+        """Guarda un employee_data recién calculado"""
+        packed = pack(employee_data)
+        with self._lock:
+            self._remember(key, packed)
+        self._store(key, packed)
+
+    def clear(self):
+        """Vacía la memoria y el directorio en disco"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, packed: bytes):
+        if len(packed) > self.max_bytes:
+            return  # no entra (o max_bytes = 0: sólo disco)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = packed
+        self._bytes += len(packed)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.bin")
+
+    def _load(self, key: str) -> Optional[Tuple[bytes, Dict]]:
+        """(empaquetado, employee_data) desde disco o None"""
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                packed = f.read()
+            return packed, unpack(packed)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Memo de empleado inválido en disco, se recalcula: {str(e)}")
+            return None
+
+    def _store(self, key: str, packed: bytes):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(packed)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el memo del empleado: {str(e)}")
@@ -0,0 +1,169 @@
+"""
+Pool de procesos para el cálculo de horas por empleado
+Reparte los empleados en shards sobre un pool de workers que se mantiene caliente
+entre reportes. Entradas y resultados viajan como pickle comprimido para minimizar IPC.
+"""
+
+import os
+import pickle
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.default_config import DEFAULT_CONFIG
+from core.hours_calculator import ArgentineHoursCalculator
+from core.permissions_matcher import PermissionsMatcher
+
+# Campos del day summary que usa el calculador; el resto no se envía a los workers
+SUMMARY_FIELDS = (
+    'id', 'referenceDate', 'date', 'weekday', 'entries', 'timeSlots', 'incidences',
+    'hours', 'totalHours', 'holidays', 'timeOffRequests', 'isWorkday'
+)
+ENTRY_FIELDS = ('time', 'type', 'comment', 'site')
+
+# (employee_id, day_summaries, employee_info, permisos del empleado, saldo pendiente anterior)
+EmployeeJob = Tuple[str, List[Dict], Dict, List[Dict], float]
+
+# Calculador propio de cada worker (se crea una sola vez por proceso)
+_worker_calculator = None
+
+
+def pack(obj) -> bytes:
+    """Serializa de forma compacta (pickle binario + zlib rápido)"""
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def unpack(payload: bytes):
+    """Inversa de pack()"""
+    return pickle.loads(zlib.decompress(payload))
+
+
+def compact_summary(summary: Dict) -> Dict:
+    """Reduce un day summary a los campos que necesita el calculador"""
+    compact = {key: summary[key] for key in SUMMARY_FIELDS if key in summary}
+    entries = compact.get('entries')
+    if entries:
+        compact['entries'] = [
+            {key: entry[key] for key in ENTRY_FIELDS if key in entry}
+            for entry in entries
+        ]
+    return compact
+
+
+def process_employee_job(calculator, job: EmployeeJob) -> Dict:
+    """Calcula horas y enriquece con permisos un único empleado"""
+    _, employee_summaries, employee_info, employee_permissions, previous_pending_hours = job
+    employee_data = calculator.process_employee_data(
+        employee_summaries, employee_info, previous_pending_hours, None
+    )
+    PermissionsMatcher(employee_permissions).enrich(employee_data)
+    return employee_data
+
+
+def process_employee_jobs(calculator, jobs: List[EmployeeJob]) -> List[Tuple[str, Dict]]:
+    """
+    Calcula varios empleados; con vectorized_hours_enabled la distribución de horas
+    de todos los días se resuelve en una sola pasada vectorizada
+    """
+    if not DEFAULT_CONFIG['vectorized_hours_enabled'] or not jobs:
+        return [(job[0], process_employee_job(calculator, job)) for job in jobs]
+
+    computed = calculator.process_employees_batch([(job[1], job[2]) for job in jobs],
+                                                  [job[4] for job in jobs])
+    results = []
+    for job, employee_data in zip(jobs, computed):
+        PermissionsMatcher(job[3]).enrich(employee_data)
+        results.append((job[0], employee_data))
+    return results
+
+
+def _init_worker():
+    """Inicializa el worker (calculador precargado)"""
+    global _worker_calculator
+    _worker_calculator = ArgentineHoursCalculator()
+
+
+def _warm_up() -> int:
+    """Tarea vacía usada para levantar los procesos por adelantado"""
+    return os.getpid()
+
+
+def _process_shard(payload: bytes) -> bytes:
+    """Procesa un shard completo dentro de un worker"""
+    jobs: List[EmployeeJob] = unpack(payload)
+    return pack(process_employee_jobs(_worker_calculator, jobs))
+
+
+class EmployeeProcessPool:
+    """Pool de procesos reutilizable para procesar empleados en paralelo"""
+
+    def __init__(self, max_workers: int = None, shard_size: int = None,
+                 min_employees: int = None):
+        self.max_workers = max_workers or DEFAULT_CONFIG['process_pool_workers'] or os.cpu_count() or 1
+        self.shard_size = shard_size or DEFAULT_CONFIG['process_pool_shard_size']
+        self.min_employees = (min_employees if min_employees is not None
+                              else DEFAULT_CONFIG['process_pool_min_employees'])
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker
+            )
+        return self._executor
+
+    def warm_up(self):
+        """Levanta los workers antes del primer reporte"""
+        executor = self._get_executor()
+        futures = [executor.submit(_warm_up) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def should_use_pool(self, job_count: int) -> bool:
+        """Los trabajos chicos se procesan en el proceso principal"""
+        return self.max_workers > 1 and job_count >= self.min_employees
+
+    def process(self, jobs: List[EmployeeJob],
+                progress_callback: Callable = None) -> Dict[str, Dict]:
+        """
+        Procesa los empleados en el pool
+        Returns:
+            Dict employee_id -> employee_data en el mismo orden que `jobs`
+        """
+        shards = [
+            [(eid, [compact_summary(s) for s in summaries], info, permissions, previous_pending_hours)
+             for eid, summaries, info, permissions, previous_pending_hours in jobs[i:i + self.shard_size]]
+            for i in range(0, len(jobs), self.shard_size)
+        ]
+        print(f"⚙️ Procesando {len(jobs)} empleados en {len(shards)} shards "
+              f"con {self.max_workers} procesos")
+
+        executor = self._get_executor()
+        shard_results: List[Optional[List]] = [None] * len(shards)
+        try:
+            futures = {executor.submit(_process_shard, pack(shard)): index
+                       for index, shard in enumerate(shards)}
+            completed = 0
+            for future in as_completed(futures):
+                shard_results[futures[future]] = unpack(future.result())
+                completed += 1
+                if progress_callback:
+                    progress_callback(completed, len(shards))
+        except BrokenProcessPool:
+            # Un worker murió: descartar el pool para que el próximo uso lo recree
+            self.shutdown()
+            raise
+
+        # Merge determinístico: siempre en el orden de entrada
+        processed = {}
+        for shard_result in shard_results:
+            for employee_id, employee_data in shard_result:
+                processed[employee_id] = employee_data
+        return processed
+
+    def shutdown(self):
+        """Detiene los workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,7 +1,7 @@
 """
 Generador de archivo Excel con columnas detalladas de fichadas - VERSIÓN FINAL
 Incluye sedes, incidencias, headers corregidos y máximo 4 pares entrada/salida
-RESTA 3 HORAS para convertir UTC a horario de Argentina
+Horas de fichadas en horario de Argentina (ZoneInfo, parseadas una sola vez en el modelo)
 Colores informativos: Solo "Sí" destacados, resto en blanco
 NUEVA FUNCIONALIDAD: Columna de Permisos Pedidos Aprobados
 CORREGIDO: Columna de permisos con text wrapping y ancho ajustado
@@ -9,13 +9,37 @@ AGREGADO: Columna para Ausencias
 ELIMINADO: Horas Nocturnas
 """
 
+import contextlib
 import os
-from datetime import datetime, timedelta
+import shutil
+import tempfile
+from datetime import datetime
 from typing import Dict, List
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
 from config.default_config import DEFAULT_CONFIG
+from core.models import DailyRecord
+from core.spill_buffer import SpillBuffer
+
+# Layout de columnas de la hoja detallada
+MAX_PAIRS = 4
+COL_FECHA = 4
+COL_TURNO = 6
+COL_PERMISOS = 7
+COL_AUSENCIA = 8  # NUEVA COLUMNA DE AUSENCIAS
+COL_TARDANZA = 9  # Movido una posición
+COL_TRABAJO_MENOS = 10  # Movido una posición
+COL_ENTRIES_START = 11  # Ajustado por la nueva columna
+
+
+def trim_pair_columns(values: List, max_pairs: int, used_pairs: int) -> List:
+    """Fila armada con max_pairs pares reducida a used_pairs (sin las columnas de pares sobrantes)"""
+    if used_pairs >= max_pairs:
+        return values
+    return values[:COL_ENTRIES_START - 1 + used_pairs * 6] + values[COL_ENTRIES_START - 1 + max_pairs * 6:]
 
 
 class ExcelReportGeneratorDetailed:
@@ -42,6 +66,8 @@ class ExcelReportGeneratorDetailed:
         )
         
         self.center_alignment = Alignment(horizontal='center', vertical='center')
+        self.wrap_alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
+        self.title_font = Font(size=16, bold=True)
 
     def _format_hours_exact(self, hours_float: float) -> str:
         """Convierte horas decimales a string EXACTO sin redondeo"""
@@ -69,73 +95,31 @@ class ExcelReportGeneratorDetailed:
             return f"{start_time}-{end_time}"
         return ""
 
-    def _process_entries_for_columns(self, entries: List[Dict]) -> Dict:
+    def _process_entries_for_columns(self, entries: List[Dict], pairs: List = None) -> Dict:
         """
-        Procesa las entries y las organiza en PARES de entrada/salida
-        Máximo 4 pares (8 entradas total)
-        RESTA 3 HORAS para convertir UTC a horario de Argentina
+        Organiza las entries en PARES de entrada/salida (máximo 4 pares, 8 entradas total)
+        Usa las fichadas ya normalizadas (ordenadas, hora local AR y pares) del registro diario
         """
-        # Ordenar entries por tiempo
-        sorted_entries = sorted(entries, key=lambda x: x.get('time', ''))
-        
-        # Agrupar en pares entrada/salida
-        pairs = []
-        current_start = None
-        
-        for entry in sorted_entries:
-            entry_type = entry.get('type')
-            time_str = entry.get('time', '')
-            comment = entry.get('comment', '')
-            site_name = entry.get('site', {}).get('name', '') if entry.get('site') else ''
-            
-            # Extraer hora en formato HH:MM y RESTAR 3 HORAS
-            try:
-                if time_str:
-                    dt = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-                    # RESTAR 3 HORAS para convertir UTC a Argentina
-                    dt_argentina = dt - timedelta(hours=3)
-                    time_formatted = dt_argentina.strftime('%H:%M')
-                else:
-                    time_formatted = ''
-            except:
-                time_formatted = ''
-            
-            if entry_type == 'START':
-                current_start = {
-                    'time': time_formatted,
-                    'comment': comment or '',
-                    'site': site_name,
-                    'raw_entry': entry
-                }
-            elif entry_type == 'END' and current_start:
-                # Completar el par
-                pairs.append({
-                    'entrada_hora': current_start['time'],
-                    'entrada_comment': current_start['comment'],
-                    'entrada_site': current_start['site'],
-                    'salida_hora': time_formatted,
-                    'salida_comment': comment or '',
-                    'salida_site': site_name
-                })
-                current_start = None
-        
-        # Si queda un START sin END
-        if current_start:
-            pairs.append({
-                'entrada_hora': current_start['time'],
-                'entrada_comment': current_start['comment'],
-                'entrada_site': current_start['site'],
-                'salida_hora': '',
-                'salida_comment': '',
-                'salida_site': ''
-            })
+        entries = DailyRecord.compact_entries(entries)
+        if pairs is None:
+            pairs = DailyRecord.pair_entries(entries)
         
-        # Limitar a máximo 4 pares
-        pairs = pairs[:4]
+        columns = []
+        for start_index, end_index in pairs[:MAX_PAIRS]:
+            start = entries[start_index]
+            end = entries[end_index] if end_index >= 0 else None
+            columns.append({
+                'entrada_hora': start.local_time,
+                'entrada_comment': start.comment or '',
+                'entrada_site': start.site,
+                'salida_hora': end.local_time if end else '',
+                'salida_comment': (end.comment or '') if end else '',
+                'salida_site': end.site if end else ''
+            })
         
         return {
-            'pairs': pairs,
-            'total_pairs': len(pairs)
+            'pairs': columns,
+            'total_pairs': len(columns)
         }
 
     def _determine_max_pairs(self, processed_data: Dict) -> int:
@@ -144,62 +128,63 @@ class ExcelReportGeneratorDetailed:
         
         for employee_data in processed_data.values():
             for daily_record in employee_data['daily_data']:
-                entries = daily_record.get('raw_entries', [])
-                if entries:
-                    entry_data = self._process_entries_for_columns(entries)
-                    max_pairs = max(max_pairs, entry_data['total_pairs'])
+                max_pairs = max(max_pairs, min(len(daily_record['entry_pairs']), MAX_PAIRS))
         
-        return min(max(max_pairs, 1), 4)  # Mínimo 1, máximo 4
+        return min(max(max_pairs, 1), MAX_PAIRS)  # Mínimo 1, máximo 4
     
     def generate_report(self, processed_data: Dict, start_date: str, end_date: str, 
-                       output_filename: str = None) -> str:
+                       output_filename: str = None, max_pairs: int = None) -> str:
         """
         Genera el reporte Excel con columnas detalladas - VERSIÓN FINAL
+        max_pairs: ancho ya conocido (p.ej. de ReportStatsAccumulator); si falta se calcula
         """
         try:
             # Determinar número máximo de pares (máximo 4)
-            max_pairs = self._determine_max_pairs(processed_data)
-            
-            # Crear workbook
-            wb = Workbook()
-            wb.remove(wb.active)
+            if max_pairs is None:
+                max_pairs = self._determine_max_pairs(processed_data)
             
             # Crear hoja con columnas detalladas
-            self._create_detailed_sheet(wb, processed_data, start_date, end_date, max_pairs)
-            
-            # Generar nombre de archivo
-            if not output_filename:
-                output_filename = self.filename_format.format(
-                    start_date=start_date.replace('-', ''),
-                    end_date=end_date.replace('-', '')
-                ).replace('.xlsx', '_detallado.xlsx')
+            writer = self.sheet_writer(start_date, end_date, max_pairs, len(processed_data))
+            for employee_data in processed_data.values():
+                writer.add_employee(self.build_employee_rows(employee_data, max_pairs))
             
-            # Asegurar que el directorio existe
-            os.makedirs(self.output_dir, exist_ok=True)
-            
-            # Guardar archivo
-            filepath = os.path.join(self.output_dir, output_filename)
-            wb.save(filepath)
-            
-            return filepath
+            return writer.close(output_filename)
             
         except Exception as e:
             print(f"Error generando reporte Excel detallado: {str(e)}")
             raise
 
-    def _create_detailed_sheet(self, wb: Workbook, processed_data: Dict, 
-                              start_date: str, end_date: str, max_pairs: int):
-        """Crea la hoja con columnas detalladas de fichadas - VERSIÓN FINAL"""
-        ws = wb.create_sheet("Fichadas Detalladas")
-        
-        # Título
-        ws.cell(row=1, column=1, value=f"Reporte de Asistencia Detallado - {start_date} a {end_date}")
-        ws.cell(row=1, column=1).font = Font(size=16, bold=True)
-        
-        # Información adicional
-        ws.cell(row=2, column=1, value=f"Fecha generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        ws.cell(row=3, column=1, value=f"Empleados procesados: {len(processed_data)}")
-        
+    def sheet_writer(self, start_date: str, end_date: str, max_pairs: int,
+                     employee_count: int = None, backend: str = None):
+        """
+        Writer de la hoja detallada con el ancho de pares definitivo
+        backend: "write_only", "standard" o "xlsxwriter" (None usa excel_backend);
+            write_only y xlsxwriter necesitan employee_count porque escriben las filas en orden
+        """
+        backend = backend or DEFAULT_CONFIG['excel_backend']
+        if backend == 'xlsxwriter':
+            return XlsxWriterSheetWriter(self, start_date, end_date, max_pairs, employee_count)
+        if backend == 'write_only':
+            return WriteOnlySheetWriter(self, start_date, end_date, max_pairs, employee_count)
+        return DetailedSheetWriter(self, start_date, end_date, max_pairs)
+
+    def output_path(self, output_filename: str, start_date: str, end_date: str) -> str:
+        """Ruta final del reporte (crea el directorio); output_filename puede ser absoluto"""
+        if not output_filename:
+            output_filename = self.default_filename(start_date, end_date)
+        filepath = os.path.join(self.output_dir, os.path.expanduser(output_filename))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        return filepath
+
+    def default_filename(self, start_date: str, end_date: str) -> str:
+        """Nombre de archivo por defecto del reporte detallado"""
+        return self.filename_format.format(
+            start_date=start_date.replace('-', ''),
+            end_date=end_date.replace('-', '')
+        ).replace('.xlsx', '_detallado.xlsx')
+
+    def build_headers(self, max_pairs: int) -> List[str]:
+        """Headers de la hoja detallada para `max_pairs` pares entrada/salida"""
         # Headers base - AGREGANDO COLUMNA DE AUSENCIAS
         base_headers = [
             'ID Empleado', 'Nombre', 'Apellido', 'Fecha', 'Día Semana', 
@@ -227,178 +212,505 @@ class ExcelReportGeneratorDetailed:
         ]
         
         # Combinar todos los headers
-        all_headers = base_headers + entry_headers + summary_headers
+        return base_headers + entry_headers + summary_headers
+
+    def build_employee_rows(self, employee_data: Dict, max_pairs: int) -> List[List]:
+        """Construye los valores de las filas (una por día) de un empleado"""
+        rows = []
+        employee_info = employee_data['employee_info']
         
-        # Escribir headers
-        for col, header in enumerate(all_headers, 1):
-            cell = ws.cell(row=5, column=col, value=header)
-            cell.font = self.header_font
-            cell.fill = self.header_fill
+        for daily_record in employee_data['daily_data']:
+            # Obtener incidencias
+            incidences = daily_record.get('incidences', [])
+            
+            # Procesar incidencias
+            has_late = 'LATE' in incidences
+            has_underworked = 'UNDERWORKED' in incidences
+            has_absence = daily_record.get('has_absence', False)  # DETECTAR AUSENCIAS
+            
+            # Obtener permiso para esta fila
+            permission_text = daily_record.get('permission_request', '')
+            
+            # Datos base CON PERMISOS Y AUSENCIAS
+            base_data = [
+                employee_info.get('employeeInternalId', ''),
+                employee_info.get('firstName', ''),
+                employee_info.get('lastName', ''),
+                daily_record['date'],
+                daily_record['day_of_week'],
+                self._format_turno_from_timeslots(daily_record.get('time_slots', [])),
+                permission_text,  # COLUMNA DE PERMISOS
+                'Sí' if has_absence else 'No',  # NUEVA COLUMNA DE AUSENCIAS
+                'Sí' if has_late else 'No',
+                'Sí' if has_underworked else 'No'
+            ]
+            
+            # Procesar entries para pares
+            raw_entries = daily_record.get('raw_entries', [])
+            entry_data = self._process_entries_for_columns(raw_entries, daily_record['entry_pairs'])
+            
+            # Datos de pares entrada/salida
+            entry_columns_data = []
+            for i in range(max_pairs):
+                if i < len(entry_data['pairs']):
+                    pair = entry_data['pairs'][i]
+                    entry_columns_data.extend([
+                        pair['entrada_site'],
+                        pair['entrada_hora'],
+                        pair['entrada_comment'],
+                        pair['salida_site'],
+                        pair['salida_hora'],
+                        pair['salida_comment']
+                    ])
+                else:
+                    entry_columns_data.extend(['', '', '', '', '', ''])
+            
+            # Datos de resumen - ELIMINADO daily_record['night_hours']
+            observations = []
+            if daily_record['is_holiday']:
+                observations.append(f"Feriado: {daily_record['holiday_name'] or 'N/A'}")
+            if daily_record['has_time_off']:
+                observations.append(f"Licencia: {daily_record['time_off_name'] or 'N/A'}")
+            if has_absence:  # AGREGAR AUSENCIA A OBSERVACIONES
+                observations.append("Ausencia")
+            if daily_record['pending_hours'] > 0:
+                observations.append(f"{self._format_hours_exact(daily_record['pending_hours'])} pendientes")
+            if has_late:
+                observations.append("Tardanza")
+            if has_underworked:
+                observations.append("Trabajo insuficiente")
+            if permission_text:
+                observations.append("Permiso solicitado")
+            
+            summary_data = [
+                self._format_hours_exact(daily_record['hours_worked']),
+                self._format_hours_exact(daily_record['regular_hours']),
+                self._format_hours_exact(daily_record['extra_hours_50']),
+                self._format_hours_exact(daily_record['extra_hours_100']),
+                # ELIMINADO: self._format_hours_exact(daily_record['night_hours']),
+                self._format_hours_exact(daily_record['pending_hours']),
+                'Sí' if daily_record['is_holiday'] else 'No',
+                daily_record['holiday_name'] or '',
+                'Sí' if daily_record['has_time_off'] else 'No',
+                daily_record['time_off_name'] or '',
+                ', '.join(observations) if observations else ''
+            ]
+            
+            # Combinar todos los datos
+            rows.append(base_data + entry_columns_data + summary_data)
+        
+        return rows
+
+    def _write_data_row(self, ws, row: int, values: List, max_pairs: int):
+        """Escribe una fila de datos aplicando bordes y colores por columna"""
+        COL_SUMMARY_START = COL_ENTRIES_START + (max_pairs * 6)
+        
+        for col, value in enumerate(values, 1):
+            cell = ws.cell(row=row, column=col, value=value)
             cell.border = self.thin_border
-            cell.alignment = self.center_alignment
-        
-        # Calcular índices de columnas importantes - ACTUALIZADO PARA NUEVA COLUMNA
-        COL_TURNO = 6
-        COL_PERMISOS = 7
-        COL_AUSENCIA = 8  # NUEVA COLUMNA DE AUSENCIAS
-        COL_TARDANZA = 9  # Movido una posición
-        COL_TRABAJO_MENOS = 10  # Movido una posición
-        COL_ENTRIES_START = 11  # Ajustado por la nueva columna
+            fill, alignment = self._cell_style(col, value, COL_SUMMARY_START)
+            if fill is not None:
+                cell.fill = fill
+            if alignment is not None:
+                cell.alignment = alignment
+
+    def _cell_style(self, col: int, value, COL_SUMMARY_START: int):
+        """(fill, alignment) de una celda de datos según su columna y valor (None = sin estilo)"""
+        # Aplicar colores según el tipo de columna
+        if col == COL_TURNO:
+            return self.white_fill, None  # Blanco
+        if col == COL_PERMISOS:
+            # Color celeste para la columna de permisos CON TEXT WRAPPING
+            if value and value.strip():
+                return self.light_blue_fill, self.wrap_alignment  # Celeste si hay permiso
+            return self.white_fill, None  # Blanco si no hay permiso
+        if col == COL_AUSENCIA:  # NUEVA COLUMNA DE AUSENCIAS
+            # Naranja para ausencias, blanco si no hay ausencia
+            return (self.orange_fill if value == 'Sí' else self.white_fill), None
+        if col == COL_TARDANZA:
+            # Rojo para Sí, verde para No
+            return (self.red_fill if value == 'Sí' else self.green_fill), None
+        if col == COL_TRABAJO_MENOS:
+            return self.green_fill, None  # Verde siempre (Sí y No)
+        if COL_ENTRIES_START <= col < COL_SUMMARY_START:
+            # Todas las columnas de entries en blanco
+            return self.white_fill, None
+        if col >= COL_SUMMARY_START:
+            # Columnas de resumen - AJUSTADO POR ELIMINACIÓN DE HORAS NOCTURNAS
+            summary_col_offset = col - COL_SUMMARY_START
+            # Es Feriado (offset 5) y Tiene Licencia (offset 7): verde para Sí
+            if summary_col_offset in (5, 7) and value == 'Sí':
+                return self.green_fill, None
+            # Todas las demás columnas de resumen en blanco
+            return self.white_fill, None
+        return None, None
+
+    def column_widths(self, max_pairs: int, total_columns: int) -> List[int]:
+        """Ancho de cada columna (la primera es la columna 1) - ACTUALIZADO PARA NUEVA COLUMNA"""
         COL_SUMMARY_START = COL_ENTRIES_START + (max_pairs * 6)
         
-        # Escribir datos
-        row = 6
-        for employee_data in processed_data.values():
-            employee_info = employee_data['employee_info']
-            
-            for daily_record in employee_data['daily_data']:
-                # Obtener incidencias
-                incidences = daily_record.get('incidences', [])
-                
-                # Procesar incidencias
-                has_late = 'LATE' in incidences
-                has_underworked = 'UNDERWORKED' in incidences
-                has_absence = daily_record.get('has_absence', False)  # DETECTAR AUSENCIAS
-                
-                # Obtener permiso para esta fila
-                permission_text = daily_record.get('permission_request', '')
-                
-                # Datos base CON PERMISOS Y AUSENCIAS
-                base_data = [
-                    employee_info.get('employeeInternalId', ''),
-                    employee_info.get('firstName', ''),
-                    employee_info.get('lastName', ''),
-                    daily_record['date'],
-                    daily_record['day_of_week'],
-                    self._format_turno_from_timeslots(daily_record.get('time_slots', [])),
-                    permission_text,  # COLUMNA DE PERMISOS
-                    'Sí' if has_absence else 'No',  # NUEVA COLUMNA DE AUSENCIAS
-                    'Sí' if has_late else 'No',
-                    'Sí' if has_underworked else 'No'
-                ]
-                
-                # Procesar entries para pares
-                raw_entries = daily_record.get('raw_entries', [])
-                entry_data = self._process_entries_for_columns(raw_entries)
-                
-                # Datos de pares entrada/salida
-                entry_columns_data = []
-                for i in range(max_pairs):
-                    if i < len(entry_data['pairs']):
-                        pair = entry_data['pairs'][i]
-                        entry_columns_data.extend([
-                            pair['entrada_site'],
-                            pair['entrada_hora'],
-                            pair['entrada_comment'],
-                            pair['salida_site'],
-                            pair['salida_hora'],
-                            pair['salida_comment']
-                        ])
-                    else:
-                        entry_columns_data.extend(['', '', '', '', '', ''])
-                
-                # Datos de resumen - ELIMINADO daily_record['night_hours']
-                observations = []
-                if daily_record['is_holiday']:
-                    observations.append(f"Feriado: {daily_record['holiday_name'] or 'N/A'}")
-                if daily_record['has_time_off']:
-                    observations.append(f"Licencia: {daily_record['time_off_name'] or 'N/A'}")
-                if has_absence:  # AGREGAR AUSENCIA A OBSERVACIONES
-                    observations.append("Ausencia")
-                if daily_record['pending_hours'] > 0:
-                    observations.append(f"{self._format_hours_exact(daily_record['pending_hours'])} pendientes")
-                if has_late:
-                    observations.append("Tardanza")
-                if has_underworked:
-                    observations.append("Trabajo insuficiente")
-                if permission_text:
-                    observations.append("Permiso solicitado")
-                
-                summary_data = [
-                    self._format_hours_exact(daily_record['hours_worked']),
-                    self._format_hours_exact(daily_record['regular_hours']),
-                    self._format_hours_exact(daily_record['extra_hours_50']),
-                    self._format_hours_exact(daily_record['extra_hours_100']),
-                    # ELIMINADO: self._format_hours_exact(daily_record['night_hours']),
-                    self._format_hours_exact(daily_record['pending_hours']),
-                    'Sí' if daily_record['is_holiday'] else 'No',
-                    daily_record['holiday_name'] or '',
-                    'Sí' if daily_record['has_time_off'] else 'No',
-                    daily_record['time_off_name'] or '',
-                    ', '.join(observations) if observations else ''
-                ]
-                
-                # Combinar todos los datos
-                complete_row = base_data + entry_columns_data + summary_data
-                
-                # Escribir la fila
-                for col, value in enumerate(complete_row, 1):
-                    cell = ws.cell(row=row, column=col, value=value)
-                    cell.border = self.thin_border
-                    
-                    # Aplicar colores según el tipo de columna
-                    if col == COL_TURNO:
-                        cell.fill = self.white_fill  # Blanco
-                    elif col == COL_PERMISOS:
-                        # Color celeste para la columna de permisos CON TEXT WRAPPING
-                        if value and value.strip():
-                            cell.fill = self.light_blue_fill  # Celeste si hay permiso
-                            cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)  # TEXT WRAPPING
-                        else:
-                            cell.fill = self.white_fill  # Blanco si no hay permiso
-                    elif col == COL_AUSENCIA:  # NUEVA COLUMNA DE AUSENCIAS
-                        if has_absence and value == 'Sí':
-                            cell.fill = self.orange_fill  # Naranja para ausencias
-                        else:
-                            cell.fill = self.white_fill  # Blanco si no hay ausencia
-                    elif col == COL_TARDANZA:
-                        if has_late and value == 'Sí':
-                            cell.fill = self.red_fill  # Rojo para Sí
-                        else:
-                            cell.fill = self.green_fill  # Verde para No
-                    elif col == COL_TRABAJO_MENOS:
-                        cell.fill = self.green_fill  # Verde siempre (Sí y No)
-                    elif COL_ENTRIES_START <= col < COL_SUMMARY_START:
-                        # Todas las columnas de entries en blanco
-                        cell.fill = self.white_fill
-                    elif col >= COL_SUMMARY_START:
-                        # Columnas de resumen - AJUSTADO POR ELIMINACIÓN DE HORAS NOCTURNAS
-                        summary_col_offset = col - COL_SUMMARY_START
-                        if summary_col_offset == 5:  # Es Feriado (antes era 6, ahora 5)
-                            if value == 'Sí':
-                                cell.fill = self.green_fill  # Verde para Sí
-                            else:
-                                cell.fill = self.white_fill  # Blanco para No
-                        elif summary_col_offset == 7:  # Tiene Licencia (antes era 8, ahora 7)
-                            if value == 'Sí':
-                                cell.fill = self.green_fill  # Verde para Sí
-                            else:
-                                cell.fill = self.white_fill  # Blanco para No
-                        else:
-                            # Todas las demás columnas de resumen en blanco
-                            cell.fill = self.white_fill
-                
-                row += 1
-        
-        # Ajustar ancho de columnas - ACTUALIZADO PARA NUEVA COLUMNA
-        for col in range(1, len(all_headers) + 1):
+        widths = []
+        for col in range(1, total_columns + 1):
             if col <= 6:  # Columnas base hasta turno programado
-                ws.column_dimensions[get_column_letter(col)].width = 14
+                widths.append(14)
             elif col == COL_PERMISOS:  # Columna de permisos MÁS ANCHA
-                ws.column_dimensions[get_column_letter(col)].width = 60  # AUMENTADO DE 25 A 60
+                widths.append(60)  # AUMENTADO DE 25 A 60
             elif col in [COL_AUSENCIA, COL_TARDANZA, COL_TRABAJO_MENOS]:  # Ausencia, tardanza y trabajo menos
-                ws.column_dimensions[get_column_letter(col)].width = 14
+                widths.append(14)
             elif COL_ENTRIES_START <= col < COL_SUMMARY_START:
                 # Columnas de entries
                 relative_col = (col - COL_ENTRIES_START) % 6
                 if relative_col in [0, 3]:  # Sedes
-                    ws.column_dimensions[get_column_letter(col)].width = 15
+                    widths.append(15)
                 elif relative_col in [1, 4]:  # Horas
-                    ws.column_dimensions[get_column_letter(col)].width = 12
+                    widths.append(12)
                 else:  # Comentarios
-                    ws.column_dimensions[get_column_letter(col)].width = 18
+                    widths.append(18)
             else:  # Columnas de resumen
-                ws.column_dimensions[get_column_letter(col)].width = 12
+                widths.append(12)
+        return widths
+
+    def _set_column_widths(self, ws, max_pairs: int, total_columns: int):
+        """Ajusta el ancho de columnas de una hoja openpyxl"""
+        for col, width in enumerate(self.column_widths(max_pairs, total_columns), 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+
+class DetailedSheetWriter:
+    """
+    Escribe la hoja "Fichadas Detalladas" de forma incremental, empleado por empleado
+    En modo streaming se abre con el máximo de pares (4) y al cerrar se eliminan
+    las columnas de pares que no se usaron, dejando el mismo layout que el modo normal
+    """
+
+    def __init__(self, generator: ExcelReportGeneratorDetailed, start_date: str,
+                 end_date: str, max_pairs: int = MAX_PAIRS):
+        self.generator = generator
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_pairs = max_pairs
+        self.employee_count = 0
+        self._next_row = 6
+        
+        # Crear workbook
+        self.wb = Workbook()
+        self.wb.remove(self.wb.active)
+        self.ws = self.wb.create_sheet("Fichadas Detalladas")
+        ws = self.ws
+        
+        # Título
+        ws.cell(row=1, column=1, value=f"Reporte de Asistencia Detallado - {start_date} a {end_date}")
+        ws.cell(row=1, column=1).font = generator.title_font
+        
+        # Información adicional
+        ws.cell(row=2, column=1, value=f"Fecha generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+        
+        # Escribir headers
+        for col, header in enumerate(generator.build_headers(max_pairs), 1):
+            cell = ws.cell(row=5, column=col, value=header)
+            cell.font = generator.header_font
+            cell.fill = generator.header_fill
+            cell.border = generator.thin_border
+            cell.alignment = generator.center_alignment
+
+    def add_employee(self, rows: List[List]):
+        """Agrega las filas ya construidas de un empleado"""
+        for values in rows:
+            self.generator._write_data_row(self.ws, self._next_row, values, self.max_pairs)
+            self._next_row += 1
+        self.employee_count += 1
+
+    def close(self, output_filename: str = None, used_pairs: int = None) -> str:
+        """
+        Finaliza la hoja y guarda el archivo
+        Args:
+            output_filename: Nombre del archivo (por defecto según filename_format)
+            used_pairs: Pares realmente usados; si es menor que max_pairs se
+                eliminan las columnas de pares sobrantes
+        Returns:
+            Ruta del archivo generado
+        """
+        ws = self.ws
+        max_pairs = self.max_pairs
+        
+        if used_pairs is not None:
+            used_pairs = min(max(used_pairs, 1), max_pairs)
+            if used_pairs < max_pairs:
+                ws.delete_cols(COL_ENTRIES_START + used_pairs * 6, (max_pairs - used_pairs) * 6)
+                max_pairs = used_pairs
+        
+        ws.cell(row=3, column=1, value=f"Empleados procesados: {self.employee_count}")
+        
+        total_columns = len(self.generator.build_headers(max_pairs))
+        self.generator._set_column_widths(ws, max_pairs, total_columns)
+        
+        # Guardar archivo
+        filepath = self.generator.output_path(output_filename, self.start_date, self.end_date)
+        self.wb.save(filepath)
+        
+        return filepath
+
+    def discard(self):
+        """Descarta la hoja sin guardar (todo está en memoria)"""
+
+
+class WriteOnlySheetWriter:
+    """
+    Variante rápida de DetailedSheetWriter (excel_backend "write_only", memoria constante)
+    openpyxl en modo write-only baja cada fila al agregarla y no puede volver a la fila 3,
+    así que la cantidad de empleados y el ancho de pares se fijan al crearlo (en streaming
+    va detrás de un SpillingSheetWriter). Los estilos de las celdas de datos son estilos
+    con nombre registrados una sola vez: cada celda se crea con el StyleArray ya resuelto
+    de su estilo (lo mismo que asignar cell.style = nombre, sin buscarlo celda por celda).
+    """
+
+    # Estilos con nombre de las celdas de datos: (nombre, atributo de fill, atributo de alignment)
+    DATA_STYLES = (
+        ('Detalle', None, None),
+        ('Detalle blanco', 'white_fill', None),
+        ('Detalle verde', 'green_fill', None),
+        ('Detalle rojo', 'red_fill', None),
+        ('Detalle naranja', 'orange_fill', None),
+        ('Detalle permiso', 'light_blue_fill', 'wrap_alignment'),
+    )
+
+    def __init__(self, generator: ExcelReportGeneratorDetailed, start_date: str,
+                 end_date: str, max_pairs: int, employee_count: int):
+        self.generator = generator
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_pairs = max_pairs
+        self.employee_count = employee_count
+        self._summary_start = COL_ENTRIES_START + max_pairs * 6
+        headers = generator.build_headers(max_pairs)
+        
+        self.wb = Workbook(write_only=True)
+        self.ws = ws = self.wb.create_sheet("Fichadas Detalladas")
+        # En write-only los anchos van antes de la primera fila
+        generator._set_column_widths(ws, max_pairs, len(headers))
+        
+        # Estilo de cada combinación (fill, alignment) que devuelve _cell_style
+        self._style_arrays = {}
+        for name, fill_attr, alignment_attr in self.DATA_STYLES:
+            fill = getattr(generator, fill_attr) if fill_attr else None
+            alignment = getattr(generator, alignment_attr) if alignment_attr else None
+            style = NamedStyle(name=name, font=DEFAULT_FONT, border=generator.thin_border)
+            if fill is not None:
+                style.fill = fill
+            if alignment is not None:
+                style.alignment = alignment
+            self.wb.add_named_style(style)
+            self._style_arrays[(id(fill), id(alignment))] = style.as_tuple()
+        
+        title = WriteOnlyCell(ws, value=f"Reporte de Asistencia Detallado - {start_date} a {end_date}")
+        title.font = generator.title_font
+        ws.append([title])
+        ws.append([f"Fecha generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
+        ws.append([f"Empleados procesados: {employee_count}"])
+        ws.append([])
+        
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = generator.header_font
+            cell.fill = generator.header_fill
+            cell.border = generator.thin_border
+            cell.alignment = generator.center_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+    def add_employee(self, rows: List[List]):
+        """Agrega las filas de un empleado (con exactamente max_pairs pares)"""
+        ws = self.ws
+        cell_style = self.generator._cell_style
+        style_arrays = self._style_arrays
+        summary_start = self._summary_start
+        for values in rows:
+            cells = []
+            for col, value in enumerate(values, 1):
+                fill, alignment = cell_style(col, value, summary_start)
+                # Igual que WriteOnlyCell(ws, value) con el estilo con nombre ya aplicado
+                cells.append(Cell(ws, row=1, column=1, value=value,
+                                  style_array=style_arrays[(id(fill), id(alignment))]))
+            ws.append(cells)
+
+    def close(self, output_filename: str = None, used_pairs: int = None) -> str:
+        """
+        Guarda el archivo y devuelve su ruta
+        used_pairs se ignora: el ancho de pares ya es el definitivo
+        """
+        filepath = self.generator.output_path(output_filename, self.start_date, self.end_date)
+        self.wb.save(filepath)
+        return filepath
+
+    def discard(self):
+        """Descarta las filas sin guardar (borra el temporal donde openpyxl bajó las filas)"""
+        with contextlib.suppress(Exception):
+            self.ws.close()
+            self.ws._writer.cleanup()
+
+
+class XlsxWriterSheetWriter:
+    """
+    Hoja detallada escrita con xlsxwriter en modo constant_memory (excel_backend "xlsxwriter")
+    Mismo layout, colores y anchos que DetailedSheetWriter. xlsxwriter baja cada fila
+    apenas se pasa a la siguiente y no puede volver a la fila 3, así que la cantidad de
+    empleados y el ancho de pares se fijan al crearlo (en streaming va detrás de un
+    SpillingSheetWriter). El libro se arma en spill_directory y se mueve al cerrar.
+    """
+
+    def __init__(self, generator: ExcelReportGeneratorDetailed, start_date: str,
+                 end_date: str, max_pairs: int, employee_count: int):
+        try:
+            import xlsxwriter  # Dependencia opcional: sólo si se usa este backend
+        except ImportError as e:
+            raise RuntimeError("El backend xlsxwriter requiere el paquete XlsxWriter "
+                               "(pip install XlsxWriter)") from e
+        
+        self.generator = generator
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_pairs = max_pairs
+        self.employee_count = employee_count
+        self._summary_start = COL_ENTRIES_START + max_pairs * 6
+        self._next_row = 5
+        
+        directory = os.path.expanduser(DEFAULT_CONFIG['spill_directory'] or tempfile.gettempdir())
+        os.makedirs(directory, exist_ok=True)
+        handle, self._tmp_path = tempfile.mkstemp(prefix='xlsxwriter_', suffix='.xlsx', dir=directory)
+        os.close(handle)
+        self.wb = xlsxwriter.Workbook(self._tmp_path, {'constant_memory': True, 'tmpdir': directory})
+        self.ws = ws = self.wb.add_worksheet("Fichadas Detalladas")
+        
+        # Formato de cada combinación (fill, alignment) que devuelve _cell_style
+        self._formats = {}
+        for _, fill_attr, alignment_attr in WriteOnlySheetWriter.DATA_STYLES:
+            fill = getattr(generator, fill_attr) if fill_attr else None
+            alignment = getattr(generator, alignment_attr) if alignment_attr else None
+            self._formats[(id(fill), id(alignment))] = self.wb.add_format(
+                self._format_properties(border=generator.thin_border, fill=fill, alignment=alignment))
+        
+        headers = generator.build_headers(max_pairs)
+        for col, width in enumerate(generator.column_widths(max_pairs, len(headers))):
+            ws.set_column(col, col, width)
+        
+        ws.write(0, 0, f"Reporte de Asistencia Detallado - {start_date} a {end_date}",
+                 self.wb.add_format(self._format_properties(font=generator.title_font)))
+        ws.write(1, 0, f"Fecha generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+        ws.write(2, 0, f"Empleados procesados: {employee_count}")
+        header_format = self.wb.add_format(self._format_properties(
+            font=generator.header_font, fill=generator.header_fill,
+            border=generator.thin_border, alignment=generator.center_alignment))
+        for col, header in enumerate(headers):
+            ws.write(4, col, header, header_format)
+
+    @staticmethod
+    def _format_properties(font=None, fill=None, border=None, alignment=None) -> Dict:
+        """Propiedades de formato xlsxwriter equivalentes a los estilos openpyxl del generador"""
+        properties = {}
+        if font is not None:
+            properties['bold'] = bool(font.b)
+            if font.sz:
+                properties['font_size'] = font.sz
+            if font.color is not None:
+                properties['font_color'] = f"#{font.color.rgb[-6:]}"
+        if fill is not None:
+            properties.update(pattern=1, bg_color=f"#{fill.fgColor.rgb[-6:]}")
+        if border is not None:
+            properties['border'] = 1  # thin
+        if alignment is not None:
+            if alignment.horizontal:
+                properties['align'] = alignment.horizontal
+            if alignment.vertical:
+                properties['valign'] = 'vcenter' if alignment.vertical == 'center' else alignment.vertical
+            if alignment.wrap_text:
+                properties['text_wrap'] = True
+        return properties
+
+    def add_employee(self, rows: List[List]):
+        """Agrega las filas de un empleado (con exactamente max_pairs pares)"""
+        write = self.ws.write
+        cell_style = self.generator._cell_style
+        formats = self._formats
+        summary_start = self._summary_start
+        for values in rows:
+            row = self._next_row
+            for col, value in enumerate(values, 1):
+                fill, alignment = cell_style(col, value, summary_start)
+                write(row, col - 1, value, formats[(id(fill), id(alignment))])
+            self._next_row += 1
+
+    def close(self, output_filename: str = None, used_pairs: int = None) -> str:
+        """Guarda el archivo y devuelve su ruta (used_pairs se ignora, como en WriteOnlySheetWriter)"""
+        try:
+            self.wb.close()
+            filepath = self.generator.output_path(output_filename, self.start_date, self.end_date)
+            shutil.move(self._tmp_path, filepath)
+            return filepath
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def discard(self):
+        """Descarta la hoja sin guardar"""
+        with contextlib.suppress(Exception):
+            self.wb.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class SpillingSheetWriter:
+    """
+    Hoja detallada con presupuesto de memoria (mismo contrato que DetailedSheetWriter)
+    Las filas van a un SpillBuffer, que baja segmentos comprimidos a disco al superar
+    budget_bytes; al cerrar se releen en orden hacia el writer de backend ("write_only"
+    o "xlsxwriter") con el ancho de pares y la cantidad de empleados definitivos.
+    Ni las filas ni el workbook quedan completos en memoria.
+    """
+
+    def __init__(self, generator: ExcelReportGeneratorDetailed, start_date: str,
+                 end_date: str, budget_bytes: int, max_pairs: int = MAX_PAIRS,
+                 backend: str = 'write_only'):
+        self.generator = generator
+        self.backend = backend
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_pairs = max_pairs
+        self.employee_count = 0
+        self.buffer = SpillBuffer(budget_bytes)
+
+    def add_employee(self, rows: List[List]):
+        """Agrega las filas ya construidas de un empleado (con max_pairs pares)"""
+        self.buffer.append(rows)
+        self.employee_count += 1
+
+    def close(self, output_filename: str = None, used_pairs: int = None) -> str:
+        """Vuelca las filas al Excel (sólo con los pares usados) y libera el buffer"""
+        max_pairs = self.max_pairs
+        if used_pairs is not None:
+            max_pairs = min(max(used_pairs, 1), max_pairs)
+        
+        if self.buffer.spilled_segments:
+            print(f"💽 Filas bajadas a disco: {self.buffer.spilled_segments} segmentos, "
+                  f"{self.buffer.spilled_bytes / (1024 * 1024):.1f} MB comprimidos")
+        try:
+            writer = self.generator.sheet_writer(self.start_date, self.end_date, max_pairs,
+                                                 self.employee_count, self.backend)
+            try:
+                for rows in self.buffer:
+                    if max_pairs < self.max_pairs:
+                        rows = [trim_pair_columns(values, self.max_pairs, max_pairs) for values in rows]
+                    writer.add_employee(rows)
+            except BaseException:
+                writer.discard()
+                raise
+            return writer.close(output_filename)
+        finally:
+            self.buffer.close()
+
+    def discard(self):
+        """Descarta las filas sin guardar"""
+        self.buffer.close()
 
 
 # Alias para compatibilidad con código existente
@@ -0,0 +1,146 @@
+"""
+Calendario de feriados y días laborables
+Carga los feriados de varios años desde archivos JSON (uno por año) y precalcula
+un bitmap por año (feriado / fin de semana / laborable), de modo que las consultas
+por fecha son O(1) y los rangos pueden cruzar años.
+
+Formato de los archivos (config/holidays/<año>.json):
+    {"country": "AR", "year": 2025, "holidays": {"2025-01-01": "Año Nuevo", ...}}
+"""
+
+import glob
+import hashlib
+import json
+import os
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Union
+
+from config.default_config import DEFAULT_CONFIG
+
+HOLIDAYS_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'holidays'
+)
+
+# Bits de cada día en el bitmap anual
+DAY_HOLIDAY = 1
+DAY_WEEKEND = 2
+DAY_WORKDAY = 4
+
+DateLike = Union[date, str]
+
+
+def _as_date(value: DateLike) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(value[:10])
+
+
+class WorkCalendar:
+    """Feriados y días laborables por fecha (consultas O(1) sobre bitmaps anuales)"""
+
+    def __init__(self, holidays: Dict[str, str] = None, saturday_is_workday: bool = None):
+        if saturday_is_workday is None:
+            saturday_is_workday = DEFAULT_CONFIG['saturday_is_workday']
+        self.saturday_is_workday = bool(saturday_is_workday)
+
+        self._names: Dict[int, str] = {}
+        for date_str, name in (holidays or {}).items():
+            self._names[date.fromisoformat(date_str).toordinal()] = name
+        self._holiday_years = {date.fromordinal(ordinal).year for ordinal in self._names}
+
+        self._years: Dict[int, bytearray] = {}
+        self._year_start: Dict[int, int] = {}
+
+        # Identifica el contenido del calendario (para claves de cache)
+        payload = json.dumps({'holidays': sorted(self._names.items()),
+                              'saturday_is_workday': self.saturday_is_workday})
+        self.digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def load(cls, directories: Iterable[str] = None, saturday_is_workday: bool = None) -> 'WorkCalendar':
+        """
+        Carga los archivos de feriados de los directorios indicados (por defecto el
+        de la aplicación y extra_holidays_directory); los posteriores pisan fechas repetidas
+        """
+        if directories is None:
+            directories = [HOLIDAYS_DIRECTORY, DEFAULT_CONFIG['extra_holidays_directory']]
+
+        holidays: Dict[str, str] = {}
+        for directory in directories:
+            if not directory:
+                continue
+            for path in sorted(glob.glob(os.path.join(os.path.expanduser(directory), '*.json'))):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    holidays.update(data.get('holidays', {}))
+                except Exception as e:
+                    print(f"⚠️ Archivo de feriados inválido, se ignora ({path}): {str(e)}")
+        return cls(holidays, saturday_is_workday)
+
+    @property
+    def years(self):
+        """Años con feriados cargados"""
+        return sorted(self._holiday_years)
+
+    def _bitmap(self, year: int) -> bytearray:
+        """Bitmap del año (se arma la primera vez que se consulta)"""
+        bitmap = self._years.get(year)
+        if bitmap is not None:
+            return bitmap
+
+        if year not in self._holiday_years:
+            print(f"⚠️ Sin feriados cargados para {year} (falta config/holidays/{year}.json): "
+                  f"sólo se distinguen fines de semana")
+        
+        start = date(year, 1, 1).toordinal()
+        days = date(year + 1, 1, 1).toordinal() - start
+        bitmap = bytearray(days)
+        first_weekday = date(year, 1, 1).weekday()
+        for offset in range(days):
+            weekday = (first_weekday + offset) % 7
+            if weekday == 6 or (weekday == 5 and not self.saturday_is_workday):
+                flags = DAY_WEEKEND
+            else:
+                flags = DAY_WORKDAY
+            if start + offset in self._names:
+                flags = (flags & ~DAY_WORKDAY) | DAY_HOLIDAY
+            bitmap[offset] = flags
+
+        self._year_start[year] = start
+        self._years[year] = bitmap
+        return bitmap
+
+    def flags(self, day: DateLike) -> int:
+        """Bits DAY_* de la fecha"""
+        day = _as_date(day)
+        bitmap = self._years.get(day.year) or self._bitmap(day.year)
+        return bitmap[day.toordinal() - self._year_start[day.year]]
+
+    def is_holiday(self, day: DateLike) -> bool:
+        return bool(self.flags(day) & DAY_HOLIDAY)
+
+    def is_workday(self, day: DateLike) -> bool:
+        return bool(self.flags(day) & DAY_WORKDAY)
+
+    def holiday_name(self, day: DateLike) -> Optional[str]:
+        day = _as_date(day)
+        if day.year not in self._years:
+            self._bitmap(day.year)  # avisa una vez si el año no tiene feriados
+        return self._names.get(day.toordinal())
+
+    def count_workdays(self, start: DateLike, end: DateLike) -> int:
+        """Días laborables entre start y end (inclusive), aunque crucen años"""
+        start, end = _as_date(start), _as_date(end)
+        total = 0
+        for year in range(start.year, end.year + 1):
+            bitmap = self._bitmap(year)
+            first = (max(start, date(year, 1, 1)).toordinal() - self._year_start[year])
+            last = (min(end, date(year, 12, 31)).toordinal() - self._year_start[year])
+            total += sum(1 for flags in bitmap[first:last + 1] if flags & DAY_WORKDAY)
+        return total
+
+
+@lru_cache(maxsize=1)
+def get_calendar() -> WorkCalendar:
+    """Calendario compartido del proceso (se carga una sola vez)"""
+    return WorkCalendar.load()
@@ -4,25 +4,37 @@ Con nuevas reglas específicas de horas extra e incidencias
 CORREGIDO: Ahora incluye contador de días de ausencia
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from zoneinfo import ZoneInfo  # TZ Argentina
 from config.default_config import DEFAULT_CONFIG
+from core.models import DailyRecord, EmployeeInfo
+from core.holiday_calendar import get_calendar
+from core.labor_rules import get_labor_rules, table_index
 
 
 class ArgentineHoursCalculatorEnhanced:
     """Calculador de horas según normativa laboral argentina - versión final"""
     
-    def __init__(self):
-        self.jornada_completa = DEFAULT_CONFIG['jornada_completa_horas']
-        self.hora_nocturna_inicio = int(DEFAULT_CONFIG['hora_nocturna_inicio'])
-        self.hora_nocturna_fin = int(DEFAULT_CONFIG['hora_nocturna_fin'])
+    def __init__(self, labor_rules_variant: str = None):
+        # Reglas laborales compiladas (config/labor_rules.py)
+        self.rules = get_labor_rules(labor_rules_variant)
+        self.labor_rules_digest = self.rules.digest
+        self._day_handlers = self.rules.handlers
+
+        self.jornada_completa = self.rules.jornada_horas
+        self.hora_nocturna_inicio = self.rules.night_start
+        self.hora_nocturna_fin = self.rules.night_end
         self.sabado_limite = int(DEFAULT_CONFIG['sabado_limite_hora'])
         self.tolerancia_minutos = int(DEFAULT_CONFIG['tolerancia_minutos'])
         self.fragmento_minutos = int(DEFAULT_CONFIG['fragmento_minutos'])
 
         # Zona horaria de Argentina
         self.tz = ZoneInfo("America/Argentina/Buenos_Aires")
+
+        # Calendario local: respaldo cuando el day summary no trae holidays/isWorkday
+        self.calendar = get_calendar()
+        self.calendar_digest = self.calendar.digest
     
     def process_employee_data(self, day_summaries: List[Dict], employee_info: Dict,
                               previous_pending_hours: float = 0, holidays: List[Dict] = None) -> Dict:
@@ -30,26 +42,93 @@ class ArgentineHoursCalculatorEnhanced:
         Procesa los datos de un empleado desde day summaries - VERSIÓN FINAL
         Preserva datos crudos y aplica nuevas reglas de horas extra
         CORREGIDO: Ahora cuenta días de ausencia
+        Devuelve registros DailyRecord compactos (acceso estilo dict) y un EmployeeInfo
+        con sólo los campos del usuario que usa el reporte
         """
-        daily_data: List[Dict] = []
-        totals = {
-            'total_days_worked': 0,
-            'total_hours_worked': 0,
-            'total_regular_hours': 0,
-            'total_extra_hours_50': 0,
-            'total_extra_hours_100': 0,
-            'total_night_hours': 0,
-            'total_pending_hours': previous_pending_hours,
-            'total_absence_days': 0  # AGREGAR CONTADOR DE AUSENCIAS
-        }
+        days, absence_days = self._prepare_days(day_summaries)
+        distributions = [
+            self.calculate_hour_distribution(
+                hours_worked=day['hours_worked'],
+                date=day['date'],
+                is_holiday=day['is_holiday'],
+                has_time_off=day['has_time_off'],
+                night_hours=day['night_hours'],
+                entrada_local=day['entrada_local'],
+                salida_local=day['salida_local'],
+                time_slots=day['time_slots'],
+                is_workday=day['is_workday'],
+                incidences=day['incidences']
+            )
+            for day in days
+        ]
+        return self._build_employee_data(employee_info, days, distributions,
+                                         previous_pending_hours, absence_days)
+    
+    def process_employees_batch(self, employees: List[Tuple[List[Dict], Dict]],
+                                previous_pending_hours: List[float] = None) -> List[Dict]:
+        """
+        Procesa varios empleados distribuyendo las horas de todos sus días en una sola
+        pasada vectorizada (NumPy); mismo resultado que process_employee_data
+        Args:
+            employees: Lista de (day_summaries, employee_info)
+            previous_pending_hours: Saldo pendiente anterior de cada empleado (por defecto 0)
+        """
+        from core.hours_vectorized import HoursBatch  # NumPy sólo si se usa
+        
+        batch = HoursBatch()
+        prepared = []
+        for day_summaries, employee_info in employees:
+            days, absence_days = self._prepare_days(day_summaries)
+            for day in days:
+                batch.add(day['hours_worked'], day['date'], day['is_holiday'], day['is_workday'],
+                          day['entrada_local'], day['salida_local'], day['time_slots'])
+            prepared.append((employee_info, days, absence_days))
+        
+        columns = batch.distribute(self.rules)
+        
+        if previous_pending_hours is None:
+            previous_pending_hours = [0] * len(prepared)
+        
+        results = []
+        position = 0
+        for (employee_info, days, absence_days), previous_pending in zip(prepared, previous_pending_hours):
+            distributions = []
+            for day in days:
+                if day['hours_worked'] == 0:
+                    distributions.append({
+                        'hours_worked': 0, 'regular_hours': 0, 'extra_hours_50': 0,
+                        'extra_hours_100': 0, 'night_hours': day['night_hours'], 'pending_hours': 0
+                    })
+                else:
+                    distributions.append({
+                        'hours_worked': day['hours_worked'],
+                        'regular_hours': columns['regular_hours'][position],
+                        'extra_hours_50': columns['extra_hours_50'][position],
+                        'extra_hours_100': columns['extra_hours_100'][position],
+                        'night_hours': day['night_hours'],
+                        'pending_hours': columns['pending_hours'][position]
+                    })
+                position += 1
+            results.append(self._build_employee_data(employee_info, days, distributions,
+                                                     previous_pending, absence_days))
+        return results
+    
+    def _prepare_days(self, day_summaries: List[Dict]) -> Tuple[List[Dict], int]:
+        """
+        Primera pasada: fichadas, flags y horarios de cada día con datos
+        Returns:
+            (días a reportar, días de ausencia contados)
+        """
+        days = []
+        absence_days = 0
         
         for day_summary in day_summaries:
             date_str = day_summary.get('referenceDate', day_summary.get('date'))
             date = datetime.strptime(date_str, '%Y-%m-%d')
 
-            # Datos crudos
-            raw_entries = day_summary.get('entries', [])
-            time_slots = day_summary.get('timeSlots', [])
+            # Datos crudos (fichadas y turnos compactos)
+            raw_entries = DailyRecord.compact_entries(day_summary.get('entries', []))
+            time_slots = DailyRecord.compact_time_slots(day_summary.get('timeSlots', []))
             incidences = day_summary.get('incidences', []) or []
             
             # Horas trabajadas
@@ -58,44 +137,80 @@ class ArgentineHoursCalculatorEnhanced:
             hours_worked = hours_worked_real if hours_worked_real > 0 else hours_worked_api
             
             # Flags
-            is_holiday   = bool(day_summary.get('holidays'))
+            if 'holidays' in day_summary:
+                is_holiday = bool(day_summary['holidays'])
+                holiday_name = day_summary['holidays'][0].get('name') if is_holiday else None
+            else:
+                holiday_name = self.calendar.holiday_name(date)
+                is_holiday = holiday_name is not None
             has_time_off = bool(day_summary.get('timeOffRequests'))
             absence_keys = {'ABSENCE', 'ABSENT'}  # añade 'UNJUSTIFIED_ABSENCE','NO_SHOW' si aplican
             has_absence  = any(k in absence_keys for k in incidences)
-            is_workday   = bool(day_summary.get('isWorkday', True))
+            # Sin isWorkday se asume laborable (como siempre); el calendario sólo aporta feriados
+            is_workday = bool(day_summary.get('isWorkday', True))
 
             # CONTAR DÍAS DE AUSENCIA (INDEPENDIENTEMENTE DE HORAS TRABAJADAS)
             if has_absence:
-                totals['total_absence_days'] += 1
+                absence_days += 1
 
             # ✅ Mantener ausencias aunque tengan 0 horas; descartar solo si NO tiene horas, NO licencia y NO ausencia
             if hours_worked == 0 and not has_time_off and not has_absence:
                 continue
 
-            # Turno programado y entradas/salidas
-            turno_inicio = time_slots[0].get('startTime', '') if time_slots else ''
-            turno_fin    = time_slots[0].get('endTime', '') if time_slots else ''
+            # Entradas/salidas y horas nocturnas
             entrada_local, salida_local, comienzo_jornada, fin_jornada = self._parse_real_entry_times(raw_entries)
-
-            # Horas nocturnas
             night_hours = self.calcular_horas_nocturnas(entrada_local, salida_local)
 
-            # Distribución de horas
-            day_hours = self.calculate_hour_distribution(
-                hours_worked=hours_worked,
-                date=date,
-                is_holiday=is_holiday,
-                has_time_off=has_time_off,
-                night_hours=night_hours,
-                entrada_local=entrada_local,
-                salida_local=salida_local,
-                time_slots=time_slots,
-                is_workday=is_workday,
-                incidences=incidences
-            )
+            days.append({
+                'day_summary': day_summary,
+                'date': date,
+                'raw_entries': raw_entries,
+                'time_slots': time_slots,
+                'incidences': incidences,
+                'hours_worked': hours_worked,
+                'is_holiday': is_holiday,
+                'holiday_name': holiday_name,
+                'has_time_off': has_time_off,
+                'has_absence': has_absence,
+                'is_workday': is_workday,
+                'entrada_local': entrada_local,
+                'salida_local': salida_local,
+                'comienzo_jornada': comienzo_jornada,
+                'fin_jornada': fin_jornada,
+                'night_hours': night_hours,
+            })
+        
+        return days, absence_days
+    
+    def _build_employee_data(self, employee_info: Dict, days: List[Dict], distributions: List[Dict],
+                             previous_pending_hours: float, absence_days: int) -> Dict:
+        """Segunda pasada: totales, registros diarios y compensaciones"""
+        employee_info = EmployeeInfo.from_user(employee_info)
+        daily_data: List[DailyRecord] = []
+        totals = {
+            'total_days_worked': 0,
+            'total_hours_worked': 0,
+            'total_regular_hours': 0,
+            'total_extra_hours_50': 0,
+            'total_extra_hours_100': 0,
+            'total_night_hours': 0,
+            'total_pending_hours': previous_pending_hours,
+            'total_absence_days': absence_days  # AGREGAR CONTADOR DE AUSENCIAS
+        }
+        
+        for day, day_hours in zip(days, distributions):
+            day_summary = day['day_summary']
+            date = day['date']
+            time_slots = day['time_slots']
+            has_time_off = day['has_time_off']
+            has_absence = day['has_absence']
+
+            # Turno programado
+            turno_inicio = time_slots[0].get('startTime', '') if time_slots else ''
+            turno_fin    = time_slots[0].get('endTime', '') if time_slots else ''
 
             # Totales
-            if hours_worked > 0:
+            if day['hours_worked'] > 0:
                 totals['total_days_worked'] += 1
                 totals['total_hours_worked'] += day_hours['hours_worked']
                 totals['total_regular_hours'] += day_hours['regular_hours']
@@ -106,34 +221,34 @@ class ArgentineHoursCalculatorEnhanced:
                     totals['total_pending_hours'] += day_hours['pending_hours']
 
             # Fila de salida
-            daily_data.append({
-                'employee_id': employee_info.get('employeeInternalId'),
-                'date': date.strftime('%Y-%m-%d'),
-                'day_of_week': self.get_day_of_week_spanish(date),
-                'scheduled_start': turno_inicio,
-                'scheduled_end': turno_fin,
-                'start_time': comienzo_jornada,
-                'end_time': fin_jornada,
-                'hours_worked': day_hours['hours_worked'],
-                'regular_hours': day_hours['regular_hours'],
-                'extra_hours_50': day_hours['extra_hours_50'],
-                'extra_hours_100': day_hours['extra_hours_100'],
-                'night_hours': day_hours['night_hours'],
-                'pending_hours': day_hours['pending_hours'] if not (has_time_off or has_absence) else 0,
-                'is_holiday': is_holiday,
-                'holiday_name': day_summary.get('holidays', [{}])[0].get('name') if is_holiday else None,
-                'has_time_off': has_time_off,
-                'time_off_name': day_summary.get('timeOffRequests', [{}])[0].get('name') if has_time_off else None,
-                'has_absence': has_absence,
+            daily_data.append(DailyRecord(
+                employee_id=employee_info.employeeInternalId,
+                date=date.strftime('%Y-%m-%d'),
+                day_of_week=self.get_day_of_week_spanish(date),
+                scheduled_start=turno_inicio,
+                scheduled_end=turno_fin,
+                start_time=day['comienzo_jornada'],
+                end_time=day['fin_jornada'],
+                hours_worked=day_hours['hours_worked'],
+                regular_hours=day_hours['regular_hours'],
+                extra_hours_50=day_hours['extra_hours_50'],
+                extra_hours_100=day_hours['extra_hours_100'],
+                night_hours=day_hours['night_hours'],
+                pending_hours=day_hours['pending_hours'] if not (has_time_off or has_absence) else 0,
+                is_holiday=day['is_holiday'],
+                holiday_name=day['holiday_name'],
+                has_time_off=has_time_off,
+                time_off_name=day_summary.get('timeOffRequests', [{}])[0].get('name') if has_time_off else None,
+                has_absence=has_absence,
 
                 # Para Excel detallado:
-                'raw_entries': raw_entries,
-                'time_slots': time_slots,
-                'day_summary_id': day_summary.get('id'),
-                'weekday': day_summary.get('weekday', ''),
-                'hours_data': day_summary.get('hours', {}),
-                'incidences': incidences,
-            })
+                raw_entries=day['raw_entries'],
+                time_slots=time_slots,
+                day_summary_id=day_summary.get('id'),
+                weekday=day_summary.get('weekday', ''),
+                hours_data=day_summary.get('hours', {}),
+                incidences=day['incidences'],
+            ))
 
         # Compensaciones
         compensations = self.calculate_compensations(
@@ -166,57 +281,11 @@ class ArgentineHoursCalculatorEnhanced:
                 'extra_hours_100': 0, 'night_hours': night_hours, 'pending_hours': 0
             }
 
-        day_of_week = date.weekday()  # 0=Lunes ... 6=Domingo
-        regular_hours = 0.0
-        extra_hours_50 = 0.0
-        extra_hours_100 = 0.0
-        pending_hours = 0.0
-
-        has_late = incidences and 'LATE' in incidences
-
-        # Feriados: todo al 100%
-        if is_holiday:
-            extra_hours_100 = hours_worked
-
-        elif day_of_week == 6:  # Domingo
-            if not is_workday:
-                regular_hours = 0.0
-                extra_hours_100 = hours_worked
-            else:
-                reg, e100 = self._sunday_from_times(entrada_local, salida_local, time_slots or [])
-                total_calc = reg + e100
-                if total_calc > 0 and abs(total_calc - hours_worked) > 0.01:
-                    scale = hours_worked / total_calc
-                    regular_hours = reg * scale
-                    extra_hours_100 = e100 * scale
-                else:
-                    regular_hours = reg
-                    extra_hours_100 = e100
-
-        elif day_of_week == 5:  # Sábado
-            if entrada_local and salida_local:
-                reg, _, e100 = self._saturday_new_calculation(entrada_local, salida_local, time_slots or [])
-            else:
-                reg = min(hours_worked, self.jornada_completa)
-                e100 = max(0, hours_worked - self.jornada_completa)
-            
-            regular_hours = reg
-            extra_hours_100 = e100
-
-        else:  # Lunes a viernes
-            if hours_worked <= self.jornada_completa:
-                regular_hours = hours_worked
-                pending_hours = max(0, self.jornada_completa - hours_worked)
-            else:
-                regular_hours = self.jornada_completa
-                extra_hours = hours_worked - self.jornada_completa
-                
-                # Nuevas reglas de distribución de extras
-                if extra_hours <= 2.0:
-                    extra_hours_50 = extra_hours
-                else:
-                    extra_hours_50 = 2.0
-                    extra_hours_100 = extra_hours - 2.0
+        # Clase del día en un solo acceso a la tabla de despacho
+        handler = self._day_handlers[table_index(date.weekday(), is_holiday, is_workday)]
+        regular_hours, extra_hours_50, extra_hours_100, pending_hours = handler(
+            hours_worked, entrada_local, salida_local, time_slots
+        )
 
         return {
             'hours_worked': hours_worked,
@@ -227,35 +296,6 @@ class ArgentineHoursCalculatorEnhanced:
             'pending_hours': round(pending_hours, 2)
         }
 
-    def _saturday_new_calculation(self, entrada_local: datetime, salida_local: datetime, time_slots: List[Dict]) -> Tuple[float, float, float]:
-        """Cálculo específico para sábados según documento v.2.0"""
-        
-        inicio_sabado = entrada_local.replace(hour=8, minute=0, second=0, microsecond=0)
-        fin_sabado = entrada_local.replace(hour=13, minute=0, second=0, microsecond=0)
-
-        minutos_tardanza = max(0, (entrada_local - inicio_sabado).total_seconds() / 60.0)
-        minutos_retiro_anticipado = max(0, (fin_sabado - salida_local).total_seconds() / 60.0) if salida_local < fin_sabado else 0
-
-        base_hours_100 = 4.0
-        if minutos_tardanza > 30: base_hours_100 -= 1.0
-        elif minutos_tardanza > 6: base_hours_100 -= 0.5
-
-        if minutos_retiro_anticipado > 30: base_hours_100 -= 1.0
-        elif minutos_retiro_anticipado > 6: base_hours_100 -= 0.5
-
-        base_hours_100 = max(0.0, base_hours_100)
-
-        extra_hours_100 = 0.0
-        if salida_local > fin_sabado:
-            minutos_extra = (salida_local - fin_sabado).total_seconds() / 60.0
-            if minutos_extra > 60:
-                extra_hours_100 = 1.0
-            elif minutos_extra > 30:
-                extra_hours_100 = 0.5
-
-        total_hours_100 = base_hours_100 + extra_hours_100
-        return 0.0, 0.0, round(total_hours_100, 2)
-
     def calculate_compensations(self, extra_hours_50: float, extra_hours_100: float,
                                 pending_hours: float) -> Dict:
         compensated_with_50 = 0
@@ -283,86 +323,26 @@ class ArgentineHoursCalculatorEnhanced:
         }
 
     def calcular_horas_nocturnas(self, hora_entrada: datetime, hora_salida: datetime) -> float:
-        if not hora_entrada or not hora_salida or hora_salida <= hora_entrada:
-            return 0.0
-        
-        entrada_local = hora_entrada.astimezone(self.tz)
-        salida_local = hora_salida.astimezone(self.tz)
-
-        start_nocturna = entrada_local.replace(hour=int(DEFAULT_CONFIG['hora_nocturna_inicio']), minute=0, second=0, microsecond=0)
-        end_nocturna = entrada_local.replace(hour=int(DEFAULT_CONFIG['hora_nocturna_fin']), minute=0, second=0, microsecond=0)
-        if int(DEFAULT_CONFIG['hora_nocturna_fin']) <= int(DEFAULT_CONFIG['hora_nocturna_inicio']):
-            end_nocturna += timedelta(days=1)
-
-        inicio = max(entrada_local, start_nocturna)
-        fin = min(salida_local, end_nocturna)
-
-        if fin <= inicio:
-            return 0.0
-
-        return round((fin - inicio).total_seconds() / 3600.0, 2)
+        return self.rules.night_hours(hora_entrada, hora_salida)
     
     def get_day_of_week_spanish(self, date: datetime) -> str:
         days = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
         return days[date.weekday()]
 
-    def _horas_interseccion(self, a1: Optional[datetime], a2: Optional[datetime],
-                             b1: Optional[datetime], b2: Optional[datetime]) -> float:
-        if not a1 or not a2 or not b1 or not b2:
-            return 0.0
-        ini = max(a1, b1)
-        fin = min(a2, b2)
-        if fin <= ini:
-            return 0.0
-        return (fin - ini).total_seconds() / 3600.0
-
-    def _sunday_from_times(self, entrada_local: Optional[datetime], salida_local: Optional[datetime],
-                           time_slots: List[Dict]) -> Tuple[float, float]:
-        if not entrada_local or not salida_local or salida_local <= entrada_local:
-            return 0.0, 0.0
-
-        work_ini = entrada_local
-        work_fin = salida_local
-
-        sched_start = sched_end = None
-        if time_slots and time_slots[0]:
-            st = time_slots[0].get("startTime")
-            et = time_slots[0].get("endTime")
-            if st and ":" in st:
-                h, m = [int(x) for x in st.split(":")]
-                sched_start = entrada_local.replace(hour=h, minute=m, second=0, microsecond=0)
-            if et and ":" in et:
-                h, m = [int(x) for x in et.split(":")]
-                sched_end = entrada_local.replace(hour=h, minute=m, second=0, microsecond=0)
-
-        if not sched_start or not sched_end:
-            reg = 0.0
-            e100 = (work_fin - work_ini).total_seconds() / 3600.0
-            return round(reg, 2), round(e100, 2)
-
-        reg = self._horas_interseccion(work_ini, work_fin, sched_start, sched_end)
-        e100 = 0.0
-        if work_fin > sched_end:
-            extra_ini = max(work_ini, sched_end)
-            extra_fin = work_fin
-            e100 = self._horas_interseccion(extra_ini, extra_fin, extra_ini, extra_fin)
-
-        return round(reg, 2), round(e100, 2)
-
     def _parse_real_entry_times(self, entries: List[Dict]) -> Tuple[Optional[datetime], Optional[datetime], str, str]:
         """Devuelve (entrada_local, salida_local, comienzo_hhmm, fin_hhmm) en TZ AR. Primera START y última END"""
         if not entries:
             return None, None, '', ''
 
-        sorted_entries = sorted(entries, key=lambda x: x.get('time', ''))
+        sorted_entries = DailyRecord.compact_entries(entries)
         first_start = None
         last_end = None
         
         for entry in sorted_entries:
-            if entry.get('type') == 'START' and entry.get('time'):
+            if entry.type == 'START' and entry.time:
                 if first_start is None:
                     first_start = entry
-            elif entry.get('type') == 'END' and entry.get('time'):
+            elif entry.type == 'END' and entry.time:
                 last_end = entry
 
         entrada_local = None
@@ -370,42 +350,34 @@ class ArgentineHoursCalculatorEnhanced:
         comienzo_jornada = ''
         fin_jornada = ''
         
-        try:
-            if first_start:
-                entrada_local = datetime.fromisoformat(first_start['time'].replace('Z', '+00:00')).astimezone(self.tz)
-                comienzo_jornada = entrada_local.strftime('%H:%M')
-            if last_end:
-                salida_local = datetime.fromisoformat(last_end['time'].replace('Z', '+00:00')).astimezone(self.tz)
-                fin_jornada = salida_local.strftime('%H:%M')
-        except Exception:
-            pass
+        # Una hora inválida corta el resto (igual que el parseo original con try/except)
+        if first_start:
+            if first_start.epoch_us is None:
+                return entrada_local, salida_local, comienzo_jornada, fin_jornada
+            entrada_local = first_start.local_datetime(self.tz)
+            comienzo_jornada = first_start.local_time
+        if last_end and last_end.epoch_us is not None:
+            salida_local = last_end.local_datetime(self.tz)
+            fin_jornada = last_end.local_time
             
         return entrada_local, salida_local, comienzo_jornada, fin_jornada
 
     def _calculate_total_worked_hours(self, entries: List[Dict]) -> float:
-        """Suma todos los períodos START/END"""
+        """Suma todos los períodos START/END (ignora fichadas con hora inválida)"""
         if not entries:
             return 0.0
         
-        sorted_entries = sorted(entries, key=lambda x: x.get('time', ''))
         total_hours = 0.0
         current_start = None
         
-        for entry in sorted_entries:
-            entry_type = entry.get('type')
-            time_str = entry.get('time', '')
-            try:
-                if time_str:
-                    dt = datetime.fromisoformat(time_str.replace('Z', '+00:00')).astimezone(self.tz)
-                else:
-                    continue
-            except:
+        for entry in DailyRecord.compact_entries(entries):
+            if entry.epoch_us is None:
                 continue
             
-            if entry_type == 'START':
-                current_start = dt
-            elif entry_type == 'END' and current_start:
-                period_hours = (dt - current_start).total_seconds() / 3600.0
+            if entry.type == 'START':
+                current_start = entry.epoch_us
+            elif entry.type == 'END' and current_start is not None:
+                period_hours = (entry.epoch_us - current_start) / 10**6 / 3600.0
                 total_hours += period_hours
                 current_start = None
         
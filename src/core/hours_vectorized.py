@@ -0,0 +1,238 @@
+"""
+Distribución de horas vectorizada (NumPy) sobre todos los employee-days de un reporte
+Mismas reglas compiladas que ArgentineHoursCalculatorEnhanced.calculate_hour_distribution
+(core/labor_rules.py): cada modo de clase de día tiene un kernel con máscaras
+sobre arrays. Los resultados coinciden exactamente con el cálculo escalar:
+las horas se operan en microsegundos enteros y el redondeo a 2 decimales
+replica round() de Python en los casos límite.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.labor_rules import CompiledLaborRules, get_labor_rules
+
+# Valor centinela para horarios ausentes (sin fichada o sin turno)
+MISSING = np.iinfo(np.int64).min
+
+_MICROSECONDS_PER_MINUTE = 60 * 10**6
+_MICROSECONDS_PER_DAY = 24 * 60 * _MICROSECONDS_PER_MINUTE
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+
+COLUMNS = ('regular_hours', 'extra_hours_50', 'extra_hours_100', 'pending_hours')
+
+
+def wall_clock_us(moment: Optional[datetime]) -> int:
+    """Microsegundos 'de reloj' (hora local sin zona) desde 1970 o MISSING"""
+    if moment is None:
+        return MISSING
+    delta = moment.replace(tzinfo=None) - _NAIVE_EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+
+
+def slot_minutes(value: Optional[str]) -> int:
+    """'HH:MM' del turno a minutos desde la medianoche (-1 si no hay)"""
+    if value and ":" in value:
+        h, m = [int(x) for x in value.split(":")]
+        return h * 60 + m
+    return -1
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """round(x, 2) de Python elemento a elemento (recalcula en Python los empates dudosos)"""
+    scaled = values * 100.0
+    result = np.round(scaled) / 100.0
+    fraction = np.abs(scaled - np.trunc(scaled))
+    ambiguous = np.flatnonzero(np.abs(fraction - 0.5) < 1e-6)
+    for index in ambiguous:
+        result[index] = round(float(values[index]), 2)
+    return result
+
+
+def _hours_between(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Horas de start a end (0 si no hay intersección), igual que timedelta.total_seconds()/3600"""
+    return np.where(end > start, (end - start) / 10**6 / 3600.0, 0.0)
+
+
+def band_values(minutes: np.ndarray, bands) -> np.ndarray:
+    """labor_rules.band_value elemento a elemento"""
+    if not bands:
+        return np.zeros(len(minutes))
+    return np.select([minutes > threshold for threshold, _ in bands],
+                     [hours for _, hours in bands], 0.0)
+
+
+# --- Kernels por modo (mismos modos que core/labor_rules.py) ---
+
+def _todo_100(mask, params, jornada, days, out):
+    out['extra_hours_100'][mask] = days['hours'][mask]
+
+
+def _por_turno(mask, params, jornada, days, out):
+    hours, entry, exit_ = days['hours'], days['entry'], days['exit']
+    mask = mask & days['has_times'] & (exit_ > entry)
+    if not mask.any():
+        return
+    slot_start, slot_end, midnight = days['slot_start'], days['slot_end'], days['midnight']
+    has_slot = (slot_start >= 0) & (slot_end >= 0)
+    sched_start = midnight + slot_start * _MICROSECONDS_PER_MINUTE
+    sched_end = midnight + slot_end * _MICROSECONDS_PER_MINUTE
+
+    turno_regular = np.where(
+        has_slot,
+        round2(_hours_between(np.maximum(entry, sched_start), np.minimum(exit_, sched_end))),
+        0.0
+    )
+    overtime = _hours_between(np.maximum(entry, sched_end), exit_)
+    turno_extra = np.where(
+        has_slot,
+        np.where(exit_ > sched_end, round2(overtime), 0.0),
+        round2(_hours_between(entry, exit_))
+    )
+
+    # Reescalar si el cálculo por horarios no coincide con las horas trabajadas
+    total = turno_regular + turno_extra
+    rescale = (total > 0) & (np.abs(total - hours) > params['tolerancia_reescalado'])
+    scale = np.divide(hours, total, out=np.ones(len(hours)), where=rescale)
+    out['regular_hours'][mask] = np.where(rescale, turno_regular * scale, turno_regular)[mask]
+    out['extra_hours_100'][mask] = np.where(rescale, turno_extra * scale, turno_extra)[mask]
+
+
+def _sabado_bandas(mask, params, jornada, days, out):
+    hours, entry, exit_, midnight = days['hours'], days['entry'], days['exit'], days['midnight']
+
+    # Con fichadas: base al 100% con descuentos por tardanza / retiro anticipado
+    with_times = mask & days['has_times']
+    if with_times.any():
+        start_h, start_m = params['inicio']
+        end_h, end_m = params['fin']
+        start = midnight + (start_h * 60 + start_m) * _MICROSECONDS_PER_MINUTE
+        end = midnight + (end_h * 60 + end_m) * _MICROSECONDS_PER_MINUTE
+
+        late = np.maximum(0, (entry - start) / 10**6 / 60.0)
+        early = np.where(exit_ < end, np.maximum(0, (end - exit_) / 10**6 / 60.0), 0.0)
+        base = np.maximum(0.0, params['base_horas_100'] - band_values(late, params['tardanza'])
+                          - band_values(early, params['retiro_anticipado']))
+        after = np.where(exit_ > end,
+                         band_values((exit_ - end) / 10**6 / 60.0, params['extra_posterior']), 0.0)
+        out['extra_hours_100'][with_times] = round2(base + after)[with_times]
+
+    # Sin fichadas: jornada regular y el resto al 100%
+    plain = mask & ~days['has_times']
+    out['regular_hours'][plain] = np.minimum(hours, jornada)[plain]
+    out['extra_hours_100'][plain] = np.maximum(0, hours - jornada)[plain]
+
+
+def _jornada_y_extras(mask, params, jornada, days, out):
+    hours = days['hours']
+    tope_50 = params['tope_extras_50']
+
+    short = mask & (hours <= jornada)
+    out['regular_hours'][short] = hours[short]
+    out['pending_hours'][short] = np.maximum(0, jornada - hours)[short]
+
+    long_day = mask & (hours > jornada)
+    extra = hours - jornada
+    out['regular_hours'][long_day] = jornada
+    out['extra_hours_50'][long_day] = np.minimum(extra, tope_50)[long_day]
+    out['extra_hours_100'][long_day] = np.where(extra > tope_50, extra - tope_50, 0.0)[long_day]
+
+
+KERNELS = {
+    'todo_100': _todo_100,
+    'por_turno': _por_turno,
+    'sabado_bandas': _sabado_bandas,
+    'jornada_y_extras': _jornada_y_extras,
+}
+
+
+def distribute_hours(hours_worked, weekday, is_holiday, is_workday,
+                     entry_us, exit_us, slot_start_min, slot_end_min,
+                     rules: CompiledLaborRules = None) -> Dict[str, np.ndarray]:
+    """
+    Distribuye las horas de N employee-days con las reglas laborales compiladas
+    Args:
+        hours_worked: horas trabajadas (float)
+        weekday: 0=Lunes ... 6=Domingo
+        is_holiday, is_workday: flags del día
+        entry_us, exit_us: primera entrada / última salida en microsegundos de reloj
+            local (wall_clock_us), MISSING si no hay
+        slot_start_min, slot_end_min: turno programado en minutos (-1 si no hay)
+        rules: reglas compiladas (por defecto la variante configurada)
+    Returns:
+        {'regular_hours', 'extra_hours_50', 'extra_hours_100', 'pending_hours'}
+    """
+    rules = rules or get_labor_rules()
+    hours = np.asarray(hours_worked, dtype=np.float64)
+    entry = np.asarray(entry_us, dtype=np.int64)
+    exit_ = np.asarray(exit_us, dtype=np.int64)
+    days = {
+        'hours': hours,
+        'entry': entry,
+        'exit': exit_,
+        'has_times': (entry != MISSING) & (exit_ != MISSING),
+        'midnight': entry - np.mod(entry, _MICROSECONDS_PER_DAY),
+        'slot_start': np.asarray(slot_start_min, dtype=np.int64),
+        'slot_end': np.asarray(slot_end_min, dtype=np.int64),
+    }
+
+    size = len(hours)
+    out = {column: np.zeros(size) for column in COLUMNS}
+
+    # Misma tabla de despacho que el cálculo escalar
+    index = ((np.asarray(is_holiday, dtype=np.int64) * 7 + np.asarray(weekday, dtype=np.int64)) * 2
+             + np.asarray(is_workday, dtype=np.int64))
+    classes = np.asarray(rules.class_table, dtype=np.int64)[index]
+    worked = hours != 0
+
+    for position, rule in enumerate(rules.rules):
+        mask = worked & (classes == position)
+        if mask.any():
+            KERNELS[rule.mode](mask, rule.params, float(rules.jornada_horas), days, out)
+
+    return {column: round2(values) for column, values in out.items()}
+
+
+class HoursBatch:
+    """Acumula los inputs de distribución de muchos días para resolverlos en una sola llamada"""
+
+    def __init__(self):
+        self.hours_worked: List[float] = []
+        self.weekday: List[int] = []
+        self.is_holiday: List[bool] = []
+        self.is_workday: List[bool] = []
+        self.entry_us: List[int] = []
+        self.exit_us: List[int] = []
+        self.slot_start_min: List[int] = []
+        self.slot_end_min: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.hours_worked)
+
+    def add(self, hours_worked: float, date: datetime, is_holiday: bool, is_workday: bool,
+            entrada_local: Optional[datetime], salida_local: Optional[datetime],
+            time_slots: Optional[List[Dict]]) -> int:
+        """Agrega un día; devuelve su posición en el batch"""
+        slot = time_slots[0] if time_slots and time_slots[0] else {}
+        self.hours_worked.append(hours_worked)
+        self.weekday.append(date.weekday())
+        self.is_holiday.append(is_holiday)
+        self.is_workday.append(is_workday)
+        self.entry_us.append(wall_clock_us(entrada_local))
+        self.exit_us.append(wall_clock_us(salida_local))
+        self.slot_start_min.append(slot_minutes(slot.get('startTime')))
+        self.slot_end_min.append(slot_minutes(slot.get('endTime')))
+        return len(self.hours_worked) - 1
+
+    def distribute(self, rules: CompiledLaborRules = None) -> Dict[str, List[float]]:
+        """Resuelve todos los días; listas de floats de Python por columna"""
+        if not self.hours_worked:
+            return {column: [] for column in COLUMNS}
+        result = distribute_hours(
+            self.hours_worked, self.weekday, self.is_holiday, self.is_workday,
+            self.entry_us, self.exit_us, self.slot_start_min, self.slot_end_min,
+            rules
+        )
+        return {column: values.tolist() for column, values in result.items()}
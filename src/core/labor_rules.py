@@ -0,0 +1,253 @@
+"""
+Motor de reglas laborales
+Compila una variante de config/labor_rules.py una sola vez: cada clase de día queda
+como una closure con sus umbrales ya resueltos y una tabla plana
+(feriado, día de la semana, laborable) → regla, de modo que clasificar un día es
+un único acceso por índice en lugar de una cadena de ifs.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config.default_config import DEFAULT_CONFIG
+from config.labor_rules import LABOR_RULES
+
+# (horas_trabajadas, entrada_local, salida_local, time_slots) → (regulares, extras 50%, extras 100%, pendientes)
+DayHandler = Callable[[float, Optional[datetime], Optional[datetime], List[Dict]],
+                      Tuple[float, float, float, float]]
+
+Bands = Tuple[Tuple[float, float], ...]
+
+
+def _parse_hhmm(value: str) -> Tuple[int, int]:
+    h, m = [int(x) for x in value.split(":")]
+    return h, m
+
+
+def _bands(value) -> Bands:
+    """Bandas ordenadas de mayor a menor umbral"""
+    return tuple(sorted(((float(threshold), float(hours)) for threshold, hours in value or []),
+                        reverse=True))
+
+
+def band_value(minutes: float, bands: Bands) -> float:
+    """Horas de la primera banda cuyo umbral se supera (0 si ninguna)"""
+    for threshold, hours in bands:
+        if minutes > threshold:
+            return hours
+    return 0.0
+
+
+def table_index(weekday: int, is_holiday: bool, is_workday: bool) -> int:
+    """Posición del día en la tabla de despacho"""
+    return ((7 if is_holiday else 0) + weekday) * 2 + (1 if is_workday else 0)
+
+
+def _horas_interseccion(a1: Optional[datetime], a2: Optional[datetime],
+                        b1: Optional[datetime], b2: Optional[datetime]) -> float:
+    if not a1 or not a2 or not b1 or not b2:
+        return 0.0
+    ini = max(a1, b1)
+    fin = min(a2, b2)
+    if fin <= ini:
+        return 0.0
+    return (fin - ini).total_seconds() / 3600.0
+
+
+def turno_hours(entrada_local: Optional[datetime], salida_local: Optional[datetime],
+                time_slots: List[Dict]) -> Tuple[float, float]:
+    """(regulares dentro del turno, horas después del turno) redondeadas a 2 decimales"""
+    if not entrada_local or not salida_local or salida_local <= entrada_local:
+        return 0.0, 0.0
+
+    sched_start = sched_end = None
+    if time_slots and time_slots[0]:
+        st = time_slots[0].get("startTime")
+        et = time_slots[0].get("endTime")
+        if st and ":" in st:
+            h, m = _parse_hhmm(st)
+            sched_start = entrada_local.replace(hour=h, minute=m, second=0, microsecond=0)
+        if et and ":" in et:
+            h, m = _parse_hhmm(et)
+            sched_end = entrada_local.replace(hour=h, minute=m, second=0, microsecond=0)
+
+    if not sched_start or not sched_end:
+        e100 = (salida_local - entrada_local).total_seconds() / 3600.0
+        return 0.0, round(e100, 2)
+
+    reg = _horas_interseccion(entrada_local, salida_local, sched_start, sched_end)
+    e100 = 0.0
+    if salida_local > sched_end:
+        extra_ini = max(entrada_local, sched_end)
+        e100 = _horas_interseccion(extra_ini, salida_local, extra_ini, salida_local)
+
+    return round(reg, 2), round(e100, 2)
+
+
+# --- Fábricas de closures por modo ---
+
+def _todo_100(params: Dict, jornada: float) -> DayHandler:
+    def handler(hours_worked, entrada_local, salida_local, time_slots):
+        return 0.0, 0.0, hours_worked, 0.0
+    return handler
+
+
+def _por_turno(params: Dict, jornada: float) -> DayHandler:
+    tolerance = params['tolerancia_reescalado']
+
+    def handler(hours_worked, entrada_local, salida_local, time_slots):
+        reg, e100 = turno_hours(entrada_local, salida_local, time_slots or [])
+        total_calc = reg + e100
+        if total_calc > 0 and abs(total_calc - hours_worked) > tolerance:
+            scale = hours_worked / total_calc
+            return reg * scale, 0.0, e100 * scale, 0.0
+        return reg, 0.0, e100, 0.0
+    return handler
+
+
+def _sabado_bandas(params: Dict, jornada: float) -> DayHandler:
+    start_h, start_m = params['inicio']
+    end_h, end_m = params['fin']
+    base_hours = params['base_horas_100']
+    late_bands = params['tardanza']
+    early_bands = params['retiro_anticipado']
+    after_bands = params['extra_posterior']
+
+    def handler(hours_worked, entrada_local, salida_local, time_slots):
+        if not (entrada_local and salida_local):
+            return min(hours_worked, jornada), 0.0, max(0, hours_worked - jornada), 0.0
+
+        inicio = entrada_local.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+        fin = entrada_local.replace(hour=end_h, minute=end_m, second=0, microsecond=0)
+
+        minutos_tardanza = max(0, (entrada_local - inicio).total_seconds() / 60.0)
+        minutos_retiro = max(0, (fin - salida_local).total_seconds() / 60.0) if salida_local < fin else 0
+
+        base = max(0.0, base_hours - band_value(minutos_tardanza, late_bands)
+                   - band_value(minutos_retiro, early_bands))
+
+        extra = 0.0
+        if salida_local > fin:
+            extra = band_value((salida_local - fin).total_seconds() / 60.0, after_bands)
+
+        return 0.0, 0.0, round(base + extra, 2), 0.0
+    return handler
+
+
+def _jornada_y_extras(params: Dict, jornada: float) -> DayHandler:
+    tope_50 = params['tope_extras_50']
+
+    def handler(hours_worked, entrada_local, salida_local, time_slots):
+        if hours_worked <= jornada:
+            return hours_worked, 0.0, 0.0, max(0, jornada - hours_worked)
+        extra = hours_worked - jornada
+        if extra <= tope_50:
+            return jornada, extra, 0.0, 0.0
+        return jornada, tope_50, extra - tope_50, 0.0
+    return handler
+
+
+MODES = {
+    'todo_100': _todo_100,
+    'por_turno': _por_turno,
+    'sabado_bandas': _sabado_bandas,
+    'jornada_y_extras': _jornada_y_extras,
+}
+
+
+class DayRule:
+    """Clase de día compilada (modo, parámetros normalizados y closure escalar)"""
+
+    __slots__ = ('name', 'mode', 'params', 'handler')
+
+    def __init__(self, name: str, definition: Dict, jornada: float):
+        mode = definition.get('modo')
+        if mode not in MODES:
+            raise ValueError(f"Modo de regla laboral desconocido en '{name}': {mode}")
+        params = {key: value for key, value in definition.items() if key not in ('modo', 'si_no_laborable')}
+        if mode == 'sabado_bandas':
+            params['inicio'] = _parse_hhmm(params['inicio'])
+            params['fin'] = _parse_hhmm(params['fin'])
+            params['base_horas_100'] = float(params['base_horas_100'])
+            for key in ('tardanza', 'retiro_anticipado', 'extra_posterior'):
+                params[key] = _bands(params.get(key))
+        elif mode == 'por_turno':
+            params['tolerancia_reescalado'] = float(params.get('tolerancia_reescalado', 0.01))
+        elif mode == 'jornada_y_extras':
+            params['tope_extras_50'] = float(params['tope_extras_50'])
+
+        self.name = name
+        self.mode = mode
+        self.params = params
+        self.handler = MODES[mode](params, jornada)
+
+
+class CompiledLaborRules:
+    """Variante de reglas lista para despachar días"""
+
+    def __init__(self, variant: str, definition: Dict):
+        self.variant = variant
+        self.jornada_horas = definition.get('jornada_horas', DEFAULT_CONFIG['jornada_completa_horas'])
+        nocturna = definition.get('nocturna', {})
+        self.night_start = int(nocturna.get('inicio', DEFAULT_CONFIG['hora_nocturna_inicio']))
+        self.night_end = int(nocturna.get('fin', DEFAULT_CONFIG['hora_nocturna_fin']))
+        self._night_shift = timedelta(days=1) if self.night_end <= self.night_start else timedelta(0)
+        self.tz = ZoneInfo(DEFAULT_CONFIG['local_timezone'])
+
+        classes = definition['clases']
+        self.rules: List[DayRule] = [DayRule(name, classes[name], self.jornada_horas)
+                                     for name in sorted(classes)]
+        positions = {rule.name: position for position, rule in enumerate(self.rules)}
+
+        # Tabla plana: table_index(weekday, is_holiday, is_workday) → posición de la regla
+        weekdays = definition['dias_semana']
+        if len(weekdays) != 7:
+            raise ValueError(f"'dias_semana' de la variante '{variant}' debe tener 7 clases")
+        self.class_table: List[int] = [0] * 28
+        for is_holiday in (False, True):
+            for weekday in range(7):
+                for is_workday in (False, True):
+                    name = 'feriado' if is_holiday else weekdays[weekday]
+                    if not is_workday and classes[name].get('si_no_laborable'):
+                        name = classes[name]['si_no_laborable']
+                    self.class_table[table_index(weekday, is_holiday, is_workday)] = positions[name]
+        self.handlers: List[DayHandler] = [self.rules[position].handler for position in self.class_table]
+
+        payload = json.dumps({'variant': variant, 'definition': definition,
+                              'jornada': self.jornada_horas,
+                              'nocturna': [self.night_start, self.night_end]}, sort_keys=True)
+        self.digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def handler_for(self, weekday: int, is_holiday: bool, is_workday: bool) -> DayHandler:
+        return self.handlers[table_index(weekday, is_holiday, is_workday)]
+
+    def night_hours(self, hora_entrada: Optional[datetime], hora_salida: Optional[datetime]) -> float:
+        """Horas dentro de la franja nocturna (desde el día de la entrada)"""
+        if not hora_entrada or not hora_salida or hora_salida <= hora_entrada:
+            return 0.0
+
+        entrada_local = hora_entrada.astimezone(self.tz)
+        salida_local = hora_salida.astimezone(self.tz)
+
+        start_nocturna = entrada_local.replace(hour=self.night_start, minute=0, second=0, microsecond=0)
+        end_nocturna = entrada_local.replace(hour=self.night_end, minute=0, second=0,
+                                             microsecond=0) + self._night_shift
+
+        inicio = max(entrada_local, start_nocturna)
+        fin = min(salida_local, end_nocturna)
+        if fin <= inicio:
+            return 0.0
+        return round((fin - inicio).total_seconds() / 3600.0, 2)
+
+
+@lru_cache(maxsize=None)
+def get_labor_rules(variant: str = None) -> CompiledLaborRules:
+    """Reglas compiladas de la variante (por defecto labor_rules_variant); se compilan una vez"""
+    variant = variant or DEFAULT_CONFIG['labor_rules_variant']
+    if variant not in LABOR_RULES:
+        raise ValueError(f"Variante de reglas laborales inexistente: {variant}")
+    return CompiledLaborRules(variant, LABOR_RULES[variant])
@@ -0,0 +1,209 @@
+"""
+Monitor de asistencia en vivo (quién está fichado hoy)
+Consulta sólo los day summaries del día de hoy y, en cada poll, sólo los empleados
+cuyo estado todavía puede cambiar: los que no llegaron o están adentro. Los ya
+resueltos (franco, licencia, feriado o que salieron después del fin del turno) se
+revisan recién cada live_settled_refresh_seconds por si hubo correcciones.
+
+El modelo vive en memoria (no se escribe ningún archivo) y cada poll informa su costo:
+empleados consultados, requests HTTP, day summaries recibidos, cambios y segundos.
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+from core.employee_pool import compact_summary
+from core.models import LOCAL_TZ, DailyRecord
+
+# Estados posibles de un empleado en el día
+LIVE_STATES = ('in', 'out', 'not_arrived', 'absent', 'off')
+
+ABSENCE_INCIDENCES = {'ABSENCE', 'ABSENT'}
+
+
+def _minutes(value: Optional[str]) -> int:
+    """'HH:MM' a minutos desde la medianoche (-1 si no hay)"""
+    if value and ':' in value:
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    return -1
+
+
+def _fingerprint(summary: Optional[Dict]) -> Optional[str]:
+    if summary is None:
+        return None
+    return hashlib.sha1(json.dumps(summary, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def employee_status(summary: Optional[Dict], now_minutes: int) -> Dict:
+    """
+    Estado del empleado a la hora now_minutes (minutos locales desde la medianoche)
+    late: llegó después del turno + live_late_grace_minutes (o Human marcó LATE), o
+    todavía no llegó pasada esa tolerancia
+    settled: el estado ya no cambia en el día (sólo se revisa cada tanto); un turno
+    nocturno (22:00-06:00) termina mañana, así que hoy no se da por cerrado
+    """
+    summary = summary or {}
+    entries = DailyRecord.compact_entries(summary.get('entries', []))
+    incidences = summary.get('incidences') or []
+    slots = summary.get('timeSlots') or []
+    slot = slots[0] if slots and slots[0] else {}
+    scheduled_start, scheduled_end = _minutes(slot.get('startTime')), _minutes(slot.get('endTime'))
+    if 0 <= scheduled_end < scheduled_start:
+        scheduled_end += 24 * 60  # Turno nocturno: termina al día siguiente
+    is_off = bool(summary.get('holidays') or summary.get('timeOffRequests')
+                  or summary.get('isWorkday') is False)
+    grace = DEFAULT_CONFIG['live_late_grace_minutes']
+
+    if entries:
+        state = 'in' if entries[-1].type == 'START' else 'out'
+    elif any(incidence in ABSENCE_INCIDENCES for incidence in incidences):
+        state = 'absent'
+    elif is_off:
+        state = 'off'
+    elif scheduled_start >= 0 and now_minutes >= scheduled_start + DEFAULT_CONFIG['live_absent_after_minutes']:
+        state = 'absent'
+    else:
+        state = 'not_arrived'
+
+    late = 'LATE' in incidences
+    if scheduled_start >= 0 and not late:
+        if entries:
+            late = _minutes(entries[0].local_time) > scheduled_start + grace
+        elif state == 'not_arrived':
+            late = now_minutes > scheduled_start + grace
+
+    return {
+        'state': state,
+        'late': late,
+        'first_entry': entries[0].local_time if entries else '',
+        'last_entry': entries[-1].local_time if entries else '',
+        'scheduled': f"{slot['startTime']}-{slot['endTime']}" if scheduled_start >= 0 and scheduled_end >= 0 else '',
+        'settled': state == 'off' or (state != 'in' and 0 <= scheduled_end <= now_minutes),
+    }
+
+
+class LiveAttendanceMonitor:
+    """Modelo en memoria del día de hoy, actualizado con polls incrementales"""
+
+    def __init__(self, processor, user_ids: List[str] = None):
+        self.processor = processor
+        self.user_ids = user_ids
+        self.settled_refresh_seconds = DEFAULT_CONFIG['live_settled_refresh_seconds']
+        self.day: Optional[str] = None
+        self.last_poll: Optional[Dict] = None
+        self.total_requests = 0
+        self._employees: Dict[str, Dict] = {}
+
+    def _reset(self, day: str):
+        """Arranca el día: todos los empleados activos (del filtro) sin consultar"""
+        users = self.processor._apply_user_filters(self.processor.get_users_list(),
+                                                   {'user_ids': self.user_ids} if self.user_ids else {})
+        self.day = day
+        self._employees = {}
+        for user in users:
+            employee_id = user.get('employeeInternalId')
+            if employee_id:
+                self._employees[employee_id] = {
+                    'employee_id': employee_id,
+                    'name': f"{user.get('firstName', '')} {user.get('lastName', '')}".strip(),
+                    'department': user.get('department') or '',
+                    'summary': None,
+                    'fingerprint': None,
+                    'checked_at': None,
+                    'settled': False,
+                }
+
+    def _due(self) -> List[str]:
+        """Empleados a consultar en este poll"""
+        now = time.monotonic()
+        return [employee_id for employee_id, employee in self._employees.items()
+                if employee['checked_at'] is None or not employee['settled']
+                or now - employee['checked_at'] >= self.settled_refresh_seconds]
+
+    def poll(self, now: datetime = None) -> Dict:
+        """
+        Consulta los empleados pendientes y actualiza el modelo
+        Returns:
+            {'at', 'polled', 'changed', 'failed', 'requests', 'day_summaries', 'seconds', 'counts'}
+        """
+        now = now or datetime.now(LOCAL_TZ)
+        today = now.date().isoformat()
+        if today != self.day:
+            self._reset(today)
+
+        api_client = self.processor.api_client
+        started = time.perf_counter()
+        requests_before = api_client.request_count
+        due = self._due()
+
+        # Sólo el día de hoy; un lote que falla deja a sus empleados como estaban
+        received: Dict[str, Dict] = {}
+        answered = set()
+        day_summaries = 0
+        if due:
+            for batch in api_client.iter_day_summaries(today, today, due):
+                answered.update(batch['user_ids'])
+                day_summaries += len(batch['items'])
+                for summary in batch['items']:
+                    received[summary.get('employeeId')] = compact_summary(summary)
+
+        changed = 0
+        checked_at = time.monotonic()
+        for employee_id in answered:
+            employee = self._employees.get(employee_id)
+            if employee is None:
+                continue
+            summary = received.get(employee_id)
+            fingerprint = _fingerprint(summary)
+            if employee['checked_at'] is None or fingerprint != employee['fingerprint']:
+                changed += 1
+                employee['summary'] = summary
+                employee['fingerprint'] = fingerprint
+            employee['checked_at'] = checked_at
+
+        # El estado depende de la hora (no llegó -> tarde -> ausente): se recalcula para todos
+        now_minutes = now.hour * 60 + now.minute
+        for employee in self._employees.values():
+            employee.update(employee_status(employee['summary'], now_minutes))
+            if employee['checked_at'] is None:
+                employee['settled'] = False
+
+        requests = api_client.request_count - requests_before
+        self.total_requests += requests
+        self.last_poll = {
+            'at': now.strftime('%H:%M:%S'),
+            'polled': len(due),
+            'changed': changed,
+            'failed': len(due) - len(answered),
+            'requests': requests,
+            'day_summaries': day_summaries,
+            'seconds': round(time.perf_counter() - started, 2),
+            'counts': self.counts(),
+        }
+        print(f"📡 Poll en vivo {self.last_poll['at']}: {len(due)} empleados consultados, "
+              f"{requests} requests, {changed} cambios, {self.last_poll['seconds']}s")
+        return self.last_poll
+
+    def counts(self) -> Dict[str, int]:
+        """Empleados por estado más 'late' y 'total'"""
+        counts = {state: 0 for state in LIVE_STATES}
+        counts['late'] = 0
+        for employee in self._employees.values():
+            if 'state' in employee:
+                counts[employee['state']] += 1
+                counts['late'] += employee['late']
+        counts['total'] = len(self._employees)
+        return counts
+
+    def employees(self, state: str = None, late: bool = None) -> List[Dict]:
+        """Empleados del modelo (filtrados por estado y/o tardanza), sin el day summary"""
+        return [{key: value for key, value in employee.items() if key not in ('summary', 'fingerprint', 'checked_at')}
+                for employee in self._employees.values()
+                if 'state' in employee
+                and (state is None or employee['state'] == state)
+                and (late is None or employee['late'] == late)]
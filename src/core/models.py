@@ -0,0 +1,274 @@
+"""
+Modelos compactos para los datos procesados por empleado
+Clases con __slots__ en lugar de un dict por día; los strings repetidos (días de
+la semana, feriados, sedes, horarios) se internan. Mantienen acceso estilo dict
+(record['campo'], record.get('campo')) para el generador de Excel.
+Las fichadas se parsean una sola vez (epoch y hora local) y se ordenan y aparean
+al construir el registro; calculador, Excel y estadísticas reutilizan ese resultado.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config.default_config import DEFAULT_CONFIG
+
+LOCAL_TZ = ZoneInfo(DEFAULT_CONFIG['local_timezone'])
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Par entrada/salida: índices en raw_entries (salida -1 si el par quedó abierto)
+EntryPair = Tuple[int, int]
+
+
+def intern_str(value):
+    """Interna strings para compartir una sola copia entre miles de registros"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def parse_entry_time(time_str: str) -> Tuple[Optional[int], str]:
+    """
+    Parsea el timestamp ISO de una fichada
+    Returns:
+        (microsegundos desde epoch UTC, 'HH:MM' en hora local) o (None, '') si no se puede
+    """
+    if not time_str:
+        return None, ''
+    try:
+        moment = datetime.fromisoformat(time_str.replace('Z', '+00:00')).astimezone(timezone.utc)
+    except (AttributeError, TypeError, ValueError):
+        return None, ''
+    return (moment - _EPOCH) // _MICROSECOND, intern_str(moment.astimezone(LOCAL_TZ).strftime('%H:%M'))
+
+
+def local_datetime(epoch_us: int, tz=LOCAL_TZ) -> datetime:
+    """datetime local (aware) de un epoch en microsegundos"""
+    return (_EPOCH + timedelta(microseconds=epoch_us)).astimezone(tz)
+
+
+class SlottedRecord:
+    """Base con acceso estilo dict sobre los __slots__ de la subclase"""
+    __slots__ = ()
+    _fields: frozenset = frozenset()
+
+    def __getitem__(self, key: str):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields
+
+    def get(self, key: str, default=None):
+        if key not in self._fields:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def keys(self) -> List[str]:
+        return list(self.__slots__)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class ClockEntry(SlottedRecord):
+    """
+    Fichada (entrada o salida) con sólo los campos que usa el reporte
+    epoch_us y local_time se calculan una vez al construirla (None/'' si la hora es inválida)
+    """
+    __slots__ = ('time', 'type', 'site', 'comment', 'epoch_us', 'local_time')
+    _fields = frozenset(__slots__)
+
+    def __init__(self, time: str, type: str, site: str = '', comment: str = ''):
+        self.time = time
+        self.type = intern_str(type)
+        self.site = intern_str(site or '')
+        self.comment = comment or ''
+        self.epoch_us, self.local_time = parse_entry_time(time)
+
+    def local_datetime(self, tz=LOCAL_TZ) -> Optional[datetime]:
+        """Hora de la fichada como datetime local (None si la hora es inválida)"""
+        return None if self.epoch_us is None else local_datetime(self.epoch_us, tz)
+
+    @classmethod
+    def from_api(cls, entry: Dict) -> 'ClockEntry':
+        site = entry.get('site')
+        return cls(
+            time=entry.get('time', ''),
+            type=entry.get('type'),
+            site=site.get('name', '') if site else '',
+            comment=entry.get('comment', '')
+        )
+
+    def get(self, key: str, default=None):
+        # Compatibilidad con el formato de la API: entry['site'] = {'name': ...}
+        if key == 'site':
+            return {'name': self.site} if self.site else default
+        return super().get(key, default)
+
+    def to_dict(self) -> Dict:
+        return {
+            'time': self.time,
+            'type': self.type,
+            'site': {'name': self.site} if self.site else None,
+            'comment': self.comment,
+        }
+
+
+class EmployeeInfo(SlottedRecord):
+    """Datos del empleado que necesita el reporte (no el JSON completo del usuario)"""
+    __slots__ = ('employeeInternalId', 'firstName', 'lastName', 'department',
+                 'location', 'jobTitle', 'isActive')
+    _fields = frozenset(__slots__)
+
+    def __init__(self, employeeInternalId: str, firstName: str = '', lastName: str = '',
+                 department: str = None, location: str = None, jobTitle: str = None,
+                 isActive: bool = True):
+        self.employeeInternalId = employeeInternalId
+        self.firstName = firstName
+        self.lastName = lastName
+        self.department = intern_str(department)
+        self.location = intern_str(location)
+        self.jobTitle = intern_str(jobTitle)
+        self.isActive = isActive
+
+    @classmethod
+    def from_user(cls, user) -> 'EmployeeInfo':
+        """Construye desde el JSON de usuario de la API (o devuelve la instancia tal cual)"""
+        if isinstance(user, EmployeeInfo):
+            return user
+        return cls(**{key: user[key] for key in cls.__slots__ if key in user})
+
+
+class DailyRecord(SlottedRecord):
+    """Fila diaria de un empleado (reemplaza el dict de ~25 claves por día)"""
+    __slots__ = (
+        'employee_id', 'date', 'day_of_week', 'scheduled_start', 'scheduled_end',
+        'start_time', 'end_time', 'hours_worked', 'regular_hours', 'extra_hours_50',
+        'extra_hours_100', 'night_hours', 'pending_hours', 'is_holiday', 'holiday_name',
+        'has_time_off', 'time_off_name', 'has_absence',
+        # Para Excel detallado:
+        'raw_entries', 'time_slots', 'day_summary_id', 'weekday', 'hours_data', 'incidences',
+        'permission_request', 'entry_pairs',
+    )
+    _fields = frozenset(__slots__)
+
+    def __init__(self, **values):
+        values.setdefault('permission_request', '')
+        for key in self.__slots__:
+            setattr(self, key, values.get(key))
+        if self.entry_pairs is None:
+            self.entry_pairs = self.pair_entries(self.raw_entries or [])
+
+        # Strings muy repetidos entre registros
+        self.day_of_week = intern_str(self.day_of_week)
+        self.scheduled_start = intern_str(self.scheduled_start)
+        self.scheduled_end = intern_str(self.scheduled_end)
+        self.holiday_name = intern_str(self.holiday_name)
+        self.time_off_name = intern_str(self.time_off_name)
+        self.weekday = intern_str(self.weekday)
+        self.incidences = [intern_str(incidence) for incidence in self.incidences or []]
+
+    @staticmethod
+    def compact_entries(entries: Iterable[Dict]) -> List[ClockEntry]:
+        """Fichadas compactas, parseadas y ordenadas por hora (una lista ya compacta se devuelve tal cual)"""
+        if isinstance(entries, list) and DailyRecord._is_compact(entries):
+            return entries
+        compact = [entry if isinstance(entry, ClockEntry) else ClockEntry.from_api(entry)
+                   for entry in entries or []]
+        compact.sort(key=lambda entry: entry.time or '')
+        return compact
+
+    @staticmethod
+    def _is_compact(entries: List) -> bool:
+        """True si todas son ClockEntry ordenadas por hora (sin armar listas nuevas)"""
+        previous = ''
+        for entry in entries:
+            if not isinstance(entry, ClockEntry):
+                return False
+            time = entry.time or ''
+            if time < previous:
+                return False
+            previous = time
+        return True
+
+    @staticmethod
+    def pair_entries(entries: List[ClockEntry]) -> List[EntryPair]:
+        """
+        Pares entrada/salida del Excel sobre fichadas ordenadas: cada START abre un par
+        (pisando uno abierto), cada END lo cierra; un START final queda sin salida
+        """
+        pairs: List[EntryPair] = []
+        open_start = None
+        for position, entry in enumerate(entries):
+            if entry.type == 'START':
+                open_start = position
+            elif entry.type == 'END' and open_start is not None:
+                pairs.append((open_start, position))
+                open_start = None
+        if open_start is not None:
+            pairs.append((open_start, -1))
+        return pairs
+
+    @staticmethod
+    def compact_time_slots(time_slots: Iterable[Dict]) -> List[Dict]:
+        return [{'startTime': intern_str(slot.get('startTime', '')),
+                 'endTime': intern_str(slot.get('endTime', ''))} if slot else {}
+                for slot in time_slots or []]
+
+    def to_dict(self) -> Dict:
+        data = super().to_dict()
+        data['raw_entries'] = [entry.to_dict() for entry in self.raw_entries or []]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DailyRecord':
+        values = dict(data)
+        values['raw_entries'] = cls.compact_entries(values.get('raw_entries'))
+        values.pop('entry_pairs', None)  # Se recalculan sobre las fichadas ordenadas
+        return cls(**values)
+
+
+def employee_data_to_dict(employee_data: Dict) -> Dict:
+    """Versión serializable a JSON de la salida de process_employee_data"""
+    return {
+        'employee_info': employee_data['employee_info'].to_dict(),
+        'daily_data': [record.to_dict() for record in employee_data['daily_data']],
+        'totals': employee_data['totals'],
+        'compensations': employee_data['compensations'],
+    }
+
+
+def employee_data_from_dict(data: Dict) -> Dict:
+    """Inversa de employee_data_to_dict"""
+    return {
+        'employee_info': EmployeeInfo.from_user(data['employee_info']),
+        'daily_data': [DailyRecord.from_dict(record) for record in data['daily_data']],
+        'totals': data['totals'],
+        'compensations': data['compensations'],
+    }
+
+
+def unknown_employee(employee_id: str) -> EmployeeInfo:
+    """Empleado con day summaries pero ausente del directorio de usuarios"""
+    return EmployeeInfo(employeeInternalId=employee_id, firstName='Desconocido', lastName='')
+
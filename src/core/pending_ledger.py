@@ -0,0 +1,135 @@
+"""
+Libro local de horas pendientes por empleado
+Al terminar cada corrida se guardan los totales del período cerrado (pendientes,
+extras y compensaciones) de cada empleado. La corrida del período siguiente arranca
+con el saldo de horas pendientes del período anterior en lugar de 0, así el saldo
+acumulado cuesta la descarga de un solo período y no de toda la historia.
+
+Sólo se arrastra el saldo de un período contiguo (termina el día anterior al inicio
+del nuevo): si falta un período en el medio el saldo no se puede asegurar.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+
+LEDGER_VERSION = 1
+
+
+def _previous_day(day: str) -> str:
+    return (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+
+
+def is_closed_period(end_date: str, today: date = None) -> bool:
+    """Un período está cerrado cuando su último día ya pasó"""
+    return date.fromisoformat(end_date) < (today or date.today())
+
+
+class PendingLedger:
+    """Saldos por empleado y período cerrado, persistidos en JSON (uno por tenant)"""
+
+    def __init__(self, api_key: str = None, base_url: str = None, cache_dir: str = None):
+        self.cache_dir = os.path.expanduser(cache_dir or DEFAULT_CONFIG['cache_directory'])
+        self.max_periods = DEFAULT_CONFIG['pending_ledger_max_periods']
+
+        tenant = f"{base_url or DEFAULT_CONFIG['base_url']}|{api_key or ''}"
+        tenant_hash = hashlib.sha1(tenant.encode('utf-8')).hexdigest()[:12]
+        self.path = os.path.join(self.cache_dir, f"pending_ledger_{tenant_hash}.json")
+
+        self._employees: Optional[Dict[str, List[Dict]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        if self._employees is not None:
+            return self._employees
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != LEDGER_VERSION:
+                raise ValueError(f"versión {data.get('version')}")
+            self._employees = data['employees']
+        except FileNotFoundError:
+            self._employees = {}
+        except Exception as e:
+            print(f"⚠️ Libro de horas pendientes inválido, se ignora: {str(e)}")
+            self._employees = {}
+        return self._employees
+
+    def previous_balances(self, employee_ids: Iterable[str], start_date: str) -> Dict[str, float]:
+        """
+        Saldo de horas pendientes con el que arranca cada empleado
+        Returns:
+            employee_id -> remaining_pending_hours del período que termina el día
+            anterior a start_date (sólo empleados con ese período registrado)
+        """
+        previous_end = _previous_day(start_date)
+        balances = {}
+        with self._lock:
+            employees = self._load()
+            for employee_id in employee_ids:
+                for period in reversed(employees.get(employee_id, [])):
+                    if period['end_date'] == previous_end:
+                        balances[employee_id] = period['remaining_pending_hours']
+                        break
+        return balances
+
+    def record_period(self, start_date: str, end_date: str, processed_employees: Dict[str, Dict],
+                      previous_balances: Dict[str, float] = None) -> int:
+        """
+        Registra los totales del período de cada empleado (reemplaza períodos que se superponen)
+        Returns:
+            cantidad de empleados con períodos posteriores ya registrados (quedan desactualizados)
+        """
+        previous_balances = previous_balances or {}
+        closed_at = datetime.now().isoformat(timespec='seconds')
+        stale = 0
+        with self._lock:
+            employees = self._load()
+            for employee_id, employee_data in processed_employees.items():
+                totals = employee_data['totals']
+                compensations = employee_data['compensations']
+                period = {
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'previous_pending_hours': previous_balances.get(employee_id, 0),
+                    'pending_hours': round(totals['total_pending_hours'], 2),
+                    'extra_hours_50': round(totals['total_extra_hours_50'], 2),
+                    'extra_hours_100': round(totals['total_extra_hours_100'], 2),
+                    'compensated_with_50': compensations['compensated_with_50'],
+                    'compensated_with_100': compensations['compensated_with_100'],
+                    'remaining_pending_hours': compensations['remaining_pending_hours'],
+                    'closed_at': closed_at,
+                }
+                periods = [p for p in employees.get(employee_id, [])
+                           if p['end_date'] < start_date or p['start_date'] > end_date]
+                if any(p['start_date'] > end_date for p in periods):
+                    stale += 1
+                periods.append(period)
+                periods.sort(key=lambda p: p['start_date'])
+                employees[employee_id] = periods[-self.max_periods:]
+        return stale
+
+    def save(self):
+        """Persiste el libro de forma atómica"""
+        with self._lock:
+            if self._employees is None:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': LEDGER_VERSION, 'employees': self._employees}, f,
+                              ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el libro de horas pendientes: {str(e)}")
+
+    def history(self, employee_id: str) -> List[Dict]:
+        """Períodos registrados del empleado (más antiguo primero)"""
+        with self._lock:
+            return list(self._load().get(employee_id, []))
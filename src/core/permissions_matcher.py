@@ -0,0 +1,193 @@
+"""
+Matching de permisos (Redash) contra los registros diarios de cada empleado
+Lógica sin estado para poder ejecutarse tanto en el proceso principal como en workers
+Los permisos traen el año en 'yyyy': los rangos se comparan como fechas reales
+(ordinales) y un rango cuyo fin es anterior al inicio (p.ej. 28/12 - 03/01) termina
+el año siguiente. Sólo los permisos sin año válido valen para cualquier año
+(claves mes*100+día, como venían antes).
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+# (posición, inicio, fin, anual, permiso): ordinales de fecha, o claves mes*100+día si es anual
+PermissionRule = Tuple[int, int, int, bool, Dict]
+
+
+def _month_day_key(month, day) -> Optional[int]:
+    """Clave mes*100+día de una fecha válida (29/02 incluido) o None"""
+    try:
+        month, day = int(month), int(day)
+        date(2000, month, day)  # año bisiesto: valida sin rechazar el 29/02
+        return month * 100 + day
+    except (TypeError, ValueError):
+        return None
+
+
+def _year(value) -> Optional[int]:
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        return None
+    return year if 1900 <= year <= 9999 else None
+
+
+def _ordinal(year: int, month, day) -> Optional[int]:
+    """Ordinal de la fecha o None si no existe (p.ej. 29/02 de un año no bisiesto)"""
+    try:
+        return date(year, int(month), int(day)).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def compile_permissions(permissions: List[Dict]) -> Tuple[Dict[int, Tuple[int, Dict]],
+                                                           Dict[int, Tuple[int, Dict]],
+                                                           List[PermissionRule]]:
+    """
+    Precompila los permisos de un empleado
+    Returns:
+        (días con año: ordinal -> (posición, permiso) del primero,
+         días sin año: clave mes*100+día -> (posición, permiso) del primero,
+         rangos en orden)
+    """
+    single_days: Dict[int, Tuple[int, Dict]] = {}
+    yearly_days: Dict[int, Tuple[int, Dict]] = {}
+    ranges: List[PermissionRule] = []
+    for position, permission in enumerate(permissions):
+        dd = permission.get('dd', '')
+        mm = permission.get('mm', '')
+        dia2 = permission.get('dia2', '')
+        mes2 = permission.get('mes2', '')
+        year = _year(permission.get('yyyy'))
+
+        if dd and mm and dia2 and mes2:
+            start = _month_day_key(mm, dd)
+            end = _month_day_key(mes2, dia2)
+            if start is None or end is None:
+                continue
+            if year is None:
+                ranges.append((position, start, end, True, permission))
+                continue
+            # Fin antes del inicio: el rango termina el año siguiente
+            start_ordinal = _ordinal(year, mm, dd)
+            end_ordinal = _ordinal(year + 1 if end < start else year, mes2, dia2)
+            if start_ordinal is not None and end_ordinal is not None:
+                ranges.append((position, start_ordinal, end_ordinal, False, permission))
+        elif year is not None:
+            key = _ordinal(year, mm, dd)
+            if key is not None and key not in single_days:
+                single_days[key] = (position, permission)
+        else:
+            key = _month_day_key(mm, dd)
+            if key is not None and key not in yearly_days:
+                yearly_days[key] = (position, permission)
+    return single_days, yearly_days, ranges
+
+
+class PermissionsMatcher:
+    """Indexa los permisos por empleado y los asocia a cada día procesado"""
+
+    def __init__(self, permissions_data: List[Dict]):
+        self.total_permissions = len(permissions_data)
+
+        # Índice por empleado conservando el orden original de los permisos
+        self._by_employee: Dict[str, List[Dict]] = {}
+        for permission in permissions_data:
+            employee_id = permission.get('employeeInternalId')
+            self._by_employee.setdefault(employee_id, []).append(permission)
+        self._compiled: Dict[str, Tuple] = {}
+
+    def for_employee(self, employee_id: str) -> List[Dict]:
+        """Devuelve los permisos de un empleado (lista vacía si no tiene)"""
+        return self._by_employee.get(employee_id, [])
+
+    @staticmethod
+    def format_time_range(permission_data: Dict) -> str:
+        """
+        Formatea el rango del permiso - puede ser horario (mismo día) o de días (rango)
+        """
+        try:
+            # Verificar si es rango de días
+            dd = permission_data.get('dd', '')
+            mm = permission_data.get('mm', '')
+            dia2 = permission_data.get('dia2', '')
+            mes2 = permission_data.get('mes2', '')
+            form = permission_data.get('TipoSolicitud', '')
+            hora = permission_data.get('Hora', '')
+            minutos = permission_data.get('Minutos', '')
+            incidencia = permission_data.get('incidencia', '')
+
+            # Si tiene dia2 y mes2, es un rango de días
+            if dd and mm and dia2 and mes2:
+                return f"desde {dd}/{mm} hasta {dia2}/{mes2} - {form}"
+
+            # Fallback...
+            return f"{hora}:{minutos} - {incidencia} - {form}"
+        except Exception:
+            return "pedido x permiso"
+
+    def _rules_for(self, employee_id: str) -> Tuple:
+        rules = self._compiled.get(employee_id)
+        if rules is None:
+            rules = self._compiled[employee_id] = compile_permissions(self.for_employee(employee_id))
+        return rules
+
+    def find(self, employee_id: str, date_str: str) -> Optional[Dict]:
+        """
+        Busca un permiso específico para un empleado y fecha - INCLUYE RANGOS DE DÍAS
+        Devuelve el primero (en el orden original) que cubre la fecha
+        """
+        try:
+            target_date = date.fromisoformat(date_str[:10])
+            target = target_date.toordinal()
+            target_key = target_date.month * 100 + target_date.day
+            single_days, yearly_days, ranges = self._rules_for(employee_id)
+
+            matches = [m for m in (single_days.get(target), yearly_days.get(target_key)) if m is not None]
+            match = min(matches, key=lambda m: m[0]) if matches else None
+            for position, start, end, yearly, permission in ranges:
+                if match is not None and position > match[0]:
+                    break
+                if not yearly:
+                    in_range = start <= target <= end
+                elif start <= end:
+                    in_range = start <= target_key <= end
+                else:  # Sin año: el rango cruza el fin de año
+                    in_range = target_key >= start or target_key <= end
+                if in_range:
+                    print(f"🎯 RANGO MATCH: {date_str} está en rango {permission.get('dd')}/{permission.get('mm')} - "
+                          f"{permission.get('dia2')}/{permission.get('mes2')}")
+                    return permission
+
+            if match is not None:
+                print(f"🎯 DÍA ESPECÍFICO MATCH: {date_str}")
+                return match[1]
+            return None
+        except Exception as e:
+            print(f"❌ Error buscando permiso: {str(e)}")
+            return None
+
+    def enrich(self, employee_data: Dict):
+        """
+        Enriquece los datos del empleado con información de permisos
+        """
+        employee_id = employee_data['employee_info'].get('employeeInternalId')
+        print(f"\n🔍 BÚSQUEDA DE PERMISOS para empleado: {employee_id}")
+        print(f"📊 Total de permisos disponibles: {self.total_permissions}")
+
+        permissions_found = 0
+
+        for daily_record in employee_data['daily_data']:
+            date_str = daily_record['date']  # YYYY-MM-DD
+
+            # Buscar permiso para esta fecha y empleado
+            permission = self.find(employee_id, date_str)
+
+            if permission:
+                daily_record['permission_request'] = self.format_time_range(permission)
+                permissions_found += 1
+            else:
+                daily_record['permission_request'] = ""
+                print(f"❌ Sin permiso para {employee_id} el {date_str}")
+
+        print(f"\n📊 RESUMEN: {permissions_found} permisos encontrados para {employee_id}")
@@ -0,0 +1,191 @@
+"""
+Cache de reportes completos
+Cada reporte generado se registra con dos huellas:
+- request_key: rango de fechas, empleados, salidas/archivo, configuración completa y
+  versión del código (digest de los .py de core/ y config/ más ENGINE_VERSION)
+- data_key: digest de los day summaries, permisos y saldos pendientes anteriores
+
+Siempre se descargan los datos y, si data_key no cambió, se devuelve el archivo
+existente sin recalcular ni escribir. Opcionalmente (report_cache_reuse_seconds > 0,
+apagado por defecto) el mismo pedido repetido dentro de ese plazo se devuelve sin
+tocar la API, aunque se haya corregido una fichada mientras tanto.
+En ambos casos el archivo tiene que seguir igual (tamaño y fecha de modificación);
+si el usuario lo borró o lo editó se regenera.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+from core.employee_memo import ENGINE_VERSION
+from core.employee_pool import compact_summary
+from core.models import EmployeeInfo
+
+CACHE_VERSION = 1
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Digest del código que interviene en el reporte (cambia con cualquier edición)"""
+    digest = hashlib.sha1(f"{CACHE_VERSION}|{ENGINE_VERSION}".encode('utf-8'))
+    for package in ('config', 'core'):
+        directory = os.path.join(_SRC_DIR, package)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.py', '.json')):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    digest.update(name.encode('utf-8'))
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                                     default=str).encode('utf-8')).hexdigest()
+
+
+def _file_state(path: str) -> Optional[List]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ReportCache:
+    """Manifiesto de reportes generados por huella (JSON en cache_directory, uno por tenant)"""
+
+    def __init__(self, api_key: str = None, base_url: str = None, cache_dir: str = None):
+        self.cache_dir = os.path.expanduser(cache_dir or DEFAULT_CONFIG['cache_directory'])
+        self.max_entries = DEFAULT_CONFIG['report_cache_max_entries']
+        self.reuse_seconds = DEFAULT_CONFIG['report_cache_reuse_seconds']
+
+        tenant = f"{base_url or DEFAULT_CONFIG['base_url']}|{api_key or ''}"
+        tenant_hash = hashlib.sha1(tenant.encode('utf-8')).hexdigest()[:12]
+        self.path = os.path.join(self.cache_dir, f"report_cache_{tenant_hash}.json")
+
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is not None:
+            return self._entries
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = data['entries'] if data.get('version') == CACHE_VERSION else {}
+        except FileNotFoundError:
+            self._entries = {}
+        except Exception as e:
+            print(f"⚠️ Cache de reportes inválido, se ignora: {str(e)}")
+            self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': self._entries}, f,
+                          ensure_ascii=False, separators=(',', ':'), default=str)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cache de reportes: {str(e)}")
+
+    @staticmethod
+    def request_key(start_date: str, end_date: str, user_ids: Iterable[str], options: Dict) -> str:
+        """Huella del pedido (sin descargar nada)"""
+        return _digest({
+            'start_date': start_date,
+            'end_date': end_date,
+            'user_ids': sorted(user_ids),
+            'options': options,
+            'config': DEFAULT_CONFIG,
+            'code': code_version(),
+        })
+
+    @staticmethod
+    def data_key(day_summaries: List[Dict], permissions_data: List[Dict],
+                 previous_pending: Dict[str, float], users: Iterable = (),
+                 calendar_digest: str = '') -> str:
+        """
+        Huella de los datos descargados (independiente del orden en que llegaron los lotes)
+        users: empleados del reporte (nombre, departamento, etc. van en las salidas)
+        calendar_digest: feriados locales (config/holidays y extra_holidays_directory)
+        """
+        # compact_summary no conserva employeeId: va aparte para que cuente en la huella
+        summaries = sorted(
+            ((summary.get('employeeId') or '', summary.get('referenceDate', summary.get('date')) or '',
+              compact_summary(summary)) for summary in day_summaries),
+            key=lambda item: (item[0], item[1], json.dumps(item[2], sort_keys=True, default=str))
+        )
+        return _digest({
+            'summaries': summaries,
+            'permissions': permissions_data,
+            'previous_pending': previous_pending,
+            'employees': sorted((EmployeeInfo.from_user(user).to_dict() for user in users),
+                                key=lambda employee: employee['employeeInternalId'] or ''),
+            'calendar': calendar_digest,
+        })
+
+    def _valid_entry(self, request_key: str) -> Optional[Dict]:
+        entry = self._load().get(request_key)
+        if entry is None:
+            return None
+        # El archivo tiene que ser exactamente el que se generó
+        if any(_file_state(path) != state for path, state in entry['files'].items()):
+            del self._entries[request_key]
+            return None
+        return entry
+
+    def _cached_result(self, entry: Dict) -> Dict:
+        result = copy.deepcopy(entry['result'])
+        result['cached'] = True
+        result['cache_age_seconds'] = round(time.time() - entry['created_at'])
+        return result
+
+    def recent(self, request_key: str) -> Optional[Dict]:
+        """Resultado del mismo pedido generado hace menos de report_cache_reuse_seconds (0 = nunca)"""
+        if self.reuse_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._valid_entry(request_key)
+            if entry is None or time.time() - entry['checked_at'] >= self.reuse_seconds:
+                return None
+            return self._cached_result(entry)
+
+    def matching(self, request_key: str, data_key: str) -> Optional[Dict]:
+        """Resultado del mismo pedido con exactamente los mismos datos"""
+        with self._lock:
+            entry = self._valid_entry(request_key)
+            if entry is None or entry['data_key'] != data_key:
+                return None
+            entry['checked_at'] = time.time()
+            self._save()
+            return self._cached_result(entry)
+
+    def store(self, request_key: str, data_key: str, result: Dict):
+        """Registra un reporte recién generado"""
+        paths = list(result.get('outputs', {}).values()) or [result['excel_path']]
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            entries.pop(request_key, None)
+            entries[request_key] = {
+                'data_key': data_key,
+                'created_at': now,
+                'checked_at': now,
+                'files': {path: _file_state(path) for path in paths},
+                'result': copy.deepcopy(result),
+            }
+            # Los más viejos primero (dict en orden de inserción)
+            while len(entries) > self.max_entries:
+                del entries[next(iter(entries))]
+            self._save()
@@ -0,0 +1,374 @@
+"""
+Servicio local de reportes
+Un único proceso (con caches de usuarios, permisos y memo de empleados calientes)
+atiende los pedidos de reportes de toda la oficina por una API JSON chica:
+
+    POST   /jobs                  crea un job (un reporte o {"reports": [...]})
+    GET    /jobs                  lista los jobs
+    GET    /jobs/<id>             estado y resultado
+    DELETE /jobs/<id>             cancela un job en cola
+    GET    /jobs/<id>/files/<n>   descarga el archivo principal del reporte n del job
+    GET    /jobs/<id>/files/<n>/<salida>   descarga otra salida (totals, payroll_csv...)
+    GET    /health                estado del servicio
+
+Los jobs chicos (pocos empleados x días) se atienden antes que los lotes grandes.
+"""
+
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import uuid
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITIES = {'interactive': PRIORITY_INTERACTIVE, 'batch': PRIORITY_BATCH}
+
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+MIME_TYPES = {'.xlsx': XLSX_MIME, '.csv': 'text/csv; charset=utf-8'}
+
+# Tipo esperado de cada campo opcional de un spec (los demás se ignoran)
+SPEC_TYPES = {'name': str, 'output_filename': str, 'filters': dict, 'output_format': str}
+
+
+class ReportJob:
+    """Job de reporte encolado en el servicio"""
+
+    def __init__(self, specs: List[Dict], priority: int, estimated_rows: int):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.specs = specs
+        self.priority = priority
+        self.estimated_rows = estimated_rows
+        self.status = 'queued'
+        self.progress = 0
+        self.message = ''
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.result: Optional[Dict] = None
+
+    def outputs(self, position: int) -> Dict[str, str]:
+        """Salidas descargables (archivos, no directorios) del reporte n: {salida: ruta}"""
+        reports = (self.result or {}).get('reports', [])
+        if not 0 <= position < len(reports) or not reports[position].get('success'):
+            return {}
+        report = reports[position]
+        outputs = dict(report.get('outputs') or {})
+        if not outputs and report.get('excel_path'):
+            outputs['detailed'] = report['excel_path']
+        return {name: path for name, path in outputs.items() if path and not os.path.isdir(path)}
+
+    def file_path(self, position: int, output: str = None) -> Optional[str]:
+        """Ruta de una salida del reporte n (por defecto la principal)"""
+        reports = (self.result or {}).get('reports', [])
+        if output is None:
+            path = reports[position].get('excel_path') if 0 <= position < len(reports) else None
+            return path if path in self.outputs(position).values() else None
+        return self.outputs(position).get(output)
+
+    def to_dict(self) -> Dict:
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'priority': 'interactive' if self.priority == PRIORITY_INTERACTIVE else 'batch',
+            'estimated_rows': self.estimated_rows,
+            'progress': self.progress,
+            'message': self.message,
+            'reports': len(self.specs),
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if self.result is not None:
+            result = dict(self.result)
+            result['reports'] = [
+                dict({key: value for key, value in report.items() if key not in ('excel_path', 'outputs')},
+                     file=f"/jobs/{self.job_id}/files/{position}" if self.file_path(position) else None,
+                     files={name: f"/jobs/{self.job_id}/files/{position}/{name}"
+                            for name in self.outputs(position)})
+                for position, report in enumerate(self.result.get('reports', []))
+            ]
+            data['result'] = result
+        return data
+
+
+class ReportJobQueue:
+    """Cola de prioridad de jobs atendida por un pool de threads sobre un procesador compartido"""
+
+    def __init__(self, processor, workers: int = None, output_dir: str = None):
+        self.processor = processor
+        self.workers = workers or DEFAULT_CONFIG['service_workers']
+        self.output_dir = os.path.expanduser(output_dir or DEFAULT_CONFIG['service_output_directory'])
+        self.jobs: Dict[str, ReportJob] = {}
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"report-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Termina los workers después del job en curso"""
+        for _ in self._threads:
+            self._queue.put((float('inf'), next(self._sequence), None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, payload: Dict) -> ReportJob:
+        """
+        Encola un job. payload: un spec de reporte o {'reports': [specs]};
+        'priority' ('interactive'/'batch') opcional, si no se estima por tamaño
+        Raises:
+            ValueError si el pedido es inválido
+        """
+        specs = payload.get('reports') or [payload]
+        if not isinstance(specs, list):
+            raise ValueError("'reports' debe ser una lista")
+        for spec in specs:
+            if not isinstance(spec, dict):
+                raise ValueError("Cada reporte debe ser un objeto JSON")
+            if not spec.get('start_date') or not spec.get('end_date'):
+                raise ValueError("Cada reporte necesita start_date y end_date")
+            self._check_types(spec)
+            validation = self.processor.validate_date_range(spec['start_date'], spec['end_date'])
+            if not validation['is_valid']:
+                raise ValueError('; '.join(validation['errors']))
+            # El servicio decide dónde se guardan los archivos
+            spec.pop('output_filename', None)
+
+        estimated_rows = self.estimate_rows(specs)
+        priority = payload.get('priority')
+        if priority is not None and not isinstance(priority, str):
+            raise ValueError("'priority' debe ser un texto")
+        if priority is None:
+            priority = ('interactive' if estimated_rows <= DEFAULT_CONFIG['service_interactive_max_rows']
+                        else 'batch')
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridad inválida: {priority}")
+
+        job = ReportJob(specs, PRIORITIES[priority], estimated_rows)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        self._queue.put((job.priority, next(self._sequence), job.job_id))
+        print(f"📥 Job {job.job_id} encolado ({priority}, ~{estimated_rows} filas, {len(specs)} reportes)")
+        return job
+
+    @staticmethod
+    def _check_types(spec: Dict):
+        """Tipos de los campos de un spec (un JSON válido con tipos erróneos es un 400, no un 500)"""
+        for key in ('start_date', 'end_date'):
+            if not isinstance(spec[key], str):
+                raise ValueError(f"'{key}' debe ser un texto AAAA-MM-DD")
+        for key, expected in SPEC_TYPES.items():
+            if spec.get(key) is not None and not isinstance(spec[key], expected):
+                raise ValueError(f"'{key}' debe ser {'un objeto' if expected is dict else 'un texto'}")
+        for key in ('user_ids', 'outputs'):
+            values = spec.get(key)
+            if values is not None and (not isinstance(values, list)
+                                       or not all(isinstance(value, str) for value in values)):
+                raise ValueError(f"'{key}' debe ser una lista de textos")
+
+    def estimate_rows(self, specs: List[Dict]) -> int:
+        """Tamaño estimado del job: empleados x días de cada reporte"""
+        total = 0
+        for spec in specs:
+            if spec.get('filters'):
+                employees = len(self.processor.select_user_ids(spec['filters']))
+            elif spec.get('user_ids'):
+                employees = len(spec['user_ids'])
+            else:
+                employees = len(self.processor.select_user_ids())
+            days = (date.fromisoformat(spec['end_date']) - date.fromisoformat(spec['start_date'])).days + 1
+            total += employees * days
+        return total
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[ReportJob]:
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela un job que todavía no empezó"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != 'queued':
+                return False
+            job.status = 'cancelled'
+            job.finished_at = datetime.now()
+            return True
+
+    def counts(self) -> Dict[str, int]:
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0, 'cancelled': 0}
+        with self._lock:
+            for job in self.jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def _worker(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.status != 'queued':
+                    continue
+                job.status = 'running'
+                job.started_at = datetime.now()
+            self._run(job)
+
+    def _progress_for(self, job: ReportJob) -> Callable:
+        def progress_callback(value: int, message: str):
+            job.progress = value
+            job.message = message
+        return progress_callback
+
+    def _run(self, job: ReportJob):
+        print(f"⚙️ Ejecutando job {job.job_id}")
+        try:
+            result = self.processor.process_attendance_reports_batch(
+                job.specs, progress_callback=self._progress_for(job),
+                output_dir=os.path.join(self.output_dir, job.job_id)
+            )
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'stage': 'processing'}
+
+        job.result = result
+        job.status = 'done' if result.get('success') else 'failed'
+        job.finished_at = datetime.now()
+        print(f"{'✅' if job.status == 'done' else '❌'} Job {job.job_id}: {job.status}")
+
+
+class ReportServiceHandler(BaseHTTPRequestHandler):
+    """Rutas HTTP del servicio (la cola está en self.server.job_queue)"""
+
+    server_version = "GeneradorReportes/1.0"
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} - {format % args}")
+
+    @property
+    def job_queue(self) -> ReportJobQueue:
+        return self.server.job_queue
+
+    def _send_json(self, status: int, data: Dict):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {'success': False, 'error': message})
+
+    def _send_file(self, path: str):
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            self._send_error(404, 'Archivo no encontrado')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', MIME_TYPES.get(os.path.splitext(path)[1].lower(),
+                                                        'application/octet-stream'))
+        self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(path)}"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path_parts(self) -> List[str]:
+        return [part for part in self.path.split('?')[0].split('/') if part]
+
+    def do_GET(self):
+        parts = self._path_parts()
+        if parts == ['health']:
+            self._send_json(200, {'status': 'ok', 'jobs': self.job_queue.counts()})
+        elif parts == ['jobs']:
+            self._send_json(200, {'jobs': [job.to_dict() for job in self.job_queue.list()]})
+        elif len(parts) >= 2 and parts[0] == 'jobs':
+            job = self.job_queue.get(parts[1])
+            if job is None:
+                self._send_error(404, 'Job inexistente')
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            elif len(parts) in (4, 5) and parts[2] == 'files' and re.fullmatch(r'\d+', parts[3]):
+                path = job.file_path(int(parts[3]), parts[4] if len(parts) == 5 else None)
+                if path is None:
+                    self._send_error(404, 'Archivo no disponible')
+                else:
+                    self._send_file(path)
+            else:
+                self._send_error(404, 'Ruta inexistente')
+        else:
+            self._send_error(404, 'Ruta inexistente')
+
+    def do_POST(self):
+        if self._path_parts() != ['jobs']:
+            self._send_error(404, 'Ruta inexistente')
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(payload, dict):
+                raise ValueError('Se esperaba un objeto JSON')
+            job = self.job_queue.submit(payload)
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        self._send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._send_error(404, 'Ruta inexistente')
+        elif self.job_queue.get(parts[1]) is None:
+            self._send_error(404, 'Job inexistente')
+        elif self.job_queue.cancel(parts[1]):
+            self._send_json(200, self.job_queue.get(parts[1]).to_dict())
+        else:
+            self._send_error(409, 'El job ya empezó o terminó')
+
+
+def create_server(processor, host: str = None, port: int = None, workers: int = None,
+                  output_dir: str = None) -> ThreadingHTTPServer:
+    """Crea el servidor HTTP y arranca los workers de la cola"""
+    # Caches compartidos entre pedidos
+    processor._permissions_cache_duration = DEFAULT_CONFIG['service_permissions_cache_seconds']
+
+    job_queue = ReportJobQueue(processor, workers, output_dir)
+    server = ThreadingHTTPServer((host or DEFAULT_CONFIG['service_host'],
+                                  port or DEFAULT_CONFIG['service_port']), ReportServiceHandler)
+    server.daemon_threads = True
+    server.job_queue = job_queue
+    job_queue.start()
+    return server
+
+
+def serve(processor, host: str = None, port: int = None, workers: int = None) -> Dict:
+    """Atiende pedidos hasta Ctrl+C"""
+    server = create_server(processor, host, port, workers)
+    address, bound_port = server.server_address[:2]
+    print(f"🚀 Servicio de reportes en http://{address}:{bound_port} ({server.job_queue.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Deteniendo servicio...")
+    finally:
+        server.server_close()
+        server.job_queue.stop()
+    return {'success': True, 'jobs': server.job_queue.counts()}
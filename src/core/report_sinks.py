@@ -0,0 +1,361 @@
+"""
+Salidas del reporte (sinks)
+Una sola descarga y un solo cálculo reparten cada empleado procesado a varias salidas:
+el Excel detallado, un Excel de totales por empleado y un CSV plano para el sistema
+de liquidación de sueldos. SinkFanOut corre cada salida en su propio thread con una
+cola acotada, así las salidas independientes se escriben en paralelo.
+
+La salida detallada además puede escribirse como xlsxwriter, CSV o Parquet (output_format).
+
+Para agregar una salida: subclase de ReportSink registrada en SINKS.
+"""
+
+import csv
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+from config.default_config import DEFAULT_CONFIG
+from core.excel_generator import MAX_PAIRS, DetailedSheetWriter, SpillingSheetWriter
+from core.row_writers import CsvRowWriter, ParquetRowWriter
+
+# Filas en memoria de la salida detallada hasta conocer el ancho de pares y la cantidad de empleados
+WRITE_ONLY_ROWS_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Formatos de la salida detallada (output_format) y su extensión; parquet es un directorio
+OUTPUT_FORMATS = {'xlsx': '.xlsx', 'xlsxwriter': '.xlsx', 'csv': '.csv', 'parquet': '.parquet'}
+ROW_WRITERS = {'csv': CsvRowWriter, 'parquet': ParquetRowWriter}
+
+
+class ReportSink:
+    """
+    Una salida del reporte: recibe los empleados en orden y al cerrar devuelve la ruta
+    suffix/extension arman el nombre a partir del reporte detallado
+    (reporte_20250101_20250131_totales.xlsx)
+    """
+    name = ''
+    suffix = ''
+    extension = ''
+
+    def __init__(self, generator, start_date: str, end_date: str, output_filename: str = None, **options):
+        self.generator = generator
+        self.start_date = start_date
+        self.end_date = end_date
+        self.output_filename = output_filename
+        self.employee_count = 0
+
+    def filename(self) -> str:
+        """Nombre del archivo de esta salida derivado del nombre del detallado"""
+        base = self.output_filename or self.generator.default_filename(self.start_date, self.end_date)
+        root = os.path.splitext(base)[0]
+        if root.endswith('_detallado'):
+            root = root[:-len('_detallado')]
+        return f"{root}_{self.suffix}{self.extension}"
+
+    def add_employee(self, employee_data: Dict):
+        raise NotImplementedError
+
+    def close(self, used_pairs: int = None) -> str:
+        raise NotImplementedError
+
+    def discard(self):
+        """Descarta la salida sin guardar (el reporte falló)"""
+
+
+class DetailedReportSink(ReportSink):
+    """
+    Hoja "Fichadas Detalladas" (ExcelReportGeneratorDetailed) en el formato output_format:
+    "xlsx" (openpyxl, según excel_backend), "xlsxwriter", "csv" o "parquet" (ver core.row_writers)
+    Todos con las mismas filas y el mismo ancho de pares (los usados en el reporte)
+    """
+    name = 'detailed'
+
+    def __init__(self, generator, start_date: str, end_date: str, output_filename: str = None,
+                 max_pairs: int = None, memory_budget_mb: float = 0, output_format: str = None, **options):
+        super().__init__(generator, start_date, end_date, output_filename)
+        self.output_format = output_format or DEFAULT_CONFIG['output_format']
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato desconocido: {self.output_format} "
+                             f"(opciones: {', '.join(OUTPUT_FORMATS)})")
+        self.extension = OUTPUT_FORMATS[self.output_format]
+        
+        # La mitad del presupuesto para filas; el resto para lotes en vuelo (API, cálculo, cola)
+        rows_budget = int(memory_budget_mb * 1024 * 1024 / 2) if memory_budget_mb else WRITE_ONLY_ROWS_BUDGET_BYTES
+        if self.output_format in ROW_WRITERS:
+            # Se arman con los MAX_PAIRS pares y se recortan al cerrar, como el Excel
+            self.max_pairs = MAX_PAIRS
+            self.writer = ROW_WRITERS[self.output_format](generator, start_date, end_date, rows_budget,
+                                                          self.filename())
+            return
+        
+        # Sin ancho conocido se escribe con el máximo y se recorta al cerrar
+        self.max_pairs = max_pairs or MAX_PAIRS
+        backend = 'xlsxwriter' if self.output_format == 'xlsxwriter' else DEFAULT_CONFIG['excel_backend']
+        if memory_budget_mb:
+            self.writer = SpillingSheetWriter(generator, start_date, end_date, rows_budget, self.max_pairs,
+                                              'xlsxwriter' if backend == 'xlsxwriter' else 'write_only')
+        elif backend == 'standard':
+            self.writer = DetailedSheetWriter(generator, start_date, end_date, self.max_pairs)
+        else:
+            # Write-only y xlsxwriter necesitan el ancho de pares y la cantidad de empleados
+            # antes de la primera fila: las filas esperan al cierre
+            self.writer = SpillingSheetWriter(generator, start_date, end_date,
+                                              WRITE_ONLY_ROWS_BUDGET_BYTES, self.max_pairs, backend)
+
+    def filename(self) -> str:
+        base = self.output_filename or self.generator.default_filename(self.start_date, self.end_date)
+        if self.extension == '.xlsx':
+            return base
+        return f"{os.path.splitext(base)[0]}{self.extension}"
+
+    def add_employee(self, employee_data: Dict):
+        self.writer.add_employee(self.generator.build_employee_rows(employee_data, self.max_pairs))
+        self.employee_count += 1
+
+    def close(self, used_pairs: int = None) -> str:
+        if self.output_format in ROW_WRITERS:
+            return self.writer.close(used_pairs)
+        return self.writer.close(self.output_filename, used_pairs=used_pairs)
+
+    def discard(self):
+        self.writer.discard()
+
+
+def _hours(value) -> float:
+    return round(value or 0, 2)
+
+
+def employee_totals_row(employee_data: Dict) -> Dict:
+    """Totales de un empleado con los nombres de columna de las salidas de liquidación"""
+    info = employee_data['employee_info']
+    totals = employee_data['totals']
+    compensations = employee_data['compensations']
+    return {
+        'employee_id': info.get('employeeInternalId', ''),
+        'first_name': info.get('firstName', ''),
+        'last_name': info.get('lastName', ''),
+        'department': info.get('department') or '',
+        'location': info.get('location') or '',
+        'job_title': info.get('jobTitle') or '',
+        'days_worked': totals['total_days_worked'],
+        'absence_days': totals.get('total_absence_days', 0),
+        'hours_worked': _hours(totals['total_hours_worked']),
+        'regular_hours': _hours(totals['total_regular_hours']),
+        'extra_hours_50': _hours(totals['total_extra_hours_50']),
+        'extra_hours_100': _hours(totals['total_extra_hours_100']),
+        'night_hours': _hours(totals['total_night_hours']),
+        'pending_hours': _hours(totals['total_pending_hours']),
+        'compensated_with_50': compensations['compensated_with_50'],
+        'compensated_with_100': compensations['compensated_with_100'],
+        'net_extra_hours_50': compensations['net_extra_hours_50'],
+        'net_extra_hours_100': compensations['net_extra_hours_100'],
+        'remaining_pending_hours': compensations['remaining_pending_hours'],
+    }
+
+
+class EmployeeTotalsSink(ReportSink):
+    """Excel con una fila de totales y compensaciones por empleado (workbook write-only)"""
+    name = 'totals'
+    suffix = 'totales'
+    extension = '.xlsx'
+
+    COLUMNS = [
+        ('employee_id', 'ID Empleado', 14), ('first_name', 'Nombre', 16), ('last_name', 'Apellido', 16),
+        ('department', 'Departamento', 18), ('location', 'Ubicación', 16), ('job_title', 'Puesto', 18),
+        ('days_worked', 'Días Trabajados', 12), ('absence_days', 'Días de Ausencia', 12),
+        ('hours_worked', 'Horas Trabajadas', 12), ('regular_hours', 'Horas Regulares', 12),
+        ('extra_hours_50', 'Horas Extra 50%', 12), ('extra_hours_100', 'Horas Extra 100%', 12),
+        ('night_hours', 'Horas Nocturnas', 12), ('pending_hours', 'Horas Pendientes', 12),
+        ('compensated_with_50', 'Compensadas con 50%', 14), ('compensated_with_100', 'Compensadas con 100%', 14),
+        ('net_extra_hours_50', 'Extra 50% a Pagar', 12), ('net_extra_hours_100', 'Extra 100% a Pagar', 12),
+        ('remaining_pending_hours', 'Pendientes sin Compensar', 14),
+    ]
+
+    def __init__(self, generator, start_date: str, end_date: str, output_filename: str = None, **options):
+        super().__init__(generator, start_date, end_date, output_filename)
+        self.wb = Workbook(write_only=True)
+        self.ws = ws = self.wb.create_sheet("Totales por Empleado")
+        for col, (_, _, width) in enumerate(self.COLUMNS, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+        title = WriteOnlyCell(ws, value=f"Totales por Empleado - {start_date} a {end_date}")
+        title.font = generator.title_font
+        ws.append([title])
+        ws.append([f"Fecha generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
+        ws.append([])
+        headers = []
+        for _, header, _ in self.COLUMNS:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = generator.header_font
+            cell.fill = generator.header_fill
+            cell.border = generator.thin_border
+            cell.alignment = generator.center_alignment
+            headers.append(cell)
+        ws.append(headers)
+
+    def add_employee(self, employee_data: Dict):
+        row = employee_totals_row(employee_data)
+        cells = []
+        for key, _, _ in self.COLUMNS:
+            cell = WriteOnlyCell(self.ws, value=row[key])
+            cell.border = self.generator.thin_border
+            cells.append(cell)
+        self.ws.append(cells)
+        self.employee_count += 1
+
+    def close(self, used_pairs: int = None) -> str:
+        filepath = self.generator.output_path(self.filename(), self.start_date, self.end_date)
+        self.wb.save(filepath)
+        return filepath
+
+    def discard(self):
+        # Cierra la hoja write-only para que openpyxl libere su archivo temporal
+        self.ws.close()
+
+
+class PayrollCsvSink(ReportSink):
+    """CSV plano para el sistema de liquidación: una fila por empleado, extras netas de compensación"""
+    name = 'payroll_csv'
+    suffix = 'liquidacion'
+    extension = '.csv'
+
+    COLUMNS = [
+        ('employee_id', 'legajo'), ('last_name', 'apellido'), ('first_name', 'nombre'),
+        ('department', 'departamento'), ('days_worked', 'dias_trabajados'), ('absence_days', 'dias_ausencia'),
+        ('regular_hours', 'horas_regulares'), ('net_extra_hours_50', 'horas_extra_50'),
+        ('net_extra_hours_100', 'horas_extra_100'), ('night_hours', 'horas_nocturnas'),
+        ('remaining_pending_hours', 'horas_pendientes'),
+    ]
+
+    def __init__(self, generator, start_date: str, end_date: str, output_filename: str = None, **options):
+        super().__init__(generator, start_date, end_date, output_filename)
+        self.decimal = DEFAULT_CONFIG['payroll_csv_decimal']
+        # Se escribe a un temporal y se renombra al cerrar (nunca queda un CSV a medias)
+        self.path = generator.output_path(self.filename(), start_date, end_date)
+        self._file = open(f"{self.path}.tmp", 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file, delimiter=DEFAULT_CONFIG['payroll_csv_delimiter'])
+        self._writer.writerow(['periodo_desde', 'periodo_hasta'] + [header for _, header in self.COLUMNS])
+
+    def _format(self, value):
+        if isinstance(value, float):
+            return f"{value:.2f}".replace('.', self.decimal)
+        return value
+
+    def add_employee(self, employee_data: Dict):
+        row = employee_totals_row(employee_data)
+        self._writer.writerow([self.start_date, self.end_date] +
+                              [self._format(row[key]) for key, _ in self.COLUMNS])
+        self.employee_count += 1
+
+    def close(self, used_pairs: int = None) -> str:
+        self._file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        return self.path
+
+    def discard(self):
+        self._file.close()
+        os.remove(f"{self.path}.tmp")
+
+
+SINKS = {sink.name: sink for sink in (DetailedReportSink, EmployeeTotalsSink, PayrollCsvSink)}
+
+
+def build_sinks(names: List[str], generator, start_date: str, end_date: str,
+                output_filename: str = None, **options) -> List[ReportSink]:
+    """Instancia las salidas pedidas (options: max_pairs, memory_budget_mb, output_format)"""
+    unknown = [name for name in names if name not in SINKS]
+    if unknown:
+        raise ValueError(f"Salidas desconocidas: {', '.join(unknown)} (opciones: {', '.join(SINKS)})")
+    return [SINKS[name](generator, start_date, end_date, output_filename, **options)
+            for name in dict.fromkeys(names)]
+
+
+_END = object()
+
+
+class SinkFanOut:
+    """
+    Reparte cada empleado a todas las salidas; cada una consume su cola en un thread
+    propio y se cierra (guarda el archivo) en ese mismo thread. Al terminar, las
+    salidas se guardan sólo si ninguna falló: un reporte nunca queda a medias.
+    """
+
+    def __init__(self, sinks: List[ReportSink], queue_size: int = None):
+        self.sinks = sinks
+        self.error: Optional[Exception] = None
+        self._used_pairs = None
+        self._commit = False
+        self._decided = threading.Event()
+        self._paths: Dict[str, str] = {}
+        self._queues = [queue.Queue(maxsize=queue_size or DEFAULT_CONFIG['stream_queue_size']) for _ in sinks]
+        self._consumed = [threading.Event() for _ in sinks]
+        self._threads = [
+            threading.Thread(target=self._run, args=(sink, sink_queue, consumed),
+                             name=f"report-sink-{sink.name}", daemon=True)
+            for sink, sink_queue, consumed in zip(sinks, self._queues, self._consumed)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _fail(self, sink: ReportSink, error: Exception):
+        print(f"❌ Error en la salida {sink.name}: {str(error)}")
+        self.error = self.error or error
+
+    def _run(self, sink: ReportSink, sink_queue: queue.Queue, consumed: threading.Event):
+        failed = False
+        item = sink_queue.get()
+        while item is not _END:
+            if not failed:
+                try:
+                    sink.add_employee(item)
+                except Exception as e:
+                    # Se sigue vaciando la cola para no bloquear al productor
+                    failed = True
+                    self._fail(sink, e)
+            item = sink_queue.get()
+        
+        consumed.set()
+        self._decided.wait()
+        try:
+            if self._commit:
+                self._paths[sink.name] = sink.close(self._used_pairs)
+            else:
+                sink.discard()
+        except Exception as e:
+            self._fail(sink, e)
+
+    def add_employee(self, employee_data: Dict):
+        for sink_queue in self._queues:
+            sink_queue.put(employee_data)
+
+    def _finish(self, commit: bool):
+        for sink_queue in self._queues:
+            sink_queue.put(_END)
+        for consumed in self._consumed:
+            consumed.wait()
+        self._commit = commit and self.error is None
+        self._decided.set()
+        for thread in self._threads:
+            thread.join()
+
+    def close(self, used_pairs: int = None) -> Dict[str, str]:
+        """
+        Guarda todas las salidas en paralelo
+        Returns:
+            {nombre de salida: ruta} en el orden en que se pidieron
+        """
+        self._used_pairs = used_pairs
+        self._finish(True)
+        if self.error:
+            raise self.error
+        return {sink.name: self._paths[sink.name] for sink in self.sinks}
+
+    def abort(self):
+        """Termina los threads sin guardar archivos"""
+        self._finish(False)
@@ -0,0 +1,146 @@
+"""
+Estadísticas del reporte calculadas de forma incremental
+Se alimentan empleado por empleado durante el procesamiento, así el modo normal,
+el streaming y el procesamiento por shards obtienen los totales sin re-recorrer los datos
+"""
+
+from typing import Dict
+
+from core.excel_generator import MAX_PAIRS
+
+NO_DEPARTMENT = 'Sin departamento'
+
+
+class ReportStatsAccumulator:
+    """Acumula totales, conteos de fichadas, ancho máximo de pares y rollups por departamento/día"""
+
+    def __init__(self):
+        self.total_employees = 0
+        self.total_hours_worked = 0
+        self.total_regular_hours = 0
+        self.total_extra_hours_50 = 0
+        self.total_extra_hours_100 = 0
+        self.total_night_hours = 0
+        self.total_pending_hours = 0
+        self.total_entries_processed = 0
+        self.employees_with_multiple_entries = 0
+        self.widest_pairs = 0
+        self.by_department: Dict[str, Dict] = {}
+        self.by_day: Dict[str, Dict] = {}
+
+    @property
+    def max_pairs(self) -> int:
+        """Pares entrada/salida a mostrar en el Excel (mínimo 1, máximo 4)"""
+        return min(max(self.widest_pairs, 1), MAX_PAIRS)
+
+    def add_employee(self, employee_data: Dict):
+        """Suma un empleado procesado (salida de process_employee_data)"""
+        totals = employee_data['totals']
+        remaining_pending = employee_data['compensations']['remaining_pending_hours']
+
+        self.total_employees += 1
+        self.total_hours_worked += totals['total_hours_worked']
+        self.total_regular_hours += totals['total_regular_hours']
+        self.total_extra_hours_50 += totals['total_extra_hours_50']
+        self.total_extra_hours_100 += totals['total_extra_hours_100']
+        self.total_night_hours += totals['total_night_hours']
+        self.total_pending_hours += remaining_pending
+
+        department = employee_data['employee_info'].get('department') or NO_DEPARTMENT
+        dept = self.by_department.get(department)
+        if dept is None:
+            dept = self.by_department[department] = {
+                'employees': 0, 'hours_worked': 0, 'regular_hours': 0,
+                'extra_hours_50': 0, 'extra_hours_100': 0, 'pending_hours': 0,
+                'absence_days': 0
+            }
+        dept['employees'] += 1
+        dept['hours_worked'] += totals['total_hours_worked']
+        dept['regular_hours'] += totals['total_regular_hours']
+        dept['extra_hours_50'] += totals['total_extra_hours_50']
+        dept['extra_hours_100'] += totals['total_extra_hours_100']
+        dept['pending_hours'] += remaining_pending
+        dept['absence_days'] += totals.get('total_absence_days', 0)
+
+        for daily_record in employee_data['daily_data']:
+            entries = daily_record.get('raw_entries', [])
+            entries_count = len(entries)
+            self.total_entries_processed += entries_count
+
+            if entries_count > 2:  # Más de una entrada y una salida
+                self.employees_with_multiple_entries += 1
+
+            if entries_count and self.widest_pairs < MAX_PAIRS:
+                self.widest_pairs = max(self.widest_pairs, min(len(daily_record['entry_pairs']), MAX_PAIRS))
+
+            day = self.by_day.get(daily_record['date'])
+            if day is None:
+                day = self.by_day[daily_record['date']] = {
+                    'employees': 0, 'hours_worked': 0, 'extra_hours_50': 0,
+                    'extra_hours_100': 0, 'absences': 0, 'late': 0
+                }
+            day['employees'] += 1
+            day['hours_worked'] += daily_record['hours_worked']
+            day['extra_hours_50'] += daily_record['extra_hours_50']
+            day['extra_hours_100'] += daily_record['extra_hours_100']
+            if daily_record.get('has_absence'):
+                day['absences'] += 1
+            if 'LATE' in (daily_record.get('incidences') or []):
+                day['late'] += 1
+
+    def merge(self, other: 'ReportStatsAccumulator'):
+        """Incorpora los acumulados de otro shard"""
+        for name in ('total_employees', 'total_hours_worked', 'total_regular_hours',
+                     'total_extra_hours_50', 'total_extra_hours_100', 'total_night_hours',
+                     'total_pending_hours', 'total_entries_processed',
+                     'employees_with_multiple_entries'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.widest_pairs = max(self.widest_pairs, other.widest_pairs)
+
+        for target, source in ((self.by_department, other.by_department),
+                               (self.by_day, other.by_day)):
+            for key, values in source.items():
+                if key not in target:
+                    target[key] = dict(values)
+                else:
+                    for field, value in values.items():
+                        target[key][field] += value
+
+    def state(self) -> Dict:
+        """Acumulados sin redondear, serializables a JSON (inversa: from_state)"""
+        state = dict(vars(self))
+        state['by_department'] = {key: dict(values) for key, values in self.by_department.items()}
+        state['by_day'] = {key: dict(values) for key, values in self.by_day.items()}
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'ReportStatsAccumulator':
+        accumulator = cls()
+        for name, value in state.items():
+            if hasattr(accumulator, name):
+                setattr(accumulator, name, value)
+        return accumulator
+
+    def to_dict(self) -> Dict:
+        """Estadísticas finales del reporte (totales, promedios, max_pairs y rollups)"""
+        total_employees = self.total_employees
+        return {
+            'total_employees': total_employees,
+            'total_hours_worked': round(self.total_hours_worked, 2),
+            'total_regular_hours': round(self.total_regular_hours, 2),
+            'total_extra_hours_50': round(self.total_extra_hours_50, 2),
+            'total_extra_hours_100': round(self.total_extra_hours_100, 2),
+            'total_night_hours': round(self.total_night_hours, 2),
+            'total_pending_hours': round(self.total_pending_hours, 2),
+            'avg_hours_per_employee': round(self.total_hours_worked / total_employees, 2) if total_employees > 0 else 0,
+            'total_entries_processed': self.total_entries_processed,
+            'employees_with_multiple_entries': self.employees_with_multiple_entries,
+            'max_pairs': self.max_pairs,
+            'by_department': {key: _rounded(values) for key, values in sorted(self.by_department.items())},
+            'by_day': {key: _rounded(values) for key, values in sorted(self.by_day.items())},
+        }
+
+
+def _rounded(values: Dict) -> Dict:
+    return {field: round(value, 2) if isinstance(value, float) else value
+            for field, value in values.items()}
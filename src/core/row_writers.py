@@ -0,0 +1,138 @@
+"""
+Salidas planas de la hoja detallada para sistemas (liquidación, BI): sin estilos
+Mismo esquema de filas que el Excel detallado (build_headers / build_employee_rows) y el
+mismo ancho de pares: las filas llegan con los MAX_PAIRS pares, esperan en un SpillBuffer
+(memoria acotada, el excedente comprimido a disco) y al cerrar se escriben sólo con los
+pares usados, igual que el Excel.
+- CsvRowWriter: un CSV
+- ParquetRowWriter: dataset Parquet particionado por mes (month=AAAA-MM/part-00000.parquet),
+  columnas de texto; requiere pyarrow (dependencia opcional, se importa sólo si se usa)
+
+Los dos escriben a un temporal (.tmp) que se renombra al cerrar: nunca queda una salida a medias.
+"""
+
+import contextlib
+import csv
+import os
+import shutil
+from typing import Dict, Iterator, List
+
+from config.default_config import DEFAULT_CONFIG
+from core.excel_generator import COL_FECHA, MAX_PAIRS, trim_pair_columns
+from core.spill_buffer import SpillBuffer
+
+# Filas por row group de cada mes (lo que se acumula en memoria antes de escribir)
+PARQUET_ROW_GROUP_ROWS = 10000
+
+
+class BufferedRowWriter:
+    """Base: junta las filas de cada empleado hasta conocer el ancho de pares definitivo"""
+
+    def __init__(self, generator, start_date: str, end_date: str, budget_bytes: int,
+                 output_filename: str = None):
+        self.generator = generator
+        self.path = generator.output_path(output_filename, start_date, end_date)
+        self.buffer = SpillBuffer(budget_bytes)
+
+    def add_employee(self, rows: List[List]):
+        """Agrega las filas de un empleado (con MAX_PAIRS pares)"""
+        self.buffer.append(rows)
+
+    def _rows(self, used_pairs: int) -> Iterator[List]:
+        for rows in self.buffer:
+            for values in rows:
+                yield trim_pair_columns(values, MAX_PAIRS, used_pairs)
+
+    def close(self, used_pairs: int = None) -> str:
+        """Escribe las filas con used_pairs pares (por defecto MAX_PAIRS) y devuelve la ruta"""
+        used_pairs = MAX_PAIRS if used_pairs is None else min(max(used_pairs, 1), MAX_PAIRS)
+        try:
+            self._write(self.generator.build_headers(used_pairs), self._rows(used_pairs))
+        finally:
+            self.buffer.close()
+        return self.path
+
+    def _write(self, headers: List[str], rows: Iterator[List]):
+        raise NotImplementedError
+
+    def discard(self):
+        self.buffer.close()
+
+
+class CsvRowWriter(BufferedRowWriter):
+    """Filas de la hoja detallada en un CSV (delimitador detailed_csv_delimiter)"""
+
+    def _write(self, headers: List[str], rows: Iterator[List]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, delimiter=DEFAULT_CONFIG['detailed_csv_delimiter'])
+                writer.writerow(headers)
+                writer.writerows(rows)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, self.path)
+
+
+class ParquetRowWriter(BufferedRowWriter):
+    """Filas de la hoja detallada en un dataset Parquet con una partición por mes de la fecha"""
+
+    def __init__(self, generator, start_date: str, end_date: str, budget_bytes: int,
+                 output_filename: str = None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("El formato parquet requiere pyarrow (pip install pyarrow)") from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        super().__init__(generator, start_date, end_date, budget_bytes, output_filename)
+        self._tmp_dir = f"{self.path}.tmp"
+
+    def _write(self, headers: List[str], rows: Iterator[List]):
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)  # restos de una corrida que falló
+        os.makedirs(self._tmp_dir)
+        schema = self._pa.schema([self._pa.field(header, self._pa.string()) for header in headers])
+        pending: Dict[str, List[List]] = {}
+        writers = {}
+        try:
+            for values in rows:
+                month = (values[COL_FECHA - 1] or '')[:7] or 'sin_fecha'
+                month_rows = pending.setdefault(month, [])
+                month_rows.append(values)
+                if len(month_rows) >= PARQUET_ROW_GROUP_ROWS:
+                    self._flush(schema, writers, month, pending.pop(month))
+            for month in sorted(pending):
+                self._flush(schema, writers, month, pending[month])
+            for writer in writers.values():
+                writer.close()
+        except BaseException:
+            for writer in writers.values():
+                with contextlib.suppress(Exception):
+                    writer.close()
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            raise
+
+        # El dataset anterior con el mismo nombre se reemplaza entero
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        os.replace(self._tmp_dir, self.path)
+
+    def _flush(self, schema, writers: Dict, month: str, rows: List[List]):
+        """Escribe las filas acumuladas del mes como un row group"""
+        writer = writers.get(month)
+        if writer is None:
+            directory = os.path.join(self._tmp_dir, f"month={month}")
+            os.makedirs(directory)
+            writer = writers[month] = self._pq.ParquetWriter(
+                os.path.join(directory, 'part-00000.parquet'), schema)
+        columns = [
+            self._pa.array([value if value is None or isinstance(value, str) else str(value) for value in column],
+                           self._pa.string())
+            for column in zip(*rows)
+        ]
+        writer.write_table(self._pa.Table.from_arrays(columns, schema=schema))
@@ -0,0 +1,95 @@
+"""
+Buffer de filas con presupuesto de memoria
+Las filas de cada empleado se guardan serializadas (pickle) en memoria; cuando el
+buffer supera su presupuesto se comprime (zlib) y se baja a disco como un segmento.
+Al leer se recorren los segmentos en el orden en que se escribieron y después lo que
+quedó en memoria, así que el orden de los empleados se conserva.
+"""
+
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+from typing import Any, Iterator, List
+
+from config.default_config import DEFAULT_CONFIG
+
+_LENGTH = struct.Struct('<I')
+
+
+class SpillBuffer:
+    """Secuencia de items (filas de un empleado) acotada en memoria"""
+
+    def __init__(self, budget_bytes: int, directory: str = None):
+        self.budget_bytes = max(int(budget_bytes), 1)
+        self.directory = os.path.expanduser(directory or DEFAULT_CONFIG['spill_directory'] or tempfile.gettempdir())
+        self.count = 0
+        self.spilled_segments = 0
+        self.spilled_bytes = 0
+
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._file = None
+
+    def append(self, item: Any):
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        self.count += 1
+        if self._pending_bytes >= self.budget_bytes:
+            self._spill()
+
+    def _spill(self):
+        """Comprime lo pendiente y lo agrega como segmento al archivo temporal"""
+        if not self._pending:
+            return
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # Se borra solo al cerrarse (también si el proceso termina con error)
+            self._file = tempfile.TemporaryFile(prefix='spill_', dir=self.directory)
+        segment = zlib.compress(b''.join(_LENGTH.pack(len(data)) + data for data in self._pending), 1)
+        self._file.write(_LENGTH.pack(len(segment)))
+        self._file.write(segment)
+        self.spilled_segments += 1
+        self.spilled_bytes += len(segment) + _LENGTH.size
+        self._pending = []
+        self._pending_bytes = 0
+
+    @staticmethod
+    def _unpack(buffer: bytes) -> Iterator[Any]:
+        position = 0
+        while position < len(buffer):
+            (length,) = _LENGTH.unpack_from(buffer, position)
+            position += _LENGTH.size
+            yield pickle.loads(buffer[position:position + length])
+            position += length
+
+    def __iter__(self) -> Iterator[Any]:
+        """Items en orden de llegada (un segmento descomprimido a la vez)"""
+        if self._file is not None:
+            self._file.flush()
+            self._file.seek(0)
+            for _ in range(self.spilled_segments):
+                (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+                yield from self._unpack(zlib.decompress(self._file.read(length)))
+            self._file.seek(0, os.SEEK_END)
+        for data in self._pending:
+            yield pickle.loads(data)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        """Libera la memoria y borra el archivo temporal"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._pending = []
+        self._pending_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
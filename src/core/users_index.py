@@ -0,0 +1,128 @@
+"""
+Índice en memoria del directorio de usuarios
+Índices secundarios por ID, departamento, ubicación, puesto y estado activo,
+con conteos por faceta y consultas por álgebra de conjuntos
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+# Faceta -> campo del usuario en la API
+FACET_FIELDS = {
+    'department': 'department',
+    'location': 'location',
+    'job_title': 'jobTitle',
+}
+
+FacetValue = Optional[Union[str, Iterable[str]]]
+
+
+class UsersIndex:
+    """Índice inmutable sobre una lista de usuarios (se reconstruye al refrescar el cache)"""
+
+    def __init__(self, users: List[Dict]):
+        self.users = users
+        self._position: Dict[str, int] = {}
+        self._by_id: Dict[str, Dict] = {}
+        self._postings: Dict[str, Dict[str, Set[str]]] = {facet: {} for facet in FACET_FIELDS}
+        self._active: Set[str] = set()
+
+        for position, user in enumerate(users):
+            user_id = user.get('employeeInternalId')
+            if not user_id or user_id in self._by_id:
+                continue
+            self._position[user_id] = position
+            self._by_id[user_id] = user
+
+            # Usuarios sin isActive se consideran activos (igual que el filtro original)
+            if user.get('isActive', True):
+                self._active.add(user_id)
+
+            for facet, field in FACET_FIELDS.items():
+                value = user.get(field)
+                if value:
+                    self._postings[facet].setdefault(value, set()).add(user_id)
+
+        self._all_ids = frozenset(self._by_id)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._by_id
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Usuario por ID"""
+        return self._by_id.get(user_id)
+
+    def ids_for(self, facet: str, values: FacetValue) -> Set[str]:
+        """IDs cuyo valor de faceta está en `values` (un valor o varios)"""
+        postings = self._postings[facet]
+        if isinstance(values, str):
+            return set(postings.get(values, ()))
+        ids = set()
+        for value in values:
+            ids |= postings.get(value, set())
+        return ids
+
+    def active_ids(self) -> Set[str]:
+        """IDs de usuarios activos"""
+        return set(self._active)
+
+    def select_ids(self, department: FacetValue = None, location: FacetValue = None,
+                   job_title: FacetValue = None, active_only: bool = False,
+                   user_ids: Iterable[str] = None) -> Set[str]:
+        """
+        Intersección de todos los criterios indicados (dentro de una faceta, unión de valores)
+        """
+        candidates: List[Set[str]] = []
+        if user_ids is not None:
+            candidates.append(set(user_ids) & self._all_ids)
+        for facet, values in (('department', department), ('location', location),
+                              ('job_title', job_title)):
+            if values:
+                candidates.append(self.ids_for(facet, values))
+        if active_only:
+            candidates.append(self._active)
+
+        if not candidates:
+            return set(self._all_ids)
+
+        # Intersectar empezando por el conjunto más chico
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for other in candidates[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+    def users_for_ids(self, user_ids: Iterable[str]) -> List[Dict]:
+        """Usuarios de los IDs dados, en el orden del directorio (ignora IDs desconocidos)"""
+        known = [user_id for user_id in user_ids if user_id in self._by_id]
+        known.sort(key=self._position.__getitem__)
+        return [self._by_id[user_id] for user_id in known]
+
+    def query(self, **criteria) -> List[Dict]:
+        """Usuarios que cumplen los criterios de select_ids(), en el orden del directorio"""
+        return self.users_for_ids(self.select_ids(**criteria))
+
+    def facet_counts(self, active_only: bool = False) -> Dict[str, Dict[str, int]]:
+        """Cantidad de usuarios por valor de cada faceta"""
+        counts = {}
+        for facet, postings in self._postings.items():
+            if active_only:
+                counts[facet] = {value: len(ids & self._active) for value, ids in postings.items()}
+                counts[facet] = {value: n for value, n in counts[facet].items() if n}
+            else:
+                counts[facet] = {value: len(ids) for value, ids in postings.items()}
+        return counts
+
+    def filters(self) -> Dict:
+        """Filtros disponibles para la UI (mismo formato que get_available_filters)"""
+        return {
+            'departments': sorted(self._postings['department']),
+            'locations': sorted(self._postings['location']),
+            'job_titles': sorted(self._postings['job_title']),
+            'total_users': len(self.users),
+            'facet_counts': self.facet_counts(),
+        }
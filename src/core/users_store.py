@@ -0,0 +1,61 @@
+"""
+Persistencia local del directorio de usuarios
+Permite arrancar la aplicación con los filtros de la última ejecución mientras
+se refresca el directorio en segundo plano (stale-while-revalidate)
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+
+
+class UsersDirectoryStore:
+    """Guarda el directorio de usuarios (y sus filtros derivados) en disco"""
+    
+    def __init__(self, api_key: str = None, base_url: str = None, cache_dir: str = None):
+        self.cache_dir = os.path.expanduser(cache_dir or DEFAULT_CONFIG['cache_directory'])
+        
+        # Un archivo por tenant para no mezclar directorios de distintas API keys
+        tenant = f"{base_url or DEFAULT_CONFIG['base_url']}|{api_key or ''}"
+        tenant_hash = hashlib.sha1(tenant.encode('utf-8')).hexdigest()[:12]
+        self.path = os.path.join(self.cache_dir, f"users_{tenant_hash}.json")
+    
+    def load(self) -> Optional[Dict]:
+        """
+        Lee el directorio persistido
+        Returns:
+            {'users', 'filters', 'saved_at' (datetime)} o None si no hay cache usable
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {
+                'users': data['users'],
+                'filters': data['filters'],
+                'saved_at': datetime.fromisoformat(data['saved_at'])
+            }
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Cache local de usuarios inválido, se ignora: {str(e)}")
+            return None
+    
+    def save(self, users: List[Dict], filters: Dict):
+        """Persiste el directorio (y sus filtros derivados) de forma atómica"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            payload = {
+                'saved_at': datetime.now().isoformat(),
+                'users': users,
+                'filters': filters
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cache local de usuarios: {str(e)}")
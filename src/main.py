@@ -5,6 +5,7 @@ Generador de Reportes de Asistencia - Humand.co
 
 import sys
 import os
+import multiprocessing
 
 # Agregar el directorio src al path para imports absolutos
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -13,4 +14,6 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from ui.main_window import main
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos en ejecutables congelados (PyInstaller)
+    multiprocessing.freeze_support()
     main()
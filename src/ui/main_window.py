@@ -11,7 +11,7 @@ from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QDateEdit, QPushButton, QProgressBar, QTextEdit, 
-    QGroupBox, QMessageBox,
+    QGroupBox, QMessageBox, QCheckBox,
     QFileDialog, QFrame, QGridLayout, QSpacerItem, QSizePolicy, 
     QScrollArea, QDialog, QProgressDialog
 )
@@ -220,6 +220,7 @@ class InitializationThread(QThread):
     """Thread para la inicialización de la aplicación"""
     progress_updated = pyqtSignal(int, str)
     initialization_finished = pyqtSignal(bool, str, dict)
+    filters_refreshed = pyqtSignal(dict)
     
     def __init__(self, processor):
         super().__init__()
@@ -228,6 +229,16 @@ class InitializationThread(QThread):
     def run(self):
         """Ejecuta la inicialización en segundo plano"""
         try:
+            # Arranque instantáneo desde el directorio local; se refresca en segundo plano
+            if self.processor.has_cached_directory():
+                self.progress_updated.emit(50, "Cargando usuarios desde cache local...")
+                filters = self.processor.get_available_filters(
+                    on_refresh=self.filters_refreshed.emit
+                )
+                self.progress_updated.emit(100, "Inicialización completada")
+                self.initialization_finished.emit(True, "Inicialización desde cache local", filters)
+                return
+            
             # Paso 1: Probar conexión (30%)
             self.progress_updated.emit(10, "Conectando con la API...")
             success, message = self.processor.test_connection()
@@ -262,12 +273,13 @@ class ProcessingThread(QThread):
     progress_updated = pyqtSignal(int, str)
     processing_finished = pyqtSignal(dict)
     
-    def __init__(self, processor, start_date, end_date, user_ids=None):
+    def __init__(self, processor, start_date, end_date, user_ids=None, force_rebuild=False):
         super().__init__()
         self.processor = processor
         self.start_date = start_date
         self.end_date = end_date
         self.user_ids = user_ids
+        self.force_rebuild = force_rebuild
     
     def run(self):
         """Ejecuta el procesamiento en segundo plano"""
@@ -278,7 +290,8 @@ class ProcessingThread(QThread):
                 self.end_date, 
                 self.user_ids,
                 self.progress_callback,
-                report_type="detailed"  # Siempre formato detallado
+                report_type="detailed",  # Siempre formato detallado
+                force_rebuild=self.force_rebuild
             )
             self.processing_finished.emit(result)
         except Exception as e:
@@ -293,6 +306,21 @@ class ProcessingThread(QThread):
         self.progress_updated.emit(progress, message)
 
 
+class LivePollThread(QThread):
+    """Thread para un poll del monitor en vivo (la consulta a la API no bloquea la ventana)"""
+    poll_finished = pyqtSignal(dict)
+    
+    def __init__(self, monitor):
+        super().__init__()
+        self.monitor = monitor
+    
+    def run(self):
+        try:
+            self.poll_finished.emit(self.monitor.poll())
+        except Exception as e:
+            self.poll_finished.emit({'error': str(e)})
+
+
 class MainWindow(QMainWindow):
     """Ventana principal moderna de la aplicación"""
     
@@ -301,6 +329,10 @@ class MainWindow(QMainWindow):
         # Crear processor usando el alias que apunta a DataProcessorEnhanced
         self.processor = DataProcessor()
         self.processing_thread = None
+        self.live_monitor = None
+        self.live_poll_thread = None
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self.run_live_poll)
         self.available_users = []
         self.available_filters = {}
         
@@ -347,6 +379,7 @@ class MainWindow(QMainWindow):
         # Acciones y Estado (span completo)
         self.create_actions_card(cards_layout, 1, 0, 1, 2)
         self.create_status_card(cards_layout, 2, 0, 1, 2)
+        self.create_live_card(cards_layout, 3, 0, 1, 2)
         
         main_layout.addLayout(cards_layout)
         
@@ -567,6 +600,11 @@ class MainWindow(QMainWindow):
         self.open_folder_btn.clicked.connect(self.open_reports_folder)
         actions_layout.addWidget(self.open_folder_btn)
         
+        # Sin tildar, un reporte idéntico al último se reutiliza al instante
+        self.force_rebuild_checkbox = QCheckBox("Forzar regeneración")
+        self.force_rebuild_checkbox.setToolTip("Regenerar aunque los datos no hayan cambiado desde el último reporte")
+        actions_layout.addWidget(self.force_rebuild_checkbox)
+        
         actions_layout.addStretch()
         
         card.content_layout.addLayout(actions_layout)
@@ -632,6 +670,41 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(card, row, col, rowspan, colspan)
     
+    def create_live_card(self, layout, row, col, rowspan=1, colspan=1):
+        """Crea el card del monitor en vivo (asistencia de hoy, sin generar archivos)"""
+        card = ModernCard("Asistencia en Vivo (hoy)")
+        
+        live_layout = QHBoxLayout()
+        self.live_toggle_btn = ModernButton("Iniciar monitor", "secondary")
+        self.live_toggle_btn.clicked.connect(self.toggle_live_monitor)
+        self.live_toggle_btn.setEnabled(False)  # Deshabilitado hasta inicialización
+        live_layout.addWidget(self.live_toggle_btn)
+        
+        self.live_counts_label = QLabel("Monitor detenido")
+        self.live_counts_label.setStyleSheet("""
+            QLabel {
+                font-size: 14px;
+                color: #374151;
+                font-weight: bold;
+            }
+        """)
+        live_layout.addWidget(self.live_counts_label)
+        live_layout.addStretch()
+        card.content_layout.addLayout(live_layout)
+        
+        # Costo del último poll (empleados consultados, requests, segundos)
+        self.live_cost_label = QLabel("")
+        self.live_cost_label.setStyleSheet("""
+            QLabel {
+                color: #64748b;
+                font-size: 12px;
+                font-style: italic;
+            }
+        """)
+        card.add_content(self.live_cost_label)
+        
+        layout.addWidget(card, row, col, rowspan, colspan)
+    
     def create_log_section(self, layout):
         """Crea la sección de log expandible"""
         log_card = ModernCard("Log de Actividad")
@@ -724,6 +797,7 @@ class MainWindow(QMainWindow):
         self.init_thread = InitializationThread(self.processor)
         self.init_thread.progress_updated.connect(self.update_native_progress)
         self.init_thread.initialization_finished.connect(self.initialization_completed)
+        self.init_thread.filters_refreshed.connect(self.filters_refreshed)
         self.init_thread.start()
     
     def update_native_progress(self, progress, message):
@@ -746,11 +820,16 @@ class MainWindow(QMainWindow):
             total_users = filters.get('total_users', 0)
             
             # Actualizar estados
-            self.header_status.update_status("success", "Conectado")
+            if filters.get('from_cache'):
+                self.header_status.update_status("warning", "Cache local")
+                self.log_message("Usuarios cargados desde cache local, actualizando en segundo plano...")
+            else:
+                self.header_status.update_status("success", "Conectado")
             self.status_label.setText("Estado: Listo para procesar")
             
             # Habilitar controles
             self.generate_report_btn.setEnabled(True)
+            self.live_toggle_btn.setEnabled(True)
             
             # Log de éxito
             self.log_message("Aplicación inicializada correctamente")
@@ -772,6 +851,12 @@ class MainWindow(QMainWindow):
                 f"Por favor verifica tu conexión a internet y la configuración de la API."
             )
     
+    def filters_refreshed(self, filters):
+        """Actualiza los filtros cuando termina el refresh en segundo plano"""
+        self.available_filters = filters
+        self.header_status.update_status("success", "Conectado")
+        self.log_message(f"Directorio de usuarios actualizado: {filters.get('total_users', 0)} usuarios")
+    
     def set_date_preset(self, preset_type):
         """Establece presets de fechas mejorados"""
         today = QDate.currentDate()
@@ -882,7 +967,8 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(0)
         self.status_label.setText("Estado: Procesando...")
         
-        self.processing_thread = ProcessingThread(self.processor, start_date, end_date, user_ids)
+        self.processing_thread = ProcessingThread(self.processor, start_date, end_date, user_ids,
+                                                  self.force_rebuild_checkbox.isChecked())
         self.processing_thread.progress_updated.connect(self.update_progress)
         self.processing_thread.processing_finished.connect(self.processing_completed)
         self.processing_thread.start()
@@ -906,7 +992,10 @@ class MainWindow(QMainWindow):
             filename = os.path.basename(excel_path)
             self.last_report_label.setText(f"Último reporte: {filename}")
             
-            self.log_message(f"Reporte DETALLADO generado exitosamente: {filename}")
+            if result.get('cached'):
+                self.log_message(f"Sin cambios desde el último reporte, se reutiliza: {filename}")
+            else:
+                self.log_message(f"Reporte DETALLADO generado exitosamente: {filename}")
             self.log_message(f"Estadísticas: {stats['total_employees']} empleados, {stats['total_hours_worked']} horas")
             
             # Información adicional para reporte detallado
@@ -947,6 +1036,52 @@ class MainWindow(QMainWindow):
                 f"Por favor revisa el log para más detalles."
             )
     
+    def toggle_live_monitor(self):
+        """Inicia o detiene el monitor en vivo"""
+        if self.live_timer.isActive():
+            self.live_timer.stop()
+            self.live_toggle_btn.setText("Iniciar monitor")
+            self.live_counts_label.setText("Monitor detenido")
+            self.log_message("Monitor en vivo detenido")
+            return
+        
+        if self.live_monitor is None:
+            self.live_monitor = self.processor.create_live_monitor()
+        self.live_timer.start(DEFAULT_CONFIG['live_poll_seconds'] * 1000)
+        self.live_toggle_btn.setText("Detener monitor")
+        self.live_counts_label.setText("Consultando...")
+        self.log_message(f"Monitor en vivo iniciado (cada {DEFAULT_CONFIG['live_poll_seconds']}s)")
+        self.run_live_poll()
+    
+    def run_live_poll(self):
+        """Lanza un poll si el anterior ya terminó"""
+        if self.live_poll_thread and self.live_poll_thread.isRunning():
+            return
+        self.live_poll_thread = LivePollThread(self.live_monitor)
+        self.live_poll_thread.poll_finished.connect(self.live_poll_completed)
+        self.live_poll_thread.start()
+    
+    def live_poll_completed(self, poll):
+        """Actualiza los contadores y el costo del poll"""
+        if 'error' in poll:
+            self.live_cost_label.setText(f"Error en el último poll: {poll['error']}")
+            self.log_message(f"Error en monitor en vivo: {poll['error']}")
+            return
+        if not self.live_timer.isActive():
+            return
+        
+        counts = poll['counts']
+        self.live_counts_label.setText(
+            f"Adentro: {counts['in']}  ·  Salieron: {counts['out']}  ·  Sin fichar: {counts['not_arrived']}  ·  "
+            f"Tarde: {counts['late']}  ·  Ausentes: {counts['absent']}  ·  Franco/licencia: {counts['off']}"
+        )
+        failed = f", {poll['failed']} sin respuesta" if poll['failed'] else ""
+        self.live_cost_label.setText(
+            f"Último poll {poll['at']}: {poll['polled']}/{counts['total']} empleados consultados, "
+            f"{poll['requests']} requests, {poll['day_summaries']} day summaries, "
+            f"{poll['changed']} cambios, {poll['seconds']}s{failed}"
+        )
+    
     def open_reports_folder(self):
         """Abre la carpeta de reportes"""
         reports_dir = os.path.expanduser(DEFAULT_CONFIG['output_directory'])
@@ -1009,6 +1144,10 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Maneja el cierre de la aplicación"""
+        self.live_timer.stop()
+        if self.live_poll_thread and self.live_poll_thread.isRunning():
+            self.live_poll_thread.wait()
+        
         if self.processing_thread and self.processing_thread.isRunning():
             reply = QMessageBox.question(
                 self, "Procesamiento en curso",
@@ -0,0 +1,85 @@
+"""
+Calculador de horas: la ruta escalar y la vectorizada (NumPy) dan los mismos números,
+y los resultados sobre los datos sintéticos siguen coincidiendo con benchmarks/golden.json
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from benchmarks.bench_hours import _chunks, _compute, employee_digest_payload, load_golden, run_size
+from benchmarks.synthetic_data import DEFAULT_DAYS, DEFAULT_SEED, SyntheticAttendance
+from core.hours_calculator import ArgentineHoursCalculator
+from core.models import LOCAL_TZ
+
+DISTRIBUTION_FIELDS = ('regular_hours', 'extra_hours_50', 'extra_hours_100', 'pending_hours')
+
+SLOT_9_18 = [{'startTime': '09:00', 'endTime': '18:00'}]
+
+# (horas trabajadas, fecha, feriado, laborable, entrada, salida, turno)
+FIXED_DAYS = [
+    (8.0, datetime(2025, 3, 3), False, True, (9, 0), (17, 0), SLOT_9_18),       # lunes, jornada justa
+    (10.5, datetime(2025, 3, 4), False, True, (8, 0), (18, 30), SLOT_9_18),     # martes con extras
+    (6.25, datetime(2025, 3, 5), False, True, (10, 0), (16, 15), SLOT_9_18),    # miércoles, trabajó menos
+    (7.0, datetime(2025, 3, 8), False, True, (9, 0), (16, 0), None),            # sábado pasadas las 13
+    (4.0, datetime(2025, 3, 8), False, True, (8, 0), (12, 0), None),            # sábado a la mañana
+    (5.0, datetime(2025, 3, 9), False, False, (10, 0), (15, 0), None),          # domingo
+    (8.0, datetime(2025, 3, 24), True, True, (9, 0), (17, 0), SLOT_9_18),       # feriado
+    (6.0, datetime(2025, 3, 6), False, False, (9, 0), (15, 0), None),           # día no laborable
+    (9.0, datetime(2025, 3, 7), False, True, (22, 0), (7, 0), None),            # turno nocturno
+    (0, datetime(2025, 3, 10), False, True, None, None, SLOT_9_18),             # sin horas
+]
+
+
+def _local(day: datetime, hour_minute, next_day: bool = False):
+    if hour_minute is None:
+        return None
+    moment = day.replace(hour=hour_minute[0], minute=hour_minute[1], tzinfo=LOCAL_TZ)
+    return moment + timedelta(days=1) if next_day else moment
+
+
+def test_vectorized_distribution_matches_scalar_on_fixed_days():
+    pytest.importorskip('numpy')
+    from core.hours_vectorized import HoursBatch
+
+    calculator = ArgentineHoursCalculator()
+    batch = HoursBatch()
+    expected = []
+    for hours, day, is_holiday, is_workday, entry, exit_, time_slots in FIXED_DAYS:
+        entrada = _local(day, entry)
+        salida = _local(day, exit_, next_day=bool(entry and exit_ and exit_ < entry))
+        expected.append(calculator.calculate_hour_distribution(
+            hours, day, is_holiday=is_holiday, entrada_local=entrada, salida_local=salida,
+            time_slots=time_slots, is_workday=is_workday))
+        batch.add(hours, day, is_holiday, is_workday, entrada, salida, time_slots)
+
+    distributed = batch.distribute()
+    for position, scalar in enumerate(expected):
+        vectorized = {field: distributed[field][position] for field in DISTRIBUTION_FIELDS}
+        assert vectorized == pytest.approx({field: scalar[field] for field in DISTRIBUTION_FIELDS}), \
+            FIXED_DAYS[position]
+
+
+def test_vectorized_employees_match_scalar():
+    pytest.importorskip('numpy')
+    calculator = ArgentineHoursCalculator()
+    chunk = next(_chunks(SyntheticAttendance(DEFAULT_SEED, DEFAULT_DAYS), 60))
+
+    scalar = _compute(calculator, chunk, False)
+    vectorized = _compute(calculator, chunk, True)
+
+    assert [employee_digest_payload(data) for data in vectorized] == \
+        [employee_digest_payload(data) for data in scalar]
+
+
+def test_results_match_golden_digest():
+    golden = load_golden()
+    expected = golden['digests']['1000']
+
+    result = run_size(1000, golden['days'], golden['seed'], False, False)
+
+    assert result['digest'] == expected